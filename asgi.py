@@ -0,0 +1,17 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#
+#   uvicorn asgi:application --workers 4 --port 8000
+#
+# The event loop owns the client connections (keep-alive, slow clients)
+# and hands each request to the Flask app on a thread pool, so a worker
+# serves many connections while views wait on the database. The WSGI
+# entry point is app:app (gunicorn app:app).
+#----------------------------------------------------------------------------#
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+
+
+application = WsgiToAsgi(app)
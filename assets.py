@@ -0,0 +1,186 @@
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+# `flask build-assets` concatenates the CSS and JS of each bundle, minifies
+# what is not minified yet, writes it under a content-hashed name with
+# .gz (and .br, with the optional `brotli` package) siblings, and records
+# the names in a manifest. Templates call asset_urls(bundle): the hashed
+# URL once built, the separate source files otherwise (development).
+#
+# Bundles are served from ASSETS_URL_PATH with the precompressed variant
+# the client accepts and a year-long immutable Cache-Control: a changed
+# file gets a new name.
+#
+# Config:
+#   ASSETS_FOLDER     where bundles and manifest.json are written.
+#   ASSETS_URL_PATH   URL prefix of the bundles.
+#   ASSETS_DEBUG      always link the source files.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import abort, current_app, request, send_from_directory, url_for
+
+from compression import available_encodings, compress
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+# Bundle name -> files under static/, in load order.
+BUNDLES = {
+    'main.css': (
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ),
+    # Loaded in <head>: modernizr must run before the page renders.
+    'head.js': (
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+        'js/script.js',
+    ),
+    # End of <body>, before the inline scripts that use jQuery.
+    'footer.js': (
+        'js/libs/jquery-1.11.1.min.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ),
+}
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 3600
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+SOURCE_MAP = re.compile(r'^//[#@] sourceMappingURL=.*$', re.M)
+
+
+#  Building
+#  ----------------------------------------------------------------
+
+def minify_css(text):
+    # Comments and whitespace only; safe on the stylesheets of this app.
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Needs the optional `rjsmin` package; the source is kept otherwise.
+    return rjsmin.jsmin(text) if rjsmin is not None else text
+
+
+def absolute_css_urls(text, path, static_url):
+    # Relative url(...) references of static/<path> made absolute, as the
+    # bundle is served from another directory.
+    def replace(match):
+        url = match.group(2)
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        return 'url("%s/%s")' % (static_url, posixpath.normpath(posixpath.join(posixpath.dirname(path), url)))
+    return CSS_URL.sub(replace, text)
+
+
+def bundle_source(name, files, static_folder, static_url):
+    parts = []
+    for path in files:
+        with open(os.path.join(static_folder, path), encoding='utf-8') as f:
+            text = f.read()
+        minified = '.min.' in path
+        if name.endswith('.css'):
+            text = absolute_css_urls(text, path, static_url)
+            parts.append(text if minified else minify_css(text))
+        else:
+            text = SOURCE_MAP.sub('', text)
+            parts.append(text if minified else minify_js(text))
+    # A newline and ';' between scripts, in case one lacks its last ';'.
+    return ('\n' if name.endswith('.css') else '\n;\n').join(parts).encode('utf-8')
+
+
+def hashed_name(name, data):
+    stem, extension = os.path.splitext(name)
+    return '%s.%s%s' % (stem, hashlib.sha256(data).hexdigest()[:12], extension)
+
+
+def build(app):
+    # Write every bundle and the manifest. Returns {bundle: (file name,
+    # size, {encoding: compressed size})}. Files of earlier builds are kept
+    # so pages cached before a deploy still load.
+    folder = app.config['ASSETS_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    manifest, report = {}, {}
+    for name, files in BUNDLES.items():
+        data = bundle_source(name, files, app.static_folder, app.static_url_path)
+        filename = hashed_name(name, data)
+        with open(os.path.join(folder, filename), 'wb') as f:
+            f.write(data)
+        sizes = {}
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding in available_encodings():
+                compressed = compress(data, encoding, 11 if encoding == 'br' else 9)
+                with open(os.path.join(folder, filename + suffix), 'wb') as f:
+                    f.write(compressed)
+                sizes[encoding] = len(compressed)
+        manifest[name] = filename
+        report[name] = (filename, len(data), sizes)
+    with open(os.path.join(folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    app.extensions['assets'] = manifest
+    return report
+
+
+def load_manifest(app):
+    try:
+        with open(os.path.join(app.config['ASSETS_FOLDER'], MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+#  Templates and serving
+#  ----------------------------------------------------------------
+
+def asset_urls(name):
+    # URLs to link for a bundle: the built file, or its sources.
+    manifest = current_app.extensions['assets']
+    if name in manifest and not current_app.config['ASSETS_DEBUG']:
+        return [url_for('asset', filename=manifest[name])]
+    return [url_for('static', filename=path) for path in BUNDLES[name]]
+
+
+def send_asset(filename):
+    folder = current_app.config['ASSETS_FOLDER']
+    if filename == MANIFEST or filename.endswith(tuple(suffix for _, suffix in PRECOMPRESSED)):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    path, encoding = filename, None
+    for candidate, suffix in PRECOMPRESSED:
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(folder, filename + suffix)):
+            path, encoding = filename + suffix, candidate
+            break
+    response = send_from_directory(folder, path, mimetype=mimetype, cache_timeout=MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'public, max-age=%d, immutable' % MAX_AGE
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('ASSETS_FOLDER', os.path.join(app.static_folder, 'dist'))
+    app.config.setdefault('ASSETS_URL_PATH', '/assets')
+    app.config.setdefault('ASSETS_DEBUG', False)
+    app.extensions['assets'] = load_manifest(app)
+    app.add_url_rule(app.config['ASSETS_URL_PATH'] + '/<path:filename>', 'asset', send_asset)
+    app.jinja_env.globals['asset_urls'] = asset_urls
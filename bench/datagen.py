@@ -0,0 +1,160 @@
+#----------------------------------------------------------------------------#
+# Seeded synthetic data for benchmarks.
+#
+# The same (scale, seed) always produces the same venues, artists and
+# shows, so runs against different builds or databases are comparable.
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+
+# Number of shows per scale; venues and artists are derived from it.
+SCALES = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+SHOWS_PER_VENUE = 20
+SHOWS_PER_ARTIST = 10
+BATCH_SIZE = 10000
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('San Diego', 'CA'),
+    ('New York', 'NY'), ('Buffalo', 'NY'), ('Austin', 'TX'), ('Houston', 'TX'),
+    ('Dallas', 'TX'), ('Chicago', 'IL'), ('Seattle', 'WA'), ('Portland', 'OR'),
+    ('Denver', 'CO'), ('Boston', 'MA'), ('Miami', 'FL'), ('Atlanta', 'GA'),
+    ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Detroit', 'MI'),
+    ('Philadelphia', 'PA'), ('Phoenix', 'AZ'),
+]
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+]
+WORDS = [
+    'Blue', 'Velvet', 'Musical', 'Hop', 'Park', 'Square', 'Live', 'Coffee',
+    'Wild', 'Sax', 'Band', 'Petals', 'Golden', 'Echo', 'Room', 'Hall',
+    'Lounge', 'Garden', 'Electric', 'Lantern', 'Harbor', 'Canyon', 'Neon',
+    'Static', 'River', 'Stone', 'Owl', 'Fox', 'Orchid', 'Cellar',
+]
+
+
+def shows_for_scale(scale):
+    if scale in SCALES:
+        return SCALES[scale]
+    return int(scale)
+
+
+def random_name(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def venue_rows(rng, count):
+    for venue_id in range(1, count + 1):
+        city, state = rng.choice(CITIES)
+        yield {
+            'id': venue_id,
+            'name': 'The %s %d' % (random_name(rng, 2), venue_id),
+            'city': city,
+            'state': state,
+            'address': '%d %s St' % (rng.randint(1, 9999), rng.choice(WORDS)),
+            'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+            'image_link': 'https://images.example.com/venues/%d.jpg' % venue_id,
+            'facebook_link': 'https://www.facebook.com/venue%d' % venue_id,
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'website': 'https://venue%d.example.com' % venue_id,
+            'seeking_talent': rng.choice(['Yes', 'No']),
+            'seeking_description': 'Looking for local acts.',
+        }
+
+
+def artist_rows(rng, count):
+    for artist_id in range(1, count + 1):
+        city, state = rng.choice(CITIES)
+        yield {
+            'id': artist_id,
+            'name': '%s %d' % (random_name(rng, 2), artist_id),
+            'city': city,
+            'state': state,
+            'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'image_link': 'https://images.example.com/artists/%d.jpg' % artist_id,
+            'facebook_link': 'https://www.facebook.com/artist%d' % artist_id,
+            'website': 'https://artist%d.example.com' % artist_id,
+            'seeking_venue': rng.choice(['Yes', 'No']),
+            'seeking_description': 'Looking for places to play.',
+        }
+
+
+def show_rows(rng, count, venues, artists, now):
+    # Start times spread over a year either side of `now`, on the hour,
+    # lasting two hours. Shows may overlap: they are not checked.
+    base = now.replace(minute=0, second=0, microsecond=0)
+    for show_id in range(1, count + 1):
+        start_time = base + timedelta(hours=rng.randint(-365 * 24, 365 * 24))
+        yield {
+            'id': show_id,
+            'venue_id': rng.randint(1, venues),
+            'artist_id': rng.randint(1, artists),
+            'start_time': start_time,
+            'end_time': start_time + timedelta(hours=2),
+        }
+
+
+def insert_batches(db, table, rows, batch_size=BATCH_SIZE, progress=None):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            if progress:
+                progress(table.name, len(batch))
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        if progress:
+            progress(table.name, len(batch))
+
+
+def reset_tables(db):
+    # PostgreSQL keeps its migrated schema (search triggers and indexes),
+    # scratch databases of other dialects are simply recreated.
+    db.session.remove()
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute('TRUNCATE "Show", "Venue", "Artist", "AreaSummary" RESTART IDENTITY')
+        db.session.commit()
+    else:
+        db.drop_all()
+        db.create_all()
+
+
+def generate(scale='1k', seed=1, now=None, progress=None):
+    # Replace the contents of the app's database with the generated data
+    # (call within an application context). Returns the (venues, artists,
+    # shows) counts.
+    import queries
+    from extensions import db
+    from models import Venue, Artist, Show
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    shows = shows_for_scale(scale)
+    venues = max(1, shows // SHOWS_PER_VENUE)
+    artists = max(1, shows // SHOWS_PER_ARTIST)
+
+    reset_tables(db)
+    insert_batches(db, Venue.__table__, venue_rows(rng, venues), progress=progress)
+    insert_batches(db, Artist.__table__, artist_rows(rng, artists), progress=progress)
+    insert_batches(db, Show.__table__, show_rows(rng, shows, venues, artists, now), progress=progress)
+
+    if db.engine.dialect.name == 'postgresql':
+        for table in ('Venue', 'Artist', 'Show'):
+            db.session.execute(
+                "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), (SELECT max(id) FROM \"%s\"))" % (table, table))
+
+    queries.show_counter_clock().rolled_at = now
+    queries.reconcile_show_counters(fix=True)
+    queries.refresh_area_summary()
+    db.session.commit()
+    return venues, artists, shows
@@ -0,0 +1,164 @@
+#----------------------------------------------------------------------------#
+# Query plan check.
+#
+# Seeds a database with bench.datagen, requests every read route of the
+# route plan of bench.run and EXPLAINs each SQL statement the route ran.
+# A statement reading Show, Venue or Artist without an index (Seq Scan on
+# PostgreSQL, SCAN without USING INDEX on SQLite) fails the check, unless
+# the route reads the whole table by design (FULL_SCANS). Exit status 1
+# on failure.
+#
+#   python -m bench.explain --scale 100k --database postgresql://localhost/fyyur_bench
+#   python -m bench.explain --scale 10k             # SQLite file bench/bench.db
+#
+# Use a large scale on PostgreSQL: on small tables the planner rightly
+# prefers sequential scans.
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import random
+import re
+import sys
+
+from bench.run import DEFAULT_DATABASE, route_plan
+
+
+TABLES = ('Show', 'Venue', 'Artist')
+
+# Routes that read every row of a table on purpose.
+FULL_SCANS = {
+    'venues': {'Venue'},
+    'artists': {'Artist'},
+    # First page in primary key order: SQLite reports that rowid walk
+    # (stopped by the LIMIT) as a SCAN.
+    'api_artists': {'Artist'},
+    'api_venue_areas': {'Venue'},
+    'export_data': set(TABLES),
+    # The in-process search backend (SQLite) loads its index from a scan.
+    'search_venues': {'Venue'},
+    'search_artists': {'Artist'},
+    'api_search_venues': {'Venue'},
+    'api_search_artists': {'Artist'},
+    # The show form suggests the latest venues and artists: a primary key
+    # walk stopped by the LIMIT, as for api_artists.
+    'create_shows': {'Venue', 'Artist'},
+}
+
+# Monthly and default partitions of Show (see partitions.py).
+SHOW_PARTITION = re.compile(r'^Show_(?:\d{4}_\d{2}|default)$')
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$')
+
+
+def full_scans_postgresql(plan):
+    # Tables read by a Seq Scan anywhere in a JSON plan.
+    tables = set()
+    if plan.get('Node Type') == 'Seq Scan':
+        tables.add(SHOW_PARTITION.sub('Show', plan.get('Relation Name')))
+    for child in plan.get('Plans', ()):
+        tables |= full_scans_postgresql(child)
+    return tables
+
+
+def full_scans(connection, statement, parameters):
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.name == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+            plan = cursor.fetchone()[0]
+            return full_scans_postgresql(plan[0]['Plan'])
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        tables = set()
+        for row in cursor.fetchall():
+            match = SQLITE_SCAN.match(row[-1])
+            if match:
+                tables.add(match.group(1))
+        return tables
+    finally:
+        cursor.close()
+
+
+def capture(app, method, url, data):
+    # SQL statements (text, parameters) run while serving one request.
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        response = app.test_client().open(url, method=method, data=data)
+        response.get_data()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+    return response.status_code, statements
+
+
+def check(app, db, plan, seed):
+    rng = random.Random(seed)
+    failures, rows = [], []
+    for endpoint, make_request in plan:
+        method, url, data = make_request(rng, 0)
+        if method != 'GET' or endpoint.startswith('delete'):
+            continue
+        status, statements = capture(app, method, url, data)
+        allowed = FULL_SCANS.get(endpoint, set())
+        scanned = set()
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                tables = full_scans(connection, statement, parameters) & set(TABLES)
+                scanned |= tables
+                for table in sorted(tables - allowed):
+                    failures.append('%s: full scan of %s in %s' % (endpoint, table, ' '.join(statement.split())[:160]))
+        rows.append((endpoint, status, len(statements), ', '.join(sorted(scanned)) or '-',
+                     'ok' if scanned <= allowed else 'FAIL'))
+    return rows, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check that the routes query through indexes.')
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE),
+                        help='SQLAlchemy URL of a scratch database (its data is replaced).')
+    parser.add_argument('--scale', default='10k', help='1k, 10k, 100k, 1m or a number of shows.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in the database.')
+    args = parser.parse_args(argv)
+
+    os.environ['DATABASE_URL'] = args.database
+    # The route plan reads the metrics page too.
+    os.environ.setdefault('METRICS_ENDPOINT', '/metrics')
+    from app import app
+    from bench import datagen
+    from extensions import db
+    from models import Venue, Artist, Show
+
+    app.config['CACHE_ENABLED'] = False
+    app.config['QUERY_BUDGET_ASSERT'] = False
+    app.app_context().push()
+    if args.skip_seed:
+        counts = tuple(db.session.query(db.func.max(model.id)).scalar() or 0
+                       for model in (Venue, Artist, Show))
+    else:
+        counts = datagen.generate(args.scale, args.seed)
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute('ANALYZE')
+        db.session.commit()
+    db.session.remove()
+
+    rows, failures = check(app, db, route_plan(*counts), args.seed)
+    print('%-26s %6s %8s  %-22s %s' % ('endpoint', 'status', 'selects', 'full scans', ''))
+    for row in rows:
+        print('%-26s %6d %8d  %-22s %s' % row)
+    for failure in failures:
+        print('FAIL %s' % failure)
+    if failures:
+        return 1
+    print('Every statement of the checked routes uses an index (%s).' % db.engine.dialect.name)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
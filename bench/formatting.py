@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Micro-benchmark of the `datetime` template filter.
+#
+# Compares the filter as it was (dateutil parse of a string, Babel pattern
+# built on every call) with the DateTimeFormatter of formatting.py, on the
+# values a /shows page renders (many calls over a smaller set of start
+# times) and on distinct values only (every call a cache miss).
+#
+#   python -m bench.formatting --calls 20000 --distinct 500
+#----------------------------------------------------------------------------#
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+
+def reference_format_datetime(value, format='medium'):
+    # The filter before the cached version.
+    import babel.dates
+    import dateutil.parser
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format="EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format="EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def timed(function, values):
+    started = time.perf_counter()
+    for value in values:
+        function(value, 'full')
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the datetime template filter.')
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=500, help='Distinct start times.')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    rng = random.Random(args.seed)
+    base = datetime(2020, 1, 1, 18)
+    times = [base + timedelta(days=rng.randint(0, 730), minutes=30 * rng.randint(0, 12))
+             for _ in range(args.distinct)]
+    values = [rng.choice(times) for _ in range(args.calls)]
+
+    formatter = app.extensions['datetime_formatter']
+    if [formatter(value, 'full') for value in times] != [reference_format_datetime(str(value), 'full') for value in times]:
+        print('Output differs from the reference filter.')
+        return 1
+
+    unique = [base + timedelta(minutes=i) for i in range(args.calls)]
+    rows = [('reference (str)', timed(reference_format_datetime, [str(value) for value in values]))]
+    formatter.memo.clear()
+    rows.append(('cached, str input', timed(formatter, [str(value) for value in values])))
+    formatter.memo.clear()
+    rows.append(('cached', timed(formatter, values)))
+    rows.append(('cached, all hits', timed(formatter, values)))
+    rows.append(('cached, all misses', timed(formatter, unique)))
+
+    reference = rows[0][1]
+    print('%d calls over %d distinct values' % (args.calls, args.distinct))
+    print('%-20s %10s %10s %8s' % ('filter', 'total ms', 'us/call', 'speedup'))
+    for name, elapsed in rows:
+        print('%-20s %10.1f %10.2f %7.1fx' % (
+            name, 1000 * elapsed, 1e6 * elapsed / args.calls, reference / elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#----------------------------------------------------------------------------#
+# Load test: WSGI vs ASGI serving.
+#
+# Seeds a database with bench.datagen, starts each server command in turn
+# against it and drives it with N concurrent keep-alive connections for a
+# fixed time, then reports requests per second and p50/p95/p99 latency.
+#
+#   python -m bench.load --scale 10k --connections 500 --duration 30
+#   python -m bench.load --database postgresql://localhost/fyyur_bench \
+#       --server wsgi='gunicorn --workers 4 --threads 16 --bind 127.0.0.1:{port} app:app' \
+#       --server asgi='uvicorn asgi:application --workers 4 --port {port}'
+#----------------------------------------------------------------------------#
+
+import argparse
+import asyncio
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import time
+
+from bench.run import DEFAULT_DATABASE, percentile
+
+
+SERVERS = [
+    ('wsgi', 'gunicorn --workers 4 --threads 16 --bind 127.0.0.1:{port} app:app'),
+    ('asgi', 'uvicorn asgi:application --workers 4 --port {port} --no-access-log'),
+]
+
+
+def paths(venues, artists):
+    # Request mix: listing pages, detail pages and API reads.
+    def pick(rng):
+        return rng.choice([
+            '/venues',
+            '/shows',
+            '/venues/%d' % rng.randint(1, venues),
+            '/artists/%d' % rng.randint(1, artists),
+            '/api/v1/venues/%d' % rng.randint(1, venues),
+            '/api/v1/shows?when=upcoming',
+        ])
+    return pick
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('Server exited with status %d' % process.returncode)
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Server did not listen on port %d' % port)
+
+
+async def read_response(reader):
+    # Status code of one HTTP/1.1 response; the body is read and dropped.
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def connection_loop(port, pick, rng, deadline, latencies, errors):
+    reader = writer = None
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(('GET %s HTTP/1.1\r\nHost: localhost\r\nAccept-Encoding: gzip\r\n\r\n' % pick(rng)).encode())
+            status = await read_response(reader)
+            if status >= 400:
+                errors.append(status)
+            else:
+                latencies.append(1000 * (time.perf_counter() - started))
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def drive(port, pick, connections, duration, seed):
+    latencies, errors = [], []
+    deadline = time.time() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        connection_loop(port, pick, random.Random(seed + i), deadline, latencies, errors)
+        for i in range(connections)
+    ])
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_server(name, command, database, pick, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database)
+    process = subprocess.Popen(shlex.split(command.format(port=port)), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, process)
+        # Warm up (imports, connection pools, caches) before measuring.
+        asyncio.run(drive(port, pick, min(args.connections, 20), 2, args.seed))
+        latencies, errors, elapsed = asyncio.run(drive(port, pick, args.connections, args.duration, args.seed))
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 1) if latencies else None,
+        'requests': len(latencies),
+        'errors': len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI serving under load.')
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE),
+                        help='SQLAlchemy URL of a scratch database (its data is replaced).')
+    parser.add_argument('--scale', default='10k', help='1k, 10k, 100k, 1m or a number of shows.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in the database.')
+    parser.add_argument('--connections', type=int, default=500, help='Concurrent keep-alive connections.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per server.')
+    parser.add_argument('--server', action='append', metavar='NAME=COMMAND',
+                        help='Server command with a {port} placeholder (default: gunicorn and uvicorn).')
+    args = parser.parse_args(argv)
+
+    os.environ['DATABASE_URL'] = args.database
+    from app import app
+    from bench import datagen
+    from extensions import db
+    from models import Venue, Artist
+
+    with app.app_context():
+        if args.skip_seed:
+            counts = tuple(db.session.query(db.func.max(model.id)).scalar() or 0 for model in (Venue, Artist))
+        else:
+            counts = datagen.generate(args.scale, args.seed)[:2]
+        db.session.remove()
+        db.engine.dispose()
+
+    servers = [server.split('=', 1) for server in args.server] if args.server else SERVERS
+    pick = paths(*counts)
+    print('%-8s %10s %9s %9s %9s %9s %7s' % ('server', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'requests', 'errors'))
+    for name, command in servers:
+        row = run_server(name, command, args.database, pick, args)
+        print('%-8s %10.1f %9s %9s %9s %9d %7d' % (
+            name, row['requests_per_second'], row['p50_ms'], row['p95_ms'], row['p99_ms'],
+            row['requests'], row['errors']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#----------------------------------------------------------------------------#
+# Route benchmark.
+#
+# Seeds a database with bench.datagen, drives every route of app.py through
+# the Flask test client and reports p50/p95/p99 latency, SQL statements per
+# request and peak RSS per route. Results can be saved as a baseline and
+# later runs compared against it (exit status 1 on regression).
+#
+#   python -m bench.run --scale 1k
+#   python -m bench.run --scale 100k --database postgresql://localhost/fyyur_bench
+#   python -m bench.run --scale 1k --save-baseline bench/baseline.json
+#   python -m bench.run --scale 1k --baseline bench/baseline.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench.db')
+
+VENUE_FORM = {
+    'name': 'Benchmark Venue', 'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+    'phone': '512-555-0100', 'image_link': 'https://images.example.com/v.jpg',
+    'genres': ['Jazz', 'Blues'], 'facebook_link': 'https://www.facebook.com/bench',
+    'website': 'https://bench.example.com', 'seeking_talent': 'Yes',
+    'seeking_description': 'Benchmark',
+}
+ARTIST_FORM = {
+    'name': 'Benchmark Artist', 'city': 'Austin', 'state': 'TX', 'phone': '512-555-0101',
+    'image_link': 'https://images.example.com/a.jpg', 'genres': ['Jazz'],
+    'facebook_link': 'https://www.facebook.com/bench', 'website': 'https://bench.example.com',
+    'seeking_venue': 'Yes', 'seeking_description': 'Benchmark',
+}
+
+
+def route_plan(venues, artists, shows):
+    # endpoint -> function(rng, iteration) returning (method, url, form data).
+    # Read routes pick random ids; destructive routes walk down from the
+    # highest ids so every iteration deletes a different row.
+    def get(url):
+        return lambda rng, i: ('GET', url, None)
+
+    return [
+        ('index', get('/')),
+        ('venues', get('/venues')),
+        ('artists', get('/artists')),
+        ('shows', get('/shows')),
+        ('show_venue', lambda rng, i: ('GET', '/venues/%d' % rng.randint(1, venues), None)),
+        ('show_artist', lambda rng, i: ('GET', '/artists/%d' % rng.randint(1, artists), None)),
+        ('search_venues', lambda rng, i: ('POST', '/venues/search', {'search_term': rng.choice(['hop', 'the blue', 'austin', 'jazz', 'a'])})),
+        ('search_artists', lambda rng, i: ('POST', '/artists/search', {'search_term': rng.choice(['band', 'echo', 'new york', 'rock', 'a'])})),
+        ('create_venue_form', get('/venues/create')),
+        ('create_artist_form', get('/artists/create')),
+        ('create_shows', get('/shows/create')),
+        ('edit_venue', lambda rng, i: ('GET', '/venues/%d/edit' % rng.randint(1, venues), None)),
+        ('edit_artist', lambda rng, i: ('GET', '/artists/%d/edit' % rng.randint(1, artists), None)),
+        ('create_venue_submission', lambda rng, i: ('POST', '/venues/create', VENUE_FORM)),
+        ('create_artist_submission', lambda rng, i: ('POST', '/artists/create', ARTIST_FORM)),
+        ('create_show_submission', lambda rng, i: ('POST', '/shows/create', {
+            'venue_id': str(rng.randint(1, venues)), 'artist_id': str(rng.randint(1, artists)),
+            'start_time': '2030-01-01 20:00:00'})),
+        ('edit_venue_submission', lambda rng, i: ('POST', '/venues/%d/edit' % rng.randint(1, venues), VENUE_FORM)),
+        ('edit_artist_submission', lambda rng, i: ('POST', '/artists/%d/edit' % rng.randint(1, artists), ARTIST_FORM)),
+        ('delete_show', lambda rng, i: ('GET', '/shows/%d/del' % (shows - i), None)),
+        ('delete_venue', lambda rng, i: ('GET', '/venues/%d/del' % (venues - i), None)),
+        ('delete_artist', lambda rng, i: ('GET', '/artists/%d/del' % (artists - i), None)),
+        ('export_data', lambda rng, i: ('GET', '/exports/%s?format=%s' % (
+            rng.choice(['venue', 'artist', 'show']), rng.choice(['ndjson', 'csv'])), None)),
+        ('api_venues', lambda rng, i: ('GET', '/api/v1/venues?ids=%s&fields=name,city,upcoming_shows_count' % ','.join(
+            str(rng.randint(1, venues)) for _ in range(20)), None)),
+        ('api_venue', lambda rng, i: ('GET', '/api/v1/venues/%d' % rng.randint(1, venues), None)),
+        ('api_venue_areas', get('/api/v1/venues/areas')),
+        ('api_search_venues', lambda rng, i: ('GET', '/api/v1/venues/search?q=%s' % rng.choice(['hop', 'austin', 'jazz']), None)),
+        ('api_artists', get('/api/v1/artists?limit=100')),
+        ('api_artist', lambda rng, i: ('GET', '/api/v1/artists/%d?fields=name,upcoming_shows' % rng.randint(1, artists), None)),
+        ('api_search_artists', lambda rng, i: ('GET', '/api/v1/artists/search?q=%s' % rng.choice(['band', 'echo', 'rock']), None)),
+        ('api_shows', get('/api/v1/shows?when=upcoming&limit=100')),
+        ('api_venues_free_slots', lambda rng, i: ('GET', '/api/v1/venues/free-slots?ids=%s&days=30' % ','.join(
+            str(rng.randint(1, venues)) for _ in range(20)), None)),
+        ('api_autocomplete_venues', lambda rng, i: ('GET', '/api/v1/venues/autocomplete?q=%s' % rng.choice(
+            ['the b', 'the echo', 'the neon r']), None)),
+        ('api_autocomplete_artists', lambda rng, i: ('GET', '/api/v1/artists/autocomplete?q=%s' % rng.choice(
+            ['b', 'crim', 'velvet o']), None)),
+        ('metrics', get('/metrics')),
+    ]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+
+def run(app, plan, requests, seed):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+    event.listen(Engine, 'before_cursor_execute', count)
+
+    client = app.test_client()
+    rng = random.Random(seed)
+    results = {}
+    covered = set()
+    try:
+        for endpoint, make_request in plan:
+            covered.add(endpoint)
+            latencies, queries, statuses = [], [], set()
+            for i in range(requests):
+                method, url, data = make_request(rng, i)
+                counter[0] = 0
+                started = time.perf_counter()
+                response = client.open(url, method=method, data=data)
+                response.get_data()
+                latencies.append(1000 * (time.perf_counter() - started))
+                queries.append(counter[0])
+                statuses.add(response.status_code)
+            results[endpoint] = {
+                'p50_ms': round(percentile(latencies, 0.50), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'p99_ms': round(percentile(latencies, 0.99), 3),
+                'queries_per_request': round(sum(queries) / float(len(queries)), 2),
+                'max_queries': max(queries),
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'statuses': sorted(statuses),
+            }
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+
+    # Plan entries are named after the view, without the blueprint.
+    routed = {rule.endpoint.rpartition('.')[2] for rule in app.url_map.iter_rules()} - {'static'}
+    return results, sorted(routed - covered)
+
+
+def compare(results, baseline, tolerance):
+    # Regressions: more SQL statements per request than the baseline, or a
+    # p95 latency more than `tolerance` (fraction) above it.
+    regressions = []
+    for endpoint, base in sorted(baseline['results'].items()):
+        current = results.get(endpoint)
+        if current is None:
+            continue
+        if current['max_queries'] > base['max_queries']:
+            regressions.append('%s: %d queries per request (baseline %d)' % (
+                endpoint, current['max_queries'], base['max_queries']))
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append('%s: p95 %.1fms (baseline %.1fms)' % (endpoint, current['p95_ms'], base['p95_ms']))
+    return regressions
+
+
+def print_table(results):
+    print('%-26s %9s %9s %9s %9s %7s %9s' % ('endpoint', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'max q', 'rss MB'))
+    for endpoint, row in results.items():
+        print('%-26s %9.2f %9.2f %9.2f %9.2f %7d %9.1f' % (
+            endpoint, row['p50_ms'], row['p95_ms'], row['p99_ms'],
+            row['queries_per_request'], row['max_queries'], row['peak_rss_mb']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every Fyyur route.')
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE),
+                        help='SQLAlchemy URL of a scratch database (its data is replaced).')
+    parser.add_argument('--scale', default='1k', help='1k, 10k, 100k, 1m or a number of shows.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=50, help='Requests per route.')
+    parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in the database.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--baseline', help='Compare against this results file.')
+    parser.add_argument('--save-baseline', help='Write the results as a new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown (fraction).')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the page cache (measure rendering).')
+    args = parser.parse_args(argv)
+
+    os.environ['DATABASE_URL'] = args.database
+    # The route plan reads the metrics page too.
+    os.environ.setdefault('METRICS_ENDPOINT', '/metrics')
+    from app import app
+    from bench import datagen
+    from extensions import db
+    from models import Venue, Artist, Show
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['QUERY_BUDGET_ASSERT'] = False
+    if args.no_cache:
+        app.config['CACHE_ENABLED'] = False
+    app.app_context().push()
+
+    started = time.perf_counter()
+    if args.skip_seed:
+        counts = tuple(db.session.query(db.func.max(model.id)).scalar() or 0
+                       for model in (Venue, Artist, Show))
+    else:
+        counts = datagen.generate(args.scale, args.seed)
+    print('Seeded %d venues, %d artists, %d shows in %.1fs (%s)' % (
+        counts + (time.perf_counter() - started, db.engine.dialect.name)))
+    db.session.remove()
+
+    results, uncovered = run(app, route_plan(*counts), args.requests, args.seed)
+    print_table(results)
+    if uncovered:
+        print('Routes not benchmarked: %s' % ', '.join(uncovered))
+
+    report = {
+        'scale': args.scale,
+        'seed': args.seed,
+        'requests': args.requests,
+        'dialect': db.engine.dialect.name,
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print('REGRESSION %s' % line)
+        if regressions:
+            return 1
+        print('No regressions against %s.' % args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
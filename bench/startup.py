@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------#
+# Cold start benchmark.
+#
+# Starts fresh interpreters and measures, for each, the time to import the
+# app (create_app included), to answer the first request and the wall time
+# of the whole process. The default database URL points at a closed port:
+# booting must not connect to the database, and GET / does not query it.
+#
+#   python -m bench.startup --runs 20
+#   python -m bench.startup --imports 15     # slowest modules (-X importtime)
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNREACHABLE_DATABASE = 'postgresql://fyyur@127.0.0.1:9/fyyur'
+
+PROBE = '''
+import json, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+response = app.test_client().get('/')
+response.get_data()
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': 1000 * (imported - started),
+    'first_request_ms': 1000 * (served - imported),
+    'status': response.status_code,
+}))
+'''
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def environment(database):
+    env = dict(os.environ, DATABASE_URL=database)
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    return env
+
+
+def cold_start(database):
+    started = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=ROOT, env=environment(database),
+                                     stderr=subprocess.DEVNULL)
+    sample = json.loads(output.decode().strip().splitlines()[-1])
+    sample['process_ms'] = 1000 * (time.perf_counter() - started)
+    return sample
+
+
+def slowest_imports(database, count):
+    # (cumulative microseconds, module) of the slowest top-level imports of app.
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                             cwd=ROOT, env=environment(database), stderr=subprocess.PIPE,
+                             stdout=subprocess.DEVNULL, check=True)
+    imports = []
+    for line in process.stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), module.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the cold start of the Fyyur app.')
+    parser.add_argument('--database', default=UNREACHABLE_DATABASE,
+                        help='DATABASE_URL given to the app (default: unreachable).')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--imports', type=int, default=0, help='Also list the N slowest imports.')
+    args = parser.parse_args(argv)
+
+    samples = [cold_start(args.database) for _ in range(args.runs)]
+    print('%-18s %9s %9s %9s' % ('', 'p50 ms', 'p95 ms', 'max ms'))
+    for field in ('import_ms', 'first_request_ms', 'process_ms'):
+        values = [sample[field] for sample in samples]
+        print('%-18s %9.1f %9.1f %9.1f' % (
+            field[:-3], percentile(values, 0.50), percentile(values, 0.95), max(values)))
+    statuses = sorted({sample['status'] for sample in samples})
+    print('GET / status: %s' % ', '.join(str(status) for status in statuses))
+
+    if args.imports:
+        print()
+        for cumulative, module in slowest_imports(args.database, args.imports):
+            print('%9.1f ms  %s' % (cumulative / 1000.0, module))
+    return 0 if statuses == [200] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
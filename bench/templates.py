@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Template render timings, cold versus warm.
+#
+# For every template: compiling it from source (what a fresh worker did on
+# the first hit), loading it from the bytecode cache (a fresh worker with
+# TEMPLATE_CACHE_DIR filled), and its first and a warm render. Templates
+# are rendered with placeholders (see templating.py), so no database is
+# needed.
+#
+#   python -m bench.templates
+#----------------------------------------------------------------------------#
+
+import argparse
+import sys
+import tempfile
+import time
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return 1000 * (time.perf_counter() - started)
+
+
+def measure(app, names, bytecode_cache):
+    import templating
+
+    env = app.jinja_env
+    rows = []
+    for name in names:
+        env.cache.clear()
+        env.bytecode_cache = None
+        compile_ms = timed(lambda: env.get_template(name))
+
+        env.cache.clear()
+        env.bytecode_cache = bytecode_cache
+        env.get_template(name)
+        env.cache.clear()
+        load_ms = timed(lambda: env.get_template(name))
+
+        errors = []
+        first_ms = timed(lambda: errors.append(templating.render(app, name)))
+        warm_ms = timed(lambda: templating.render(app, name))
+        rows.append((name, compile_ms, load_ms, first_ms, warm_ms, errors[0]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cold and warm template timings.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per template; the median is reported.')
+    args = parser.parse_args(argv)
+
+    from jinja2 import FileSystemBytecodeCache
+    import templating
+    from app import app
+
+    names = templating.template_names(app)
+    with tempfile.TemporaryDirectory() as directory, app.test_request_context('/'):
+        runs = [measure(app, names, FileSystemBytecodeCache(directory)) for _ in range(args.repeat)]
+
+    print('%-28s %10s %10s %10s %10s' % ('template', 'compile', 'bytecode', '1st render', 'warm'))
+    totals = [0.0] * 4
+    for index, name in enumerate(names):
+        samples = [run[index] for run in runs]
+        medians = [sorted(sample[column] for sample in samples)[len(samples) // 2] for column in range(1, 5)]
+        totals = [total + value for total, value in zip(totals, medians)]
+        error = samples[0][5]
+        print('%-28s %10.2f %10.2f %10.2f %10.2f%s' % (
+            (name,) + tuple(medians) + ('  (%s)' % error if error else '',)))
+    print('%-28s %10.2f %10.2f %10.2f %10.2f' % (('total',) + tuple(totals)))
+    print('Milliseconds. A cold worker paid compile + 1st render; with the bytecode cache, '
+          'bytecode + 1st render; after warm-up, warm.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
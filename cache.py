@@ -0,0 +1,226 @@
+#----------------------------------------------------------------------------#
+# Two-tier page and fragment cache.
+#
+# Tier 1 is a bounded in-process LRU, tier 2 an optional shared store
+# (Redis, or the in-memory stand-in 'memory://' for tests) so that all
+# workers see the same entries and invalidations.
+#
+# Entries are tagged ('venues', 'venue:3', ...). Invalidating a tag bumps
+# its version; an entry is only served while the versions it was stored
+# with are still current, so invalidation is precise and works across
+# workers without deleting keys.
+#
+# Config:
+#   CACHE_ENABLED       turn the cache off entirely.
+#   CACHE_LOCAL_SIZE    max entries in the in-process LRU.
+#   CACHE_TTL           seconds an entry may be served.
+#   CACHE_SHARED_URL    None, 'memory://' or 'redis://host:port/db'.
+#----------------------------------------------------------------------------#
+
+import functools
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, make_response, request, session
+
+
+class LRUCache(object):
+    # Thread-safe LRU with a maximum number of entries.
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class MemorySharedCache(object):
+    # Local stand-in for the shared tier with the subset of the Redis API
+    # the page cache uses.
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.values.get(key)
+            if value is None or (value[1] and value[1] < time.time()):
+                return None
+            return value[0]
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.values[key] = (value, time.time() + ex if ex else None)
+
+    def incr(self, key):
+        with self.lock:
+            value = int(self.values.get(key, (0, None))[0]) + 1
+            self.values[key] = (value, None)
+            return value
+
+    def flushdb(self):
+        with self.lock:
+            self.values.clear()
+
+
+def create_shared_cache(url):
+    if not url:
+        return None
+    if url == 'memory://':
+        return MemorySharedCache()
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('CACHE_SHARED_URL %s needs the redis package' % url)
+    return redis.StrictRedis.from_url(url)
+
+
+class PageCache(object):
+
+    def __init__(self, app=None):
+        self.local = None
+        self.shared = None
+        self.versions = {}
+        self.versions_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_ENABLED', True)
+        app.config.setdefault('CACHE_LOCAL_SIZE', 512)
+        app.config.setdefault('CACHE_TTL', 60)
+        app.config.setdefault('CACHE_SHARED_URL', None)
+        self.local = LRUCache(app.config['CACHE_LOCAL_SIZE'])
+        self.shared = create_shared_cache(app.config['CACHE_SHARED_URL'])
+        app.extensions['page_cache'] = self
+
+    #  Tag versions
+    #  ----------------------------------------------------------------
+
+    def tag_versions(self, tags):
+        if self.shared is not None:
+            values = self.shared.mget(['fyyur:tag:' + tag for tag in tags])
+            return tuple(int(value or 0) for value in values)
+        with self.versions_lock:
+            return tuple(self.versions.get(tag, 0) for tag in tags)
+
+    def invalidate(self, *tags):
+        for tag in set(tags):
+            if self.shared is not None:
+                self.shared.incr('fyyur:tag:' + tag)
+            else:
+                with self.versions_lock:
+                    self.versions[tag] = self.versions.get(tag, 0) + 1
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.flushdb()
+
+    #  Entries
+    #  ----------------------------------------------------------------
+
+    def lookup(self, key):
+        # Entry dict for key if it is fresh and none of its tags changed.
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            data = self.shared.get('fyyur:entry:' + key)
+            if data is not None:
+                entry = pickle.loads(data)
+                self.local.set(key, entry)
+        if entry is None or entry['expires'] < time.time():
+            return None
+        if self.tag_versions(entry['tags']) != entry['versions']:
+            return None
+        return entry
+
+    def store(self, key, tags, value, versions=None):
+        ttl = current_app.config['CACHE_TTL']
+        entry = {
+            'value': value,
+            'tags': tuple(tags),
+            'versions': versions if versions is not None else self.tag_versions(tags),
+            'stored': time.time(),
+            'expires': time.time() + ttl,
+        }
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set('fyyur:entry:' + key, pickle.dumps(entry), ex=ttl)
+        return entry
+
+    def fragment(self, key, tags, build):
+        # Cached result of build() (any picklable value).
+        if not current_app.config['CACHE_ENABLED']:
+            return build()
+        key = 'fragment:' + key
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry['value']
+        # Read the versions before building so a concurrent write makes
+        # the stored entry stale instead of hiding the write.
+        versions = self.tag_versions(tags)
+        value = build()
+        self.store(key, tags, value, versions)
+        return value
+
+    def page(self, tags):
+        # Decorator caching a GET view's response body. `tags` is a function
+        # of the view arguments returning the tags the page depends on.
+        # Responses carry ETag and Last-Modified, and conditional requests
+        # are answered with 304 straight from the cache.
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**view_args):
+                if (not current_app.config['CACHE_ENABLED'] or request.method != 'GET'
+                        or session.get('_flashes')):
+                    return view(**view_args)
+
+                # g.cache_variant: per-request rendering choices such as the
+                # date locale (see formatting.py).
+                key = 'page:' + request.full_path + g.get('cache_variant', '')
+                page_tags = tags(**view_args)
+                entry = self.lookup(key)
+                if entry is None:
+                    versions = self.tag_versions(page_tags)
+                    response = make_response(view(**view_args))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    entry = self.store(key, page_tags, {
+                        'body': body,
+                        'mimetype': response.mimetype,
+                        'etag': hashlib.sha1(body).hexdigest(),
+                    }, versions)
+
+                page = entry['value']
+                response = current_app.response_class(page['body'], mimetype=page['mimetype'])
+                response.set_etag(page['etag'])
+                response.last_modified = int(entry['stored'])
+                response.headers['Cache-Control'] = 'no-cache'
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
@@ -0,0 +1,50 @@
+#----------------------------------------------------------------------------#
+# Response compression.
+#
+# gzip always, brotli when the optional `brotli` package is installed; the
+# encoding is negotiated from Accept-Encoding. Small, streamed and already
+# encoded responses are left alone.
+#----------------------------------------------------------------------------#
+
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings():
+    # Preferred first.
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings):
+    # Best encoding allowed by a werkzeug Accept object, or None.
+    for encoding in available_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level)
+    raise ValueError('Unknown encoding: %s' % encoding)
+
+
+def compress_response(response, accept_encodings, min_size=500, level=6):
+    # Compress response in place when the client accepts it and it pays off.
+    if (response.is_streamed or response.direct_passthrough
+            or response.status_code != 200 or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = negotiate(accept_encodings)
+    if encoding is None or len(data) < min_size:
+        return response
+    response.set_data(compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,209 @@
+#----------------------------------------------------------------------------#
+# Engine configuration, read replicas and statement timeouts.
+#
+# RoutingSQLAlchemy is Flask-SQLAlchemy with:
+#   - pool settings from config (see config.py, all environment driven),
+#   - replica routing: views decorated with @db.read_only read from one of
+#     DATABASE_REPLICA_URLS; writes, and reads of a client that wrote in
+#     the last REPLICA_STICKY_SECONDS (read-your-writes), use the primary,
+#   - per-endpoint statement timeouts (PostgreSQL, SET LOCAL per
+#     transaction),
+#   - pool gauges and timeout counters on the metrics page.
+#----------------------------------------------------------------------------#
+
+import functools
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import create_engine, event, exc, orm
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+
+PRIMARY_COOKIE = 'fyyur_primary'
+QUERY_CANCELED = '57014'
+
+
+def engine_options(url, config):
+    # create_engine() options for url from the DATABASE_POOL_* settings.
+    # SQLite keeps Flask-SQLAlchemy's pool choice.
+    options = {
+        'pool_pre_ping': config['DATABASE_POOL_PRE_PING'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+    }
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update({
+            'pool_size': config['DATABASE_POOL_SIZE'],
+            'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+            'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+        })
+    return options
+
+
+def statement_timeout():
+    # Milliseconds allowed per statement for the current request (0 = no
+    # limit). CLI commands and background work are not limited.
+    if not has_request_context():
+        return 0
+    config = current_app.config
+    return config['STATEMENT_TIMEOUTS'].get(request.endpoint, config['STATEMENT_TIMEOUT'])
+
+
+def set_statement_timeout(connection, timeout):
+    # Limit the statements of connection's current transaction. Sent on
+    # the DBAPI cursor so it does not count as a query of the request.
+    if timeout and connection.dialect.name == 'postgresql':
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute('SET LOCAL statement_timeout = %d' % int(timeout))
+        finally:
+            cursor.close()
+
+
+def pool_status(engine):
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'overflow': max(pool.overflow(), 0),
+        'capacity': capacity,
+        'saturation': pool.checkedout() / float(capacity) if capacity else 0.0,
+    }
+
+
+class RoutingSession(SignallingSession):
+
+    def __init__(self, db, **options):
+        self.db = db
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing:
+            replica = self.db.request_replica()
+            if replica is not None:
+                return replica
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def on_after_begin(session, transaction, connection):
+    set_statement_timeout(connection, statement_timeout())
+
+
+def on_write(session, *args):
+    # The client must read its own writes: primary for the rest of the
+    # request and, through a cookie, for the next few seconds. Commits
+    # count too, as bulk and Core statements are not flushed.
+    if has_request_context() and not g.get('db_read_only'):
+        g.db_wrote = True
+
+event.listen(RoutingSession, 'after_flush', on_write)
+event.listen(RoutingSession, 'after_commit', on_write)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def __init__(self, app=None, **kwargs):
+        self.replicas = []
+        self.counters = {'pool_timeouts': 0, 'statement_timeouts': 0}
+        self.counters_lock = threading.Lock()
+        SQLAlchemy.__init__(self, app, **kwargs)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app):
+        app.config.setdefault('DATABASE_REPLICA_URLS', [])
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+        app.config.setdefault('STATEMENT_TIMEOUT', 0)
+        app.config.setdefault('STATEMENT_TIMEOUTS', {})
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+            engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config),
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        SQLAlchemy.init_app(self, app)
+        self.replicas = [create_engine(url, **engine_options(url, app.config))
+                         for url in app.config['DATABASE_REPLICA_URLS']]
+
+        @app.after_request
+        def pin_primary(response):
+            if g.get('db_wrote'):
+                sticky = app.config['REPLICA_STICKY_SECONDS']
+                response.set_cookie(PRIMARY_COOKIE, str(int(time.time() + sticky)), max_age=sticky, httponly=True)
+            return response
+
+        app.register_error_handler(exc.TimeoutError, self.pool_timeout)
+        app.register_error_handler(exc.OperationalError, self.operational_error)
+
+        metrics = app.extensions.get('metrics')
+        if metrics is not None:
+            metrics.add_collector(self.prometheus)
+
+    #  Routing
+    #  ----------------------------------------------------------------
+
+    def read_only(self, view):
+        # Decorator for views that only read: they may use a replica.
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.db_read_only = True
+            return view(*args, **kwargs)
+        return wrapper
+
+    def request_replica(self):
+        # Replica engine for the current request, or None for the primary.
+        if not self.replicas or not has_request_context() or not g.get('db_read_only') or g.get('db_wrote'):
+            return None
+        pinned_until = request.cookies.get(PRIMARY_COOKIE, '')
+        if pinned_until.isdigit() and int(pinned_until) > time.time():
+            return None
+        if 'db_replica' not in g:
+            g.db_replica = random.choice(self.replicas)
+        return g.db_replica
+
+    #  Errors and metrics
+    #  ----------------------------------------------------------------
+
+    def count(self, name):
+        with self.counters_lock:
+            self.counters[name] += 1
+
+    def pool_timeout(self, error):
+        self.count('pool_timeouts')
+        current_app.logger.warning('Database pool exhausted on %s: %s', request.endpoint, error)
+        return 'Service temporarily unavailable.', 503, {'Retry-After': '1'}
+
+    def operational_error(self, error):
+        if getattr(error.orig, 'pgcode', None) != QUERY_CANCELED:
+            raise error
+        self.count('statement_timeouts')
+        current_app.logger.warning('Statement timeout on %s', request.endpoint)
+        return 'The request took too long.', 503, {'Retry-After': '5'}
+
+    def prometheus(self):
+        lines = []
+        engines = [('primary', self.engine)] + [('replica%d' % i, engine) for i, engine in enumerate(self.replicas)]
+        statuses = [(name, pool_status(engine)) for name, engine in engines]
+        for field, doc in (('size', 'Connections kept in the pool.'),
+                           ('checked_out', 'Connections in use.'),
+                           ('overflow', 'Connections open beyond the pool size.'),
+                           ('capacity', 'Most connections the pool will open.'),
+                           ('saturation', 'Share of the capacity in use.')):
+            metric = 'fyyur_db_pool_%s' % field
+            lines.append('# HELP %s %s' % (metric, doc))
+            lines.append('# TYPE %s gauge' % metric)
+            for name, status in statuses:
+                if status is not None:
+                    lines.append('%s{engine="%s"} %s' % (metric, name, status[field]))
+        for name, doc in (('pool_timeouts', 'Requests that waited too long for a connection.'),
+                          ('statement_timeouts', 'Statements cancelled by the statement timeout.')):
+            metric = 'fyyur_db_%s_total' % name
+            lines.append('# HELP %s %s' % (metric, doc))
+            lines.append('# TYPE %s counter' % metric)
+            lines.append('%s %d' % (metric, self.counters[name]))
+        return lines
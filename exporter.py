@@ -0,0 +1,97 @@
+#----------------------------------------------------------------------------#
+# Serializers for bulk exports.
+#
+# Rows come from keyset-ordered (updated_at, id) queries (query_export in
+# queries.py) and are written as NDJSON or CSV in chunks of lines, so a
+# response or file is produced with constant memory. Every record carries
+# its cursor token: passing the last one received as `after` resumes the
+# export right after it, and `since` restricts an export to rows changed
+# since a moment.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import datetime
+
+
+FORMATS = ('ndjson', 'csv')
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Exported columns, per kind. Multi-valued fields are lists in NDJSON and
+# ';'-separated in CSV, as read by importer.
+FIELDS = {
+    'venue': ('id', 'name', 'city', 'state', 'address', 'phone', 'image_link', 'genres',
+              'facebook_link', 'website', 'seeking_talent', 'seeking_description', 'updated_at'),
+    'artist': ('id', 'name', 'city', 'state', 'phone', 'image_link', 'genres',
+               'facebook_link', 'website', 'seeking_venue', 'seeking_description', 'updated_at'),
+    'show': ('id', 'venue_id', 'artist_id', 'start_time', 'end_time', 'updated_at'),
+}
+CURSOR_FIELD = 'cursor'
+
+
+def encode_cursor(updated_at, row_id):
+    return '%s_%d' % (updated_at.isoformat(), row_id)
+
+
+def decode_cursor(cursor):
+    # Inverse of encode_cursor; raises ValueError on malformed input.
+    updated_at, row_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(updated_at), int(row_id)
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def records(kind, rows):
+    # Query rows (in FIELDS order) -> dicts with JSON-ready values and the
+    # cursor token of the row.
+    fields = FIELDS[kind]
+    for row in rows:
+        record = dict(zip(fields, (export_value(value) for value in row)))
+        record[CURSOR_FIELD] = encode_cursor(row[-1], row[0])
+        yield record
+
+
+def ndjson_chunks(kind, rows, chunk_size):
+    lines = []
+    for record in records(kind, rows):
+        lines.append(json.dumps(record) + '\n')
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def csv_chunks(kind, rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS[kind] + (CURSOR_FIELD,))
+    writer.writeheader()
+    count = 0
+    for record in records(kind, rows):
+        if isinstance(record.get('genres'), list):
+            record['genres'] = ';'.join(record['genres'])
+        writer.writerow(record)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def chunks(kind, rows, fmt, chunk_size):
+    # Text chunks of the export of rows in format fmt.
+    if fmt == 'ndjson':
+        return ndjson_chunks(kind, rows, chunk_size)
+    if fmt == 'csv':
+        return csv_chunks(kind, rows, chunk_size)
+    raise ValueError('Unknown export format: %s' % fmt)
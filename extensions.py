@@ -0,0 +1,15 @@
+#----------------------------------------------------------------------------#
+# Extensions.
+#
+# Created unbound and attached to the app by app.create_app, so models and
+# queries can import them without an application.
+#----------------------------------------------------------------------------#
+
+from cache import PageCache
+from images import ImageProxy
+from database import RoutingSQLAlchemy
+
+
+db = RoutingSQLAlchemy()
+page_cache = PageCache()
+image_proxy = ImageProxy()
@@ -1,3 +1,5 @@
+import os
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
@@ -6,13 +8,48 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def bench(scale="1k", database=""):
+    # fab bench:scale=100k,database=postgresql://localhost/fyyur_bench
+    option = " --database '{}'".format(database) if database else ""
+    local("python -m bench.run --scale {}{}".format(scale, option))
+
+
+def load_test(scale="10k", connections="500", database=""):
+    # WSGI (gunicorn) vs ASGI (uvicorn) requests/s and tail latency.
+    option = " --database '{}'".format(database) if database else ""
+    local("python -m bench.load --scale {} --connections {}{}".format(scale, connections, option))
+
+
+def explain(scale="100k", database=""):
+    # Every read route must query through an index.
+    option = " --database '{}'".format(database) if database else ""
+    local("python -m bench.explain --scale {}{}".format(scale, option))
+
+
+def startup(runs="20"):
+    # Cold start: import, first request and process time.
+    local("python -m bench.startup --runs {} --imports 15".format(runs))
+
+
+def bench_baseline(scale="1k"):
+    local("python -m bench.run --scale {} --save-baseline bench/baseline.json".format(scale))
+
+
+def bench_check(scale="1k"):
+    # Compares against the baseline saved by `fab bench_baseline`.
+    if not os.path.exists("bench/baseline.json"):
+        abort("No baseline: run `fab bench_baseline` first.")
+    with settings(warn_only=True):
+        result = local("python -m bench.run --scale {} --baseline bench/baseline.json".format(scale))
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -40,7 +77,7 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python -m bench.run --scale 1k --requests 10"
     )
 
 
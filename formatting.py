@@ -0,0 +1,126 @@
+#----------------------------------------------------------------------------#
+# The `datetime` template filter.
+#
+# Values are datetime objects (strings are still accepted and parsed).
+# The Babel Locale and the compiled pattern are looked up once per
+# (locale, format) and formatted values are memoized in a bounded LRU:
+# /shows renders the same few hundred start times over and over.
+#
+# Config:
+#   DATETIME_LOCALE      Babel locale (None: the LC_TIME of the process).
+#   DATETIME_TIMEZONE    zone naive values are shown in (None: as stored).
+#   DATETIME_LOCALES     locales chosen per request from Accept-Language
+#                        (empty: always DATETIME_LOCALE, the fast path).
+#   DATETIME_CACHE_SIZE  max memoized values.
+#
+# With DATETIME_LOCALES, the locale comes from Accept-Language and the
+# timezone from the `tz` cookie (g.datetime_locale, g.datetime_timezone);
+# both go in g.cache_variant so cached pages are kept per locale and
+# timezone.
+#----------------------------------------------------------------------------#
+
+import functools
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from cache import LRUCache
+
+
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+TIMEZONE_COOKIE = 'tz'
+
+
+@functools.lru_cache(maxsize=64)
+def compiled(locale, format):
+    # (Locale, DateTimePattern) for a locale identifier and a format name
+    # or Babel pattern. Babel is only imported once a date is formatted.
+    from babel import Locale
+    from babel.dates import LC_TIME, parse_pattern
+    return Locale.parse(locale or LC_TIME), parse_pattern(PATTERNS.get(format, format))
+
+
+@functools.lru_cache(maxsize=64)
+def timezone(name):
+    from babel.dates import get_timezone
+    return get_timezone(name)
+
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        import dateutil.parser
+        return dateutil.parser.parse(value)
+
+
+class DateTimeFormatter(object):
+    # The filter of one app. Without DATETIME_LOCALES it never touches the
+    # request: locale and timezone are fixed.
+
+    def __init__(self, app):
+        self.locale = app.config['DATETIME_LOCALE']
+        self.zone = app.config['DATETIME_TIMEZONE']
+        self.per_request = bool(app.config['DATETIME_LOCALES'])
+        self.memo = LRUCache(app.config['DATETIME_CACHE_SIZE'])
+
+    def __call__(self, value, format='medium'):
+        if self.per_request:
+            locale, zone = g.get('datetime_locale') or self.locale, g.get('datetime_timezone') or self.zone
+        else:
+            locale, zone = self.locale, self.zone
+        key = (value, format, locale, zone)
+        formatted = self.memo.get(key)
+        if formatted is None:
+            formatted = format_datetime(value, format, locale, zone)
+            self.memo.set(key, formatted)
+        return formatted
+
+
+def format_datetime(value, format='medium', locale=None, zone=None):
+    # Uncached formatting of a datetime (or date string).
+    babel_locale, pattern = compiled(locale, format)
+    date = to_datetime(value)
+    if zone is not None:
+        # Naive values are taken as UTC.
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone('UTC'))
+        date = date.astimezone(timezone(zone))
+    return pattern.apply(date, babel_locale)
+
+
+def preload(app):
+    # Import Babel and compile the named formats for the default locale.
+    for format in PATTERNS:
+        compiled(app.config['DATETIME_LOCALE'], format)
+
+
+def select_locale():
+    # Per-request locale and timezone, only when DATETIME_LOCALES is set.
+    config = current_app.config
+    g.datetime_locale = request.accept_languages.best_match(config['DATETIME_LOCALES'])
+    zone = request.cookies.get(TIMEZONE_COOKIE)
+    if zone:
+        try:
+            timezone(zone)
+        except LookupError:
+            zone = None
+    g.datetime_timezone = zone
+    g.cache_variant = '%s|%s' % (g.datetime_locale, g.datetime_timezone)
+
+
+def init_app(app):
+    app.config.setdefault('DATETIME_LOCALE', None)
+    app.config.setdefault('DATETIME_TIMEZONE', None)
+    app.config.setdefault('DATETIME_LOCALES', [])
+    app.config.setdefault('DATETIME_CACHE_SIZE', 4096)
+    formatter = DateTimeFormatter(app)
+    app.extensions['datetime_formatter'] = formatter
+    app.jinja_env.filters['datetime'] = formatter
+    if formatter.per_request:
+        app.before_request(select_locale)
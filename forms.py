@@ -3,27 +3,57 @@ from flask_wtf import *
 from wtforms import *
 from wtforms.validators import *
 
+from models import SHOW_MAX_DURATION
+
+class IdSelectField(SelectField):
+    # A <select> of ids whose options are only a few suggestions (the rest
+    # are found with the autocomplete): any id is accepted here and checked
+    # by RecordExists.
+    def pre_validate(self, form):
+        pass
+
+
+class RecordExists(object):
+    # Checks that a row with the submitted id exists: one primary key lookup
+    # instead of the list of every id. Bulk imports set form.known_ids
+    # ({field name: set of ids}) to check a whole batch with one query.
+    def __init__(self, model_name, message=None):
+        self.model_name = model_name
+        self.message = message or 'No such %s.' % model_name.lower()
+
+    def __call__(self, form, field):
+        known = getattr(form, 'known_ids', {}).get(field.name)
+        if known is not None:
+            exists = field.data in known
+        else:
+            import models
+            from extensions import db
+            model = getattr(models, self.model_name)
+            exists = db.session.query(db.session.query(model.id).filter(
+                model.id == field.data, model.delete_job_id.is_(None)).exists()).scalar()
+        if not exists:
+            raise ValidationError(self.message)
+
+
 class ShowForm(Form):
-    # artist_id = StringField(
-    #     'artist_id', validators=[DataRequired()]
-    # )
-        # venue_id = StringField(
-    #     'venue_id', validators=[DataRequired()]
-    # )
-    artist_id = SelectField(
-        'artist_id', validators=[DataRequired()],
-        choices=[]
+    artist_id = IdSelectField(
+        'artist_id', validators=[DataRequired(), RecordExists('Artist')],
+        coerce=int, choices=[]
     )
 
-    venue_id = SelectField(
-        'venue_id', validators=[DataRequired()],
-        choices=[]
+    venue_id = IdSelectField(
+        'venue_id', validators=[DataRequired(), RecordExists('Venue')],
+        coerce=int, choices=[]
     )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default= datetime.today()
     )
+    # Minutes; SHOW_DEFAULT_DURATION when empty, at most SHOW_MAX_DURATION.
+    duration = IntegerField(
+        'duration', validators=[Optional(), NumberRange(min=1, max=int(SHOW_MAX_DURATION.total_seconds()) // 60)]
+    )
 
 
 class VenueForm(Form):
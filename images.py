@@ -0,0 +1,352 @@
+#----------------------------------------------------------------------------#
+# Image proxy.
+#
+# Venue and artist images are remote URLs of any size. Pages link them
+# through /images/<width>/<signature>?url=...: the proxy fetches each image
+# once, a worker pool writes a JPEG thumbnail per IMAGE_WIDTHS entry to a
+# size-bounded disk cache, and thumbnails are served with long cache
+# lifetimes. Templates use image_url(url, width) and image_srcset(url).
+#
+# Only URLs signed with IMAGE_PROXY_KEY are fetched, so the proxy cannot be
+# used to reach arbitrary hosts, and hosts resolving to private addresses
+# are refused unless IMAGE_ALLOW_PRIVATE is set. Whenever a thumbnail
+# cannot be made (no Pillow, fetch or decoding error) the client is
+# redirected to the original URL.
+#
+# Config:
+#   IMAGE_PROXY_ENABLED     link images through the proxy.
+#   IMAGE_PROXY_KEY         signing key; must be the same in every worker.
+#                           The proxy is disabled while it is unset.
+#   IMAGE_WIDTHS            thumbnail widths in pixels.
+#   IMAGE_CACHE_DIR         disk cache directory.
+#   IMAGE_CACHE_MAX_BYTES   disk cache size; least recently used go first.
+#   IMAGE_WORKERS           threads fetching and resizing.
+#   IMAGE_FETCH_TIMEOUT     seconds per fetch.
+#   IMAGE_MAX_BYTES         largest image fetched.
+#   IMAGE_WAIT              seconds a request waits for its thumbnail.
+#   IMAGE_RETRY_AFTER       seconds before a failed URL is tried again.
+#   IMAGE_MAX_AGE           Cache-Control max-age of thumbnails.
+#   IMAGE_ALLOW_PRIVATE     allow private/loopback hosts (local stubs).
+#----------------------------------------------------------------------------#
+
+import hashlib
+import hmac
+import io
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import abort, current_app, redirect, request, send_from_directory, url_for
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+JPEG_QUALITY = 82
+MAX_PIXELS = 50 * 1000 * 1000
+TEMPORARY = '.tmp-'
+
+
+class ImageError(Exception):
+    pass
+
+
+class DiskCache(object):
+    # Files in a directory, at most max_bytes in total. A hit sets the
+    # file's access time; eviction removes the least recently accessed
+    # first. Modification times stay those of the write (ETags, ages).
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name):
+        # Path of a cached file, or None.
+        path = self.path(name)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def age(self, name):
+        try:
+            return time.time() - os.stat(self.path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def put(self, name, data):
+        # Written under a temporary name and renamed: readers in other
+        # workers never see a partial file.
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=TEMPORARY)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        with self.lock:
+            try:
+                replaced = os.stat(self.path(name)).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temporary, self.path(name))
+            self.size += len(data) - replaced
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        # Down to 90% of max_bytes. Sizes are read from disk, as other
+        # workers write to the same directory.
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith(TEMPORARY):
+                stat = entry.stat()
+                files.append((stat.st_atime, stat.st_size, entry.path))
+        files.sort()
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in files:
+            if size <= 0.9 * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self.size = size
+
+
+#  Fetching and resizing
+#  ----------------------------------------------------------------
+
+def check_host(url, allow_private):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ImageError('Not an http(s) URL: %s' % url)
+    if allow_private:
+        return
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or 80, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as error:
+        raise ImageError('Cannot resolve %s: %s' % (parts.hostname, error))
+    for address in addresses:
+        if not ipaddress.ip_address(address[4][0].split('%')[0]).is_global:
+            raise ImageError('%s resolves to a private address' % parts.hostname)
+
+
+class CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    # Redirect targets go through check_host too.
+
+    def __init__(self, allow_private):
+        self.allow_private = allow_private
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_host(newurl, self.allow_private)
+        return urllib.request.HTTPRedirectHandler.redirect_request(self, req, fp, code, msg, headers, newurl)
+
+
+def cache_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+def fetch(url, timeout, max_bytes, allow_private):
+    check_host(url, allow_private)
+    opener = urllib.request.build_opener(CheckedRedirectHandler(allow_private))
+    fetch_request = urllib.request.Request(url, headers={'User-Agent': 'fyyur-image-proxy'})
+    try:
+        with opener.open(fetch_request, timeout=timeout) as response:
+            data = response.read(max_bytes + 1)
+    except (OSError, ValueError) as error:
+        raise ImageError('Cannot fetch %s: %s' % (url, error))
+    if len(data) > max_bytes:
+        raise ImageError('%s is larger than %d bytes' % (url, max_bytes))
+    return data
+
+
+def thumbnails(data, widths):
+    # {width: JPEG bytes}. Images are never enlarged: widths beyond the
+    # original get the original size.
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.size[0] * image.size[1] > MAX_PIXELS:
+            raise ImageError('Image too large: %dx%d' % image.size)
+        image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as error:
+        raise ImageError('Cannot decode image: %s' % error)
+    if image.mode not in ('RGB', 'L'):
+        # JPEG has no alpha: flatten on white, the page background.
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.split()[3])
+    results = {}
+    for width in widths:
+        resized = image
+        if image.size[0] > width:
+            resized = image.resize((width, max(1, round(image.size[1] * width / image.size[0]))), Image.LANCZOS)
+        output = io.BytesIO()
+        resized.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        results[width] = output.getvalue()
+    return results
+
+
+#  Proxy
+#  ----------------------------------------------------------------
+
+class ImageProxy(object):
+
+    def __init__(self, app=None):
+        self.cache = None
+        self.executor = None
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.options = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_PROXY_ENABLED', True)
+        app.config.setdefault('IMAGE_PROXY_KEY', None)
+        app.config.setdefault('IMAGE_WIDTHS', (160, 320, 640, 1024))
+        app.config.setdefault('IMAGE_CACHE_DIR', os.path.join(app.instance_path, 'images'))
+        app.config.setdefault('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        app.config.setdefault('IMAGE_WORKERS', 4)
+        app.config.setdefault('IMAGE_FETCH_TIMEOUT', 5)
+        app.config.setdefault('IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('IMAGE_WAIT', 10)
+        app.config.setdefault('IMAGE_RETRY_AFTER', 3600)
+        app.config.setdefault('IMAGE_MAX_AGE', 30 * 24 * 3600)
+        app.config.setdefault('IMAGE_ALLOW_PRIVATE', False)
+        if app.config['IMAGE_PROXY_ENABLED'] and not app.config['IMAGE_PROXY_KEY']:
+            # Signed URLs must verify in every worker and across restarts,
+            # which a per-process SECRET_KEY does not.
+            app.logger.warning('IMAGE_PROXY_KEY is not set: images are linked without the proxy')
+            app.config['IMAGE_PROXY_ENABLED'] = False
+        # Used from the worker threads, which have no app context.
+        self.options = {
+            'widths': tuple(app.config['IMAGE_WIDTHS']),
+            'timeout': app.config['IMAGE_FETCH_TIMEOUT'],
+            'max_bytes': app.config['IMAGE_MAX_BYTES'],
+            'allow_private': app.config['IMAGE_ALLOW_PRIVATE'],
+        }
+        self.cache = DiskCache(app.config['IMAGE_CACHE_DIR'], app.config['IMAGE_CACHE_MAX_BYTES'])
+        self.executor = ThreadPoolExecutor(app.config['IMAGE_WORKERS'], thread_name_prefix='images')
+        app.extensions['image_proxy'] = self
+        app.add_url_rule('/images/<int:width>/<signature>', 'image', self.serve)
+        app.jinja_env.globals.update(image_url=image_url, image_srcset=image_srcset)
+
+    #  Signing
+    #  ----------------------------------------------------------------
+
+    def signature(self, url):
+        key = current_app.config['IMAGE_PROXY_KEY']
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        return hmac.new(key, url.encode('utf-8'), hashlib.sha256).hexdigest()[:20]
+
+    def url(self, url, width):
+        return url_for('image', width=width, signature=self.signature(url), url=url)
+
+    #  Thumbnails
+    #  ----------------------------------------------------------------
+
+    def generate(self, url, key):
+        # Worker thread: fetch the image (once: the source is cached too)
+        # and write every thumbnail. A failure leaves an .error marker.
+        try:
+            source = self.cache.get(key + '.source')
+            if source is not None:
+                with open(source, 'rb') as f:
+                    data = f.read()
+            else:
+                data = fetch(url, self.options['timeout'], self.options['max_bytes'], self.options['allow_private'])
+                self.cache.put(key + '.source', data)
+            for width, thumbnail in thumbnails(data, self.options['widths']).items():
+                self.cache.put('%s.%d.jpg' % (key, width), thumbnail)
+        except ImageError as error:
+            self.cache.put(key + '.error', str(error).encode('utf-8'))
+            raise
+        finally:
+            with self.pending_lock:
+                self.pending.pop(key, None)
+
+    def prefetch(self, url):
+        # Make the thumbnails of url now (a background job) unless they
+        # are cached. Raises ImageError when the image cannot be used.
+        key = cache_key(url)
+        if Image is None or self.cache.get('%s.%d.jpg' % (key, self.options['widths'][-1])) is not None:
+            return False
+        self.generate(url, key)
+        return True
+
+    def thumbnail(self, url, width, wait):
+        # Path of the thumbnail, or None if it cannot be made (in time).
+        key = cache_key(url)
+        name = '%s.%d.jpg' % (key, width)
+        path = self.cache.get(name)
+        if path is not None or Image is None:
+            return path
+        failed = self.cache.age(key + '.error')
+        if failed is not None and failed < current_app.config['IMAGE_RETRY_AFTER']:
+            return None
+        with self.pending_lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = self.executor.submit(self.generate, url, key)
+        try:
+            future.result(timeout=wait)
+        except (ImageError, TimeoutError):
+            return None
+        return self.cache.get(name)
+
+    def serve(self, width, signature):
+        url = request.args.get('url', '')
+        if not current_app.config['IMAGE_PROXY_ENABLED'] or not url \
+                or not hmac.compare_digest(signature, self.signature(url)):
+            abort(404)
+        if width not in self.options['widths']:
+            abort(404)
+        path = self.thumbnail(url, width, current_app.config['IMAGE_WAIT'])
+        if path is None:
+            response = redirect(url)
+            response.headers['Cache-Control'] = 'public, max-age=300'
+            return response
+        max_age = current_app.config['IMAGE_MAX_AGE']
+        response = send_from_directory(self.cache.directory, os.path.basename(path),
+                                       mimetype='image/jpeg', cache_timeout=max_age)
+        response.headers['Cache-Control'] = 'public, max-age=%d' % max_age
+        return response
+
+
+#  Templates
+#  ----------------------------------------------------------------
+
+def proxied(url):
+    # Without Pillow there is nothing to resize: pages link the originals.
+    return (current_app.config['IMAGE_PROXY_ENABLED'] and Image is not None
+            and isinstance(url, str) and url.startswith(('http://', 'https://')))
+
+
+def image_url(url, width):
+    # Proxy URL of url's thumbnail of the given width; url itself when it
+    # is not proxied (proxy disabled, empty or not http(s)).
+    if not proxied(url):
+        return url
+    return current_app.extensions['image_proxy'].url(url, width)
+
+
+def image_srcset(url):
+    # srcset attribute value: one proxy URL per IMAGE_WIDTHS entry.
+    if not proxied(url):
+        return ''
+    proxy = current_app.extensions['image_proxy']
+    return ', '.join('%s %dw' % (proxy.url(url, width), width) for width in proxy.options['widths'])
@@ -0,0 +1,163 @@
+#----------------------------------------------------------------------------#
+# Readers and validation for bulk imports.
+#
+# Records are read lazily from CSV, NDJSON or JSON array input, grouped in
+# batches and validated with the same WTForms forms as the create pages.
+# Persisting the rows is left to the caller (run_import and import_batch
+# in queries.py).
+#----------------------------------------------------------------------------#
+
+import codecs
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from werkzeug.datastructures import MultiDict
+
+
+FORMATS = ('csv', 'ndjson', 'json')
+
+# Fields read from each record, per kind. Multi-valued fields are given as
+# lists in JSON and as ';'-separated values in CSV.
+FIELDS = {
+    'venue': ('name', 'city', 'state', 'address', 'phone', 'image_link', 'genres',
+              'facebook_link', 'website', 'seeking_talent', 'seeking_description'),
+    'artist': ('name', 'city', 'state', 'phone', 'image_link', 'genres',
+               'facebook_link', 'website', 'seeking_venue', 'seeking_description'),
+    'show': ('venue_id', 'venue_name', 'artist_id', 'artist_name', 'start_time', 'duration'),
+}
+LIST_FIELDS = ('genres',)
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'ndjson'
+    if extension == 'json':
+        return 'json'
+    return 'csv'
+
+
+def text_stream(stream):
+    # Decode a binary stream lazily; text streams are returned unchanged.
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return codecs.getreader('utf-8-sig')(stream)
+
+
+def read_json_array(stream, chunk_size=65536):
+    # Yield the objects of a top-level JSON array without loading the whole
+    # document.
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if buffer:
+                if buffer[0] != '[':
+                    raise ValueError('JSON input must be an array of objects')
+                buffer = buffer[1:]
+                started = True
+                continue
+        elif buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        elif buffer.startswith(']'):
+            return
+        elif buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield record
+                buffer = buffer[end:]
+                continue
+        if eof:
+            if started:
+                raise ValueError('Unterminated JSON array')
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def read_records(stream, fmt):
+    # Yield one dict per input record.
+    stream = text_stream(stream)
+    if fmt == 'csv':
+        for record in csv.DictReader(stream):
+            yield record
+    elif fmt == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == 'json':
+        for record in read_json_array(stream):
+            yield record
+    else:
+        raise ValueError('Unknown import format: %s' % fmt)
+
+
+def batches(records, size, skip=0):
+    # Group records in lists of `size`, each item being (row number, record)
+    # with rows numbered from 1. The first `skip` records are dropped, which
+    # is how an interrupted import resumes.
+    batch = []
+    for number, record in enumerate(records, 1):
+        if number <= skip:
+            continue
+        batch.append((number, record))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def form_data(kind, record):
+    # Record -> MultiDict in the shape a submitted form would have.
+    data = MultiDict()
+    for field in FIELDS[kind]:
+        value = record.get(field)
+        if value is None or value == '':
+            continue
+        if field in LIST_FIELDS:
+            values = value if isinstance(value, list) else [part.strip() for part in str(value).split(';')]
+            for item in values:
+                if item:
+                    data.add(field, item)
+        elif field == 'start_time':
+            data.add(field, str(value).replace('T', ' ')[:19])
+        else:
+            data.add(field, str(value))
+    # Exported shows carry an end_time instead of a duration.
+    if kind == 'show' and 'duration' not in data and record.get('end_time') and record.get('start_time'):
+        minutes = duration_minutes(record['start_time'], record['end_time'])
+        if minutes is not None:
+            data.add('duration', str(minutes))
+    return data
+
+
+def duration_minutes(start_time, end_time):
+    try:
+        start, end = (datetime.fromisoformat(str(value).replace('T', ' ')[:19]) for value in (start_time, end_time))
+    except ValueError:
+        return None
+    return int((end - start).total_seconds() // 60)
+
+
+def validate(form_class, data, prepare=None):
+    # Validate form data with form_class and return (values, errors).
+    # `prepare(form)` may adjust the form first (e.g. set select choices).
+    form = form_class(formdata=data, meta={'csrf': False})
+    if prepare is not None:
+        prepare(form)
+    if not form.validate():
+        return None, form.errors
+    return form.data, None
@@ -0,0 +1,193 @@
+#----------------------------------------------------------------------------#
+# Per-route query count and latency instrumentation.
+#
+# Hooks SQLAlchemy cursor events and the Flask request/template signals to
+# record, for every endpoint: requests, SQL statements, SQL time, template
+# render time, response size and total time. The totals are served in the
+# Prometheus text format and summarized periodically in the app log.
+#
+# Config:
+#   METRICS_ENDPOINT        URL of the metrics page (None disables it).
+#   METRICS_LOG_INTERVAL    seconds between summaries in the log (0 = never).
+#   QUERY_BUDGETS           {endpoint: max SQL statements per request}.
+#   QUERY_BUDGET_ASSERT     raise QueryBudgetExceeded instead of logging a
+#                           warning when a request goes over its budget.
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from flask import request_started, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+FIELDS = (
+    ('requests', 'counter', 'Requests handled.'),
+    ('sql_queries', 'counter', 'SQL statements executed.'),
+    ('sql_seconds', 'counter', 'Time spent executing SQL.'),
+    ('render_seconds', 'counter', 'Time spent rendering templates.'),
+    ('response_bytes', 'counter', 'Response body bytes (non-streamed responses).'),
+    ('request_seconds', 'counter', 'Total request handling time.'),
+    ('sql_queries_max', 'gauge', 'Most SQL statements issued by one request.'),
+)
+
+
+class RouteMetrics(object):
+    # Thread-safe per-endpoint totals.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.collectors = []
+
+    def add_collector(self, collector):
+        # collector() returns extra lines for the metrics page.
+        self.collectors.append(collector)
+
+    def record(self, endpoint, sample):
+        with self.lock:
+            totals = self.routes.setdefault(endpoint, dict.fromkeys((name for name, _, _ in FIELDS), 0))
+            totals['requests'] += 1
+            for name in ('sql_queries', 'sql_seconds', 'render_seconds', 'response_bytes', 'request_seconds'):
+                totals[name] += sample[name]
+            totals['sql_queries_max'] = max(totals['sql_queries_max'], sample['sql_queries'])
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: dict(totals) for endpoint, totals in self.routes.items()}
+
+    def prometheus(self):
+        routes = self.snapshot()
+        lines = []
+        for name, kind, doc in FIELDS:
+            metric = 'fyyur_%s' % name if kind == 'gauge' else 'fyyur_%s_total' % name
+            lines.append('# HELP %s %s' % (metric, doc))
+            lines.append('# TYPE %s %s' % (metric, kind))
+            for endpoint in sorted(routes):
+                lines.append('%s{endpoint="%s"} %s' % (metric, endpoint, routes[endpoint][name]))
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        lines = []
+        for endpoint, totals in sorted(self.snapshot().items()):
+            count = totals['requests']
+            lines.append('%s: %d req, %.1f queries/req (max %d), sql %.1fms/req, render %.1fms/req, %.1fms/req, %d bytes/req' % (
+                endpoint, count,
+                totals['sql_queries'] / float(count), totals['sql_queries_max'],
+                1000 * totals['sql_seconds'] / count, 1000 * totals['render_seconds'] / count,
+                1000 * totals['request_seconds'] / count, totals['response_bytes'] / count))
+        return '\n'.join(lines)
+
+
+_local = threading.local()
+
+
+def current_sample():
+    # Per-request counters, or None outside of a request. Helper threads
+    # running queries for a request use the sample bound by bind_sample.
+    if not has_request_context():
+        return getattr(_local, 'sample', None)
+    return g.get('_metrics')
+
+
+@contextmanager
+def bind_sample(sample):
+    # Count the statements of the current thread in `sample`.
+    previous = getattr(_local, 'sample', None)
+    _local.sample = sample
+    try:
+        yield
+    finally:
+        _local.sample = previous
+
+
+# Installed once for every engine, whatever the number of apps created: the
+# statements are counted in the sample of the current request or thread.
+# The start time is kept per connection, and dropped when a statement fails.
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.time()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_start', None)
+    sample = current_sample()
+    if sample is not None and started is not None:
+        sample['sql_queries'] += 1
+        sample['sql_seconds'] += time.time() - started
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(context):
+    if context.connection is not None:
+        context.connection.info.pop('query_start', None)
+
+
+def init_app(app):
+    metrics = RouteMetrics()
+    app.extensions['metrics'] = metrics
+    state = {'logged_at': time.time()}
+
+    def on_request_started(sender, **extra):
+        g._metrics = {
+            'started': time.time(),
+            'sql_queries': 0,
+            'sql_seconds': 0.0,
+            'render_seconds': 0.0,
+            'render_started': [],
+        }
+
+    def on_before_render(sender, template, context, **extra):
+        sample = current_sample()
+        if sample is not None:
+            sample['render_started'].append(time.time())
+
+    def on_template_rendered(sender, template, context, **extra):
+        sample = current_sample()
+        if sample is not None and sample['render_started']:
+            sample['render_seconds'] += time.time() - sample['render_started'].pop()
+
+    request_started.connect(on_request_started, app, weak=False)
+    before_render_template.connect(on_before_render, app, weak=False)
+    template_rendered.connect(on_template_rendered, app, weak=False)
+
+    @app.after_request
+    def record_request_metrics(response):
+        sample = current_sample()
+        if sample is None or request.endpoint == 'metrics':
+            return response
+        endpoint = request.endpoint or 'unknown'
+        sample['request_seconds'] = time.time() - sample['started']
+        sample['response_bytes'] = 0 if response.is_streamed else response.calculate_content_length() or 0
+        metrics.record(endpoint, sample)
+
+        budget = app.config.get('QUERY_BUDGETS', {}).get(endpoint)
+        if budget is not None and sample['sql_queries'] > budget:
+            message = '%s issued %d SQL statements (budget %d)' % (endpoint, sample['sql_queries'], budget)
+            if app.config.get('QUERY_BUDGET_ASSERT'):
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+
+        interval = app.config.get('METRICS_LOG_INTERVAL')
+        if interval and time.time() - state['logged_at'] >= interval:
+            state['logged_at'] = time.time()
+            app.logger.info('Route metrics:\n%s', metrics.summary())
+        return response
+
+    if app.config.get('METRICS_ENDPOINT'):
+        def metrics_view():
+            return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+        app.add_url_rule(app.config['METRICS_ENDPOINT'], 'metrics', metrics_view)
+
+    return metrics
@@ -0,0 +1,323 @@
+#----------------------------------------------------------------------------#
+# Background jobs.
+#
+# A queue of Job rows in the database, processed by `flask run-worker`
+# processes. enqueue() adds the job to the caller's transaction: workers
+# see it once that commits, and never if it rolls back, so a controller
+# enqueues its side effects with the write that causes them. Workers take
+# the due jobs in run_at order, claimed with SELECT ... FOR UPDATE SKIP
+# LOCKED on PostgreSQL so they never wait on each other (other databases
+# rely on a conditional UPDATE). A failed job is queued again after
+# JOB_RETRY_DELAY * 2**(attempt - 1) seconds, until max_attempts; a job
+# whose worker died (no heartbeat for JOB_TIMEOUT) is queued again too.
+#
+# Tasks are the functions registered with @task (tasks.py). JOB_SCHEDULE
+# runs some of them periodically: the workers keep one pending job per
+# recurring task (Job.key) and queue the next run when one finishes.
+#
+# With JOB_EAGER the web process runs the jobs it enqueued on a thread
+# right after the commit, for development without a worker.
+#
+# Config:
+#   JOB_MAX_ATTEMPTS          attempts of a job unless enqueued with others.
+#   JOB_RETRY_DELAY           seconds before the first retry (doubled each
+#                             time, up to JOB_RETRY_MAX_DELAY).
+#   JOB_TIMEOUT               seconds without heartbeat before a running
+#                             job is taken back.
+#   JOB_POLL_INTERVAL         seconds an idle worker waits between polls.
+#   JOB_SCHEDULE              {task: seconds between runs}.
+#   JOB_KEEP_DAYS             finished jobs are pruned after this.
+#   JOB_METRICS_WINDOW        seconds of finished jobs in the metrics.
+#   JOB_EAGER                 run enqueued jobs in the web process.
+#----------------------------------------------------------------------------#
+
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, exc
+
+from database import RoutingSession
+from extensions import db
+from models import Job
+
+
+PENDING = ('queued', 'running')
+
+TASKS = {}
+
+_local = threading.local()
+
+
+def task(name):
+    # Register the decorated function as the task `name`; it is called
+    # with the job's args in an app context and may commit as it goes.
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def worker_name():
+    return '%s:%d' % (socket.gethostname(), os.getpid())
+
+
+def schedule_key(name):
+    return 'schedule:' + name
+
+
+def retry_delay(attempts):
+    config = current_app.config
+    return min(config['JOB_RETRY_DELAY'] * 2 ** (attempts - 1), config['JOB_RETRY_MAX_DELAY'])
+
+
+#  Enqueueing
+#  ----------------------------------------------------------------
+
+def enqueue(name, *args, delay=0, run_at=None, key=None, max_attempts=None):
+    # Add a job to the current transaction and return it (flushed, so its
+    # id is known). It runs once the transaction commits.
+    if name not in TASKS:
+        raise ValueError('Unknown task %r' % name)
+    job = Job(name=name, args=list(args), key=key,
+              max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+              run_at=run_at or datetime.now() + timedelta(seconds=delay))
+    db.session.add(job)
+    db.session.flush()
+    db.session.info.setdefault('enqueued_jobs', []).append(job.id)
+    return job
+
+
+def run_eagerly(app):
+    with app.app_context():
+        work(burst=True, maintain=False)
+
+
+def on_commit(session):
+    if session.info.pop('enqueued_jobs', None) and not getattr(_local, 'working', False) \
+            and current_app.config['JOB_EAGER']:
+        app = current_app._get_current_object()
+        threading.Thread(target=run_eagerly, args=(app,), daemon=True).start()
+
+
+def on_rollback(session):
+    session.info.pop('enqueued_jobs', None)
+
+
+event.listen(RoutingSession, 'after_commit', on_commit)
+event.listen(RoutingSession, 'after_rollback', on_rollback)
+
+
+#  Workers
+#  ----------------------------------------------------------------
+
+def claim(worker):
+    # Take the next due job: marked running with its attempt counted, and
+    # committed. None when no job is due.
+    while True:
+        now = datetime.now()
+        row = db.session.query(Job.id).filter(Job.status == 'queued', Job.run_at <= now) \
+            .order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True).first()
+        if row is None:
+            db.session.rollback()
+            return None
+        # SQLite ignores FOR UPDATE: the status check keeps two workers
+        # from both claiming the job.
+        claimed = db.session.query(Job).filter(Job.id == row.id, Job.status == 'queued').update({
+            Job.status: 'running',
+            Job.attempts: Job.attempts + 1,
+            Job.worker: worker,
+            Job.started_at: now,
+            Job.heartbeat_at: now,
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.query(Job).get(row.id)
+
+
+def keep_alive(app, job_id, done):
+    # Heartbeat of a running job, on its own connection, until done is set.
+    table = Job.__table__
+    with app.app_context():
+        while not done.wait(app.config['JOB_TIMEOUT'] / 3.0):
+            try:
+                db.engine.execute(table.update().where(table.c.id == job_id).values(heartbeat_at=datetime.now()))
+            except exc.DBAPIError as error:
+                app.logger.warning('Heartbeat of job %d failed: %s', job_id, error)
+
+
+def execute(job):
+    # Run a claimed job and record the outcome: done, queued again after
+    # a growing delay, or failed once out of attempts.
+    started = time.time()
+    done = threading.Event()
+    threading.Thread(target=keep_alive, args=(current_app._get_current_object(), job.id, done),
+                     daemon=True).start()
+    message = None
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError('Unknown task %s' % job.name)
+        func(*job.args)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        message = '%s: %s' % (type(e).__name__, e)
+        current_app.logger.exception('Job %d (%s) failed, attempt %d of %d',
+                                     job.id, job.name, job.attempts, job.max_attempts)
+    finally:
+        done.set()
+
+    now = datetime.now()
+    job.message = message
+    if message is None:
+        job.status, job.finished_at = 'done', now
+    elif job.attempts < job.max_attempts:
+        job.status, job.run_at = 'queued', now + timedelta(seconds=retry_delay(job.attempts))
+    else:
+        job.status, job.finished_at = 'failed', now
+    db.session.flush()
+    if job.finished_at is not None and job.key == schedule_key(job.name):
+        reschedule(job, now)
+    db.session.commit()
+    current_app.logger.info('Job %d (%s) %s in %.3fs', job.id, job.name, job.status, time.time() - started)
+    return job
+
+
+def reschedule(job, now):
+    # Queue the next run of a recurring task, JOB_SCHEDULE seconds after
+    # the last one was due (now if the workers are behind).
+    interval = current_app.config['JOB_SCHEDULE'].get(job.name)
+    if interval:
+        enqueue(job.name, key=job.key, run_at=max(job.run_at + timedelta(seconds=interval), now))
+
+
+def schedule_recurring():
+    # Queue the recurring tasks that have no pending job, e.g. on the
+    # first start of a worker or when one was added to JOB_SCHEDULE.
+    for name in sorted(current_app.config['JOB_SCHEDULE']):
+        key = schedule_key(name)
+        if db.session.query(Job.id).filter(Job.key == key, Job.status.in_(PENDING)).first() is not None:
+            continue
+        try:
+            enqueue(name, key=key)
+            db.session.commit()
+        except exc.IntegrityError:
+            # Another worker queued it first.
+            db.session.rollback()
+    db.session.commit()
+
+
+def requeue_stale():
+    # Take back the jobs of workers that stopped (no heartbeat for
+    # JOB_TIMEOUT): queued again, or failed when out of attempts.
+    now = datetime.now()
+    limit = now - timedelta(seconds=current_app.config['JOB_TIMEOUT'])
+    stale = db.session.query(Job).filter(Job.status == 'running', Job.heartbeat_at < limit) \
+        .with_for_update(skip_locked=True).all()
+    for job in stale:
+        job.message = 'Worker %s stopped responding' % job.worker
+        if job.attempts < job.max_attempts:
+            job.status, job.run_at = 'queued', now
+        else:
+            job.status, job.finished_at = 'failed', now
+    db.session.commit()
+    return len(stale)
+
+
+def work(worker=None, burst=False, stop=None, maintain=True):
+    # Run jobs until `stop` (a threading.Event) is set or, with burst,
+    # until none is due. Returns the number of jobs run.
+    config = current_app.config
+    worker = worker or worker_name()
+    stop = stop or threading.Event()
+    count, maintained_at = 0, None
+    _local.working = True
+    try:
+        while not stop.is_set():
+            if maintain and (maintained_at is None or time.time() - maintained_at >= config['JOB_TIMEOUT'] / 3.0):
+                schedule_recurring()
+                requeue_stale()
+                maintained_at = time.time()
+            job = claim(worker)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(config['JOB_POLL_INTERVAL'])
+                continue
+            execute(job)
+            db.session.remove()
+            count += 1
+    finally:
+        _local.working = False
+    return count
+
+
+#  Maintenance and metrics
+#  ----------------------------------------------------------------
+
+def prune(now=None):
+    # Delete the jobs finished more than JOB_KEEP_DAYS ago.
+    limit = (now or datetime.now()) - timedelta(days=current_app.config['JOB_KEEP_DAYS'])
+    pruned = db.session.query(Job).filter(Job.finished_at < limit).delete(synchronize_session=False)
+    db.session.commit()
+    return pruned
+
+
+def prometheus():
+    # Queue depth per task and status, the age of the oldest due job (how
+    # far behind the workers are), and the jobs finished in the last
+    # JOB_METRICS_WINDOW seconds with their average wait and run time.
+    now = datetime.now()
+    lines = ['# HELP fyyur_jobs Jobs queued, running or failed.', '# TYPE fyyur_jobs gauge']
+    counts = db.session.query(Job.name, Job.status, db.func.count()) \
+        .filter(Job.status.in_(PENDING + ('failed',))).group_by(Job.name, Job.status)
+    for name, status, count in sorted(counts):
+        lines.append('fyyur_jobs{task="%s",status="%s"} %d' % (name, status, count))
+
+    oldest = db.session.query(db.func.min(Job.run_at)).filter(Job.status == 'queued', Job.run_at <= now).scalar()
+    lines.append('# HELP fyyur_job_queue_lag_seconds How long the oldest due job has been waiting.')
+    lines.append('# TYPE fyyur_job_queue_lag_seconds gauge')
+    lines.append('fyyur_job_queue_lag_seconds %.3f' % ((now - oldest).total_seconds() if oldest else 0))
+
+    window = current_app.config['JOB_METRICS_WINDOW']
+    totals = {}
+    rows = db.session.query(Job.name, Job.status, Job.run_at, Job.started_at, Job.finished_at) \
+        .filter(Job.finished_at >= now - timedelta(seconds=window))
+    for name, status, run_at, started_at, finished_at in rows:
+        total = totals.setdefault(name, {'done': 0, 'failed': 0, 'wait': 0.0, 'run': 0.0})
+        total[status] += 1
+        total['wait'] += (started_at - run_at).total_seconds()
+        total['run'] += (finished_at - started_at).total_seconds()
+    lines.append('# HELP fyyur_jobs_finished Jobs finished in the last %d seconds.' % window)
+    lines.append('# TYPE fyyur_jobs_finished gauge')
+    for name in sorted(totals):
+        for status in ('done', 'failed'):
+            lines.append('fyyur_jobs_finished{task="%s",status="%s"} %d' % (name, status, totals[name][status]))
+    for metric, field, doc in (('fyyur_job_wait_seconds', 'wait', 'Average time from due to started'),
+                               ('fyyur_job_run_seconds', 'run', 'Average run time')):
+        lines.append('# HELP %s %s, last %d seconds.' % (metric, doc, window))
+        lines.append('# TYPE %s gauge' % metric)
+        for name in sorted(totals):
+            total = totals[name]
+            lines.append('%s{task="%s"} %.3f' % (metric, name, total[field] / (total['done'] + total['failed'])))
+    return lines
+
+
+def init_app(app):
+    import tasks  # registers the tasks
+    app.config.setdefault('JOB_MAX_ATTEMPTS', 3)
+    app.config.setdefault('JOB_RETRY_DELAY', 10)
+    app.config.setdefault('JOB_RETRY_MAX_DELAY', 3600)
+    app.config.setdefault('JOB_TIMEOUT', 300)
+    app.config.setdefault('JOB_POLL_INTERVAL', 1)
+    app.config.setdefault('JOB_SCHEDULE', {})
+    app.config.setdefault('JOB_KEEP_DAYS', 7)
+    app.config.setdefault('JOB_METRICS_WINDOW', 300)
+    app.config.setdefault('JOB_EAGER', False)
+    metrics = app.extensions.get('metrics')
+    if metrics is not None:
+        metrics.add_collector(prometheus)
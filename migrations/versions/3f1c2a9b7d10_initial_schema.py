@@ -0,0 +1,79 @@
+"""initial schema
+
+Venue, Artist and Show as originally created by db.create_all(), plus the
+AreaSummary table. Databases created that way should be stamped at this
+revision (flask db stamp 3f1c2a9b7d10) before upgrading.
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Venue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('address', sa.String(length=120), nullable=True),
+    sa.Column('phone', sa.String(length=120), nullable=True),
+    sa.Column('image_link', sa.String(length=500), nullable=True),
+    sa.Column('facebook_link', sa.String(length=120), nullable=True),
+    sa.Column('genres', postgresql.ARRAY(sa.String()).with_variant(sa.JSON(), 'sqlite'), nullable=True),
+    sa.Column('website', sa.String(), nullable=True),
+    sa.Column('seeking_talent', sa.String(), nullable=True),
+    sa.Column('seeking_description', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('Artist',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('phone', sa.String(length=120), nullable=True),
+    sa.Column('genres', postgresql.ARRAY(sa.String(length=120)).with_variant(sa.JSON(), 'sqlite'), nullable=True),
+    sa.Column('image_link', sa.String(length=500), nullable=True),
+    sa.Column('facebook_link', sa.String(length=120), nullable=True),
+    sa.Column('website', sa.String(), nullable=True),
+    sa.Column('seeking_venue', sa.String(), nullable=True),
+    sa.Column('seeking_description', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('Show',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('AreaSummary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('num_venues', sa.Integer(), nullable=False),
+    sa.Column('num_upcoming_shows', sa.Integer(), nullable=False),
+    sa.Column('venues', sa.JSON(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('city', 'state')
+    )
+
+
+def downgrade():
+    op.drop_table('AreaSummary')
+    op.drop_table('Show')
+    op.drop_table('Artist')
+    op.drop_table('Venue')
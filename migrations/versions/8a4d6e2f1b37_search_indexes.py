@@ -0,0 +1,64 @@
+"""search indexes
+
+pg_trgm index on Venue/Artist name for substring search and a trigger
+maintained search_vector tsvector over name, city, state and genres.
+PostgreSQL only; other databases use the in-process search backend.
+
+Revision ID: 8a4d6e2f1b37
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d6e2f1b37'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_TABLES = ('Venue', 'Artist')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute("""
+        CREATE OR REPLACE FUNCTION fyyur_search_vector() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := to_tsvector('simple',
+                coalesce(NEW.name, '') || ' ' ||
+                coalesce(NEW.city, '') || ' ' ||
+                coalesce(NEW.state, '') || ' ' ||
+                coalesce(array_to_string(NEW.genres, ' '), ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in SEARCH_TABLES:
+        op.execute('ALTER TABLE "{0}" ADD COLUMN search_vector tsvector'.format(table))
+        op.execute("""
+            CREATE TRIGGER "{0}_search_vector" BEFORE INSERT OR UPDATE
+            ON "{0}" FOR EACH ROW EXECUTE PROCEDURE fyyur_search_vector()
+        """.format(table))
+        # Fire the trigger once to fill search_vector for existing rows.
+        op.execute('UPDATE "{0}" SET name = name'.format(table))
+        op.execute('CREATE INDEX "ix_{0}_search_vector" ON "{0}" USING gin (search_vector)'.format(table))
+        op.execute('CREATE INDEX "ix_{0}_name_trgm" ON "{0}" USING gin (name gin_trgm_ops)'.format(table))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in SEARCH_TABLES:
+        op.execute('DROP INDEX IF EXISTS "ix_{0}_name_trgm"'.format(table))
+        op.execute('DROP INDEX IF EXISTS "ix_{0}_search_vector"'.format(table))
+        op.execute('DROP TRIGGER IF EXISTS "{0}_search_vector" ON "{0}"'.format(table))
+        op.execute('ALTER TABLE "{0}" DROP COLUMN IF EXISTS search_vector'.format(table))
+    op.execute('DROP FUNCTION IF EXISTS fyyur_search_vector()')
@@ -0,0 +1,48 @@
+"""show and venue indexes
+
+Composite indexes for the Show access patterns: the venue and artist
+timelines filter on the owner and compare start_time against now, the
+/shows listing pages through (start_time, id). Venue gets (state, city),
+the order and grouping of the /venues page.
+
+On PostgreSQL the indexes are built CONCURRENTLY, so writes are not
+blocked while a large Show table is indexed.
+
+Revision ID: a4c7e9b1d358
+Revises: f2a6c8e0b913
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e9b1d358'
+down_revision = 'f2a6c8e0b913'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time']),
+    ('ix_Show_start_time_id', 'Show', ['start_time', 'id']),
+    ('ix_Venue_state_city', 'Venue', ['state', 'city']),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in INDEXES:
+        op.drop_index(name, table_name=table)
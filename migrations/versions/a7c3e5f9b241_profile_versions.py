@@ -0,0 +1,37 @@
+"""profile versions
+
+Adds Venue/Artist.version, the row version checked and incremented by the
+edit forms (optimistic concurrency control). A constant server default:
+existing rows start at 1 without a table rewrite (PostgreSQL 11+), and
+SQLite adds the column in place.
+
+Revision ID: a7c3e5f9b241
+Revises: f4b8d2a6c917
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f9b241'
+down_revision = 'f4b8d2a6c917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('Artist', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_column('Artist', 'version')
+        op.drop_column('Venue', 'version')
+    else:
+        for table in ('Artist', 'Venue'):
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column('version')
+            op.execute('CREATE INDEX IF NOT EXISTS "ix_%s_name_prefix" ON "%s" (lower(name))' % (table, table))
@@ -0,0 +1,116 @@
+"""show partitions
+
+Creates ShowArchive, where `flask maintain-show-partitions` moves shows
+older than SHOW_ARCHIVE_AFTER_MONTHS, and on PostgreSQL rebuilds Show as
+a table partitioned by range of start_time: one partition per month from
+the oldest show to SHOW_PARTITION_MONTHS_AHEAD months from now, and a
+DEFAULT partition for anything outside them. The primary key becomes
+(id, start_time), as a partitioned table's keys must include the
+partition column, so start_time is now NOT NULL (shows without one get
+their updated_at). Other databases keep a plain Show table.
+
+The downgrade copies the partitions back into a plain table; archived
+shows are dropped with ShowArchive.
+
+Revision ID: b6d2f8a3c170
+Revises: a4c7e9b1d358
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8a3c170'
+down_revision = 'a4c7e9b1d358'
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+
+INDEXES = (
+    ('ix_Show_updated_at_id', ['updated_at', 'id']),
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time_id', ['start_time', 'id']),
+)
+
+COLUMNS = 'id, start_time, venue_id, artist_id, updated_at'
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def create_show_table(partitioned):
+    op.execute("""
+        CREATE TABLE "Show" (
+            id integer NOT NULL DEFAULT nextval('"Show_id_seq"'),
+            start_time timestamp without time zone %s,
+            venue_id integer NOT NULL REFERENCES "Venue" (id),
+            artist_id integer NOT NULL REFERENCES "Artist" (id),
+            updated_at timestamp without time zone NOT NULL DEFAULT now(),
+            PRIMARY KEY (%s)
+        ) %s
+    """ % ('NOT NULL' if partitioned else 'NULL',
+           'id, start_time' if partitioned else 'id',
+           'PARTITION BY RANGE (start_time)' if partitioned else ''))
+
+
+def replace_show_table(partitioned):
+    # Rename Show away, create the new table with the same id sequence and
+    # indexes, copy the rows over and drop the old one.
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='Show')
+    op.execute('ALTER TABLE "Show" RENAME TO "Show_old"')
+    op.execute('ALTER TABLE "Show_old" RENAME CONSTRAINT "Show_pkey" TO "Show_old_pkey"')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+    create_show_table(partitioned)
+    if partitioned:
+        bounds = op.get_bind().execute(sa.text(
+            'SELECT min(coalesce(start_time, updated_at)) FROM "Show_old"')).scalar()
+        now = datetime.now()
+        month = datetime(*(bounds or now).timetuple()[:2], 1)
+        last = add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            op.execute("""CREATE TABLE "Show_%04d_%02d" PARTITION OF "Show" FOR VALUES FROM ('%s') TO ('%s')""" % (
+                month.year, month.month, month.isoformat(' '), add_months(month, 1).isoformat(' ')))
+            month = add_months(month, 1)
+        op.execute('CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT')
+        op.execute('INSERT INTO "Show" (%s) SELECT id, coalesce(start_time, updated_at), venue_id, artist_id, '
+                   'updated_at FROM "Show_old"' % COLUMNS)
+    else:
+        op.execute('INSERT INTO "Show" (%s) SELECT %s FROM "Show_old"' % (COLUMNS, COLUMNS))
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.execute('DROP TABLE "Show_old"')
+    # On a partitioned table each index is created on every partition,
+    # and on the partitions created later.
+    for name, columns in INDEXES:
+        op.create_index(name, 'Show', columns)
+
+
+def upgrade():
+    op.create_table('ShowArchive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ShowArchive_venue_id', 'ShowArchive', ['venue_id'])
+    op.create_index('ix_ShowArchive_artist_id', 'ShowArchive', ['artist_id'])
+    if op.get_bind().dialect.name == 'postgresql':
+        replace_show_table(partitioned=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        replace_show_table(partitioned=False)
+    op.drop_table('ShowArchive')
@@ -0,0 +1,40 @@
+"""name prefix indexes
+
+Indexes lower(name) of Venue and Artist for the autocomplete of the show
+form (search.prefix_search), in byte order so that the names starting
+with a prefix are one range of the index: COLLATE "C" on PostgreSQL,
+where the index is built CONCURRENTLY, SQLite's default elsewhere.
+
+Revision ID: c3e9a5d7f214
+Revises: b6d2f8a3c170
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9a5d7f214'
+down_revision = 'b6d2f8a3c170'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('Venue', 'Artist')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in TABLES:
+                op.execute('CREATE INDEX CONCURRENTLY "ix_%s_name_prefix" ON "%s" ((lower(name) COLLATE "C"))'
+                           % (table, table))
+    else:
+        for table in TABLES:
+            op.execute('CREATE INDEX "ix_%s_name_prefix" ON "%s" (lower(name))' % (table, table))
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_%s_name_prefix' % table, table_name=table)
@@ -0,0 +1,56 @@
+"""show counters
+
+Adds upcoming_shows_count / past_shows_count to Venue and Artist and the
+ShowCounterClock row, and backfills the counters from Show.
+
+Revision ID: c52e8f4a9d61
+Revises: 8a4d6e2f1b37
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8f4a9d61'
+down_revision = '8a4d6e2f1b37'
+branch_labels = None
+depends_on = None
+
+
+COUNTED = (('Venue', 'venue_id'), ('Artist', 'artist_id'))
+
+
+def upgrade():
+    for table, _ in COUNTED:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.add_column(sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+
+    clock = op.create_table('ShowCounterClock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    now = datetime.now()
+    op.bulk_insert(clock, [{'id': 1, 'rolled_at': now}])
+
+    for table, column in COUNTED:
+        op.get_bind().execute(sa.text("""
+            UPDATE "{0}" SET
+                upcoming_shows_count = (SELECT count(*) FROM "Show"
+                    WHERE "Show".{1} = "{0}".id AND "Show".start_time > :now),
+                past_shows_count = (SELECT count(*) FROM "Show"
+                    WHERE "Show".{1} = "{0}".id AND "Show".start_time <= :now)
+        """.format(table, column)), now=now)
+
+
+def downgrade():
+    op.drop_table('ShowCounterClock')
+    for table, _ in COUNTED:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
@@ -0,0 +1,51 @@
+"""show end_time
+
+Adds Show.end_time (and ShowArchive.end_time), backfilled two hours after
+start_time, for the booking conflict checks of schedule.py. On PostgreSQL
+a CHECK keeps shows within 0 and 24 hours long, the bound the overlap
+queries rely on (models.SHOW_MAX_DURATION). An exclusion constraint over
+tsrange cannot be used: PostgreSQL does not support them on a table
+partitioned by range of start_time.
+
+Revision ID: d5f1b7c9e362
+Revises: c3e9a5d7f214
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1b7c9e362'
+down_revision = 'c3e9a5d7f214'
+branch_labels = None
+depends_on = None
+
+
+DEFAULT_MINUTES = 120
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    op.add_column('ShowArchive', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    if postgresql:
+        op.execute('UPDATE "Show" SET end_time = start_time + interval \'%d minutes\'' % DEFAULT_MINUTES)
+        op.alter_column('Show', 'end_time', existing_type=sa.DateTime(), nullable=False)
+        op.create_check_constraint('ck_Show_duration', 'Show',
+                                   "end_time > start_time AND end_time <= start_time + interval '24 hours'")
+    else:
+        op.execute('UPDATE "Show" SET end_time = datetime(coalesce(start_time, updated_at), \'+%d minutes\')'
+                   % DEFAULT_MINUTES)
+        with op.batch_alter_table('Show') as batch_op:
+            batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('ck_Show_duration', 'Show', type_='check')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('end_time')
+    with op.batch_alter_table('ShowArchive') as batch_op:
+        batch_op.drop_column('end_time')
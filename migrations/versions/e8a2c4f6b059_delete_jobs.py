@@ -0,0 +1,51 @@
+"""delete jobs
+
+Adds the DeleteJob table and Venue/Artist.delete_job_id, set while a
+background delete job removes the row (hidden meanwhile).
+
+Revision ID: e8a2c4f6b059
+Revises: d5f1b7c9e362
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a2c4f6b059'
+down_revision = 'd5f1b7c9e362'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('DeleteJob',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('ids', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('shows_deleted', sa.Integer(), nullable=False),
+    sa.Column('rows_deleted', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Nullable columns without default: no table rewrite, and no batch
+    # copy on SQLite (which would lose the expression name index).
+    op.add_column('Venue', sa.Column('delete_job_id', sa.Integer(), nullable=True))
+    op.add_column('Artist', sa.Column('delete_job_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_column('Artist', 'delete_job_id')
+        op.drop_column('Venue', 'delete_job_id')
+    else:
+        for table in ('Artist', 'Venue'):
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column('delete_job_id')
+            op.execute('CREATE INDEX IF NOT EXISTS "ix_%s_name_prefix" ON "%s" (lower(name))' % (table, table))
+    op.drop_table('DeleteJob')
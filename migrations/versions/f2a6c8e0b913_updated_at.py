@@ -0,0 +1,42 @@
+"""updated_at
+
+Adds Venue/Artist/Show.updated_at, backfilled with the migration time,
+and the (updated_at, id) indexes the exports page through.
+
+Revision ID: f2a6c8e0b913
+Revises: e71b3d9c4a25
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6c8e0b913'
+down_revision = 'e71b3d9c4a25'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('Venue', 'Artist', 'Show')
+
+
+def upgrade():
+    for table in TABLES:
+        # SQLite cannot add a column with a non-constant default, so add it
+        # nullable, backfill, then tighten it (batch mode recreates the
+        # table there).
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE "%s" SET updated_at = CURRENT_TIMESTAMP' % table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False,
+                                  server_default=sa.func.now())
+        op.create_index('ix_%s_updated_at_id' % table, table, ['updated_at', 'id'])
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_%s_updated_at_id' % table, table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
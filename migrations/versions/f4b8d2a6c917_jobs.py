@@ -0,0 +1,54 @@
+"""jobs
+
+Adds the Job table, the queue of the background workers (`flask
+run-worker`, see jobs.py). The pending jobs of a recurring task share a
+key: the partial unique index keeps a single one queued or running.
+
+Revision ID: f4b8d2a6c917
+Revises: e8a2c4f6b059
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2a6c917'
+down_revision = 'e8a2c4f6b059'
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade():
+    op.create_table('Job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('args', sa.JSON(), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_Job_status_run_at', 'Job', ['status', 'run_at'])
+    op.create_index('ix_Job_finished_at', 'Job', ['finished_at'])
+    op.create_index('ix_Job_key_pending', 'Job', ['key'], unique=True,
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+
+
+def downgrade():
+    op.drop_index('ix_Job_key_pending', table_name='Job')
+    op.drop_index('ix_Job_finished_at', table_name='Job')
+    op.drop_index('ix_Job_status_run_at', table_name='Job')
+    op.drop_table('Job')
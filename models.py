@@ -0,0 +1,283 @@
+#----------------------------------------------------------------------------#
+# Models.
+#
+# The schema is managed by Flask-Migrate (flask db upgrade); nothing here
+# touches the database at import time.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from extensions import db
+
+
+class NameKey(FunctionElement):
+    # lower(name) in byte order, the key of the name prefix indexes
+    # (search.prefix_search): a prefix is then one range of the index.
+    # SQLite compares in byte order already; PostgreSQL needs COLLATE "C".
+    name = 'name_key'
+    type = db.String()
+
+
+@compiles(NameKey)
+def compile_name_key(element, compiler, **kw):
+    return 'lower(%s)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(NameKey, 'postgresql')
+def compile_name_key_postgresql(element, compiler, **kw):
+    return '(lower(%s) COLLATE "C")' % compiler.process(element.clauses, **kw)
+
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+
+    genres = db.Column(ARRAY(db.String()).with_variant(db.JSON, 'sqlite'))
+    website = db.Column(db.String())
+    seeking_talent = db.Column(db.String())
+    seeking_description = db.Column(db.String())
+
+    # Maintained show counters, see "Show counters" in queries.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Set while a DeleteJob removes the venue: it is hidden meanwhile.
+    delete_job_id = db.Column(db.Integer)
+
+    # Incremented by every edit, which must name the version it read (see
+    # "Profile edits" in queries.py).
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    # Last change, the keyset of exports (see "Exports" in queries.py).
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    __table_args__ = (
+        db.Index('ix_Venue_updated_at_id', 'updated_at', 'id'),
+        # Order and grouping of the /venues page.
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        # Autocomplete (search.prefix_search).
+        db.Index('ix_Venue_name_prefix', NameKey(name)),
+    )
+
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.Column(ARRAY(db.String(120)).with_variant(db.JSON, 'sqlite'))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+
+    website = db.Column(db.String())
+    seeking_venue = db.Column(db.String())
+    seeking_description = db.Column(db.String())
+
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    delete_job_id = db.Column(db.Integer)
+
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    __table_args__ = (
+        db.Index('ix_Artist_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_Artist_name_prefix', NameKey(name)),
+    )
+
+
+# Longest show: the overlap queries of schedule.py rely on it (a CHECK
+# constraint on PostgreSQL).
+SHOW_MAX_DURATION = timedelta(hours=24)
+
+
+def default_end_time(context):
+    # start_time + SHOW_DEFAULT_DURATION minutes, for inserts without one.
+    start_time = context.get_current_parameters()['start_time']
+    return start_time + timedelta(minutes=current_app.config['SHOW_DEFAULT_DURATION'])
+
+
+# On PostgreSQL the table is partitioned by month of start_time, with a
+# (id, start_time) primary key in the database (see partitions.py).
+class Show(db.Model):
+    __tablename__ = 'Show'
+    id = db.Column(db.Integer, primary_key=True)
+    start_time = db.Column(db.DateTime)
+    # The venue and the artist are booked until then (schedule.py).
+    end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    venue_name = db.relationship('Venue', backref=db.backref('shows'))
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+    artist = db.relationship('Artist', backref=db.backref('shows'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    __table_args__ = (
+        db.Index('ix_Show_updated_at_id', 'updated_at', 'id'),
+        # Venue/artist timelines (owner, then start_time against now) and
+        # the /shows listing keyset.
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
+
+
+# Shows moved out of Show by `flask maintain-show-partitions` once they are
+# older than SHOW_ARCHIVE_AFTER_MONTHS; no longer listed or counted.
+class ShowArchive(db.Model):
+    __tablename__ = 'ShowArchive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_time = db.Column(db.DateTime)
+    end_time = db.Column(db.DateTime)
+    venue_id = db.Column(db.Integer, nullable=False, index=True)
+    artist_id = db.Column(db.Integer, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.now, server_default=db.func.now())
+
+
+# Materialized listing for the /venues page, one row per (city, state).
+# Only maintained when AREA_SUMMARY_ENABLED is set in config.
+class AreaSummary(db.Model):
+    __tablename__ = 'AreaSummary'
+    id = db.Column(db.Integer, primary_key=True)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    num_venues = db.Column(db.Integer, nullable=False, default=0)
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+    venues = db.Column(db.JSON, nullable=False, default=list)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    __table_args__ = (db.UniqueConstraint('city', 'state'),)
+
+
+# Single row holding the moment the show counters were last rolled: the
+# counters count shows after rolled_at as upcoming and the rest as past.
+class ShowCounterClock(db.Model):
+    __tablename__ = 'ShowCounterClock'
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_at = db.Column(db.DateTime, nullable=False)
+
+
+# Progress of a bulk import; rows_done is committed together with each
+# batch so an interrupted import resumes after the last committed row.
+class ImportJob(db.Model):
+    __tablename__ = 'ImportJob'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    source = db.Column(db.String(500))
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    rows_imported = db.Column(db.Integer, nullable=False, default=0)
+    rows_failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.JSON, nullable=False, default=list)
+    message = db.Column(db.String())
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "format": self.format,
+            "source": self.source,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "rows_imported": self.rows_imported,
+            "rows_failed": self.rows_failed,
+            "errors": self.errors,
+            "message": self.message,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+
+# A background delete of venues or artists (kind) with their shows, in
+# batches of one transaction each; the rows stay hidden until it is done
+# (delete_job_id). Running it again continues where it stopped.
+class DeleteJob(db.Model):
+    __tablename__ = 'DeleteJob'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    ids = db.Column(db.JSON, nullable=False, default=list)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    shows_deleted = db.Column(db.Integer, nullable=False, default=0)
+    rows_deleted = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String())
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "ids": self.ids,
+            "status": self.status,
+            "shows_deleted": self.shows_deleted,
+            "rows_deleted": self.rows_deleted,
+            "attempts": self.attempts,
+            "message": self.message,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+
+# A unit of background work for the `flask run-worker` processes (see
+# jobs.py): the task `name` called with `args`, due at run_at. Jobs of a
+# recurring task share its `key`, unique among the pending ones.
+class Job(db.Model):
+    __tablename__ = 'Job'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    args = db.Column(db.JSON, nullable=False, default=list)
+    key = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=1)
+    message = db.Column(db.String())
+    worker = db.Column(db.String(100))
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # The workers' poll: due queued jobs in run_at order.
+        db.Index('ix_Job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_Job_finished_at', 'finished_at'),
+        db.Index('ix_Job_key_pending', 'key', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "args": self.args,
+            "key": self.key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "message": self.message,
+            "run_at": self.run_at.isoformat(),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at and self.started_at.isoformat(),
+            "finished_at": self.finished_at and self.finished_at.isoformat()
+        }
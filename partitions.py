@@ -0,0 +1,190 @@
+#----------------------------------------------------------------------------#
+# Show partitions and archival.
+#
+# On PostgreSQL Show is partitioned by range of start_time, one partition
+# per month ("Show_2026_10") plus "Show_default" for the rest (migration
+# b6d2f8a3c170). Queries that bound start_time, such as the upcoming shows
+# of a venue, only read the partitions of that range.
+#
+# `flask maintain-show-partitions` (daily or monthly, from cron):
+#   - creates the partitions of the next SHOW_PARTITION_MONTHS_AHEAD months,
+#     and of later months that already have shows in the default partition,
+#   - moves the shows that started before SHOW_ARCHIVE_AFTER_MONTHS ago to
+#     ShowArchive: whole monthly partitions are copied, detached and dropped,
+#     the rest (other databases, the default partition) is moved in batches.
+# Archived shows are no longer listed, so their venue/artist counters are
+# released and the pages listing them invalidated.
+#
+# Config:
+#   SHOW_PARTITION_MONTHS_AHEAD  monthly partitions created in advance.
+#   SHOW_ARCHIVE_AFTER_MONTHS    age of the archived shows (None: keep all).
+#   SHOW_ARCHIVE_BATCH_SIZE      shows moved per transaction.
+#----------------------------------------------------------------------------#
+
+import re
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from models import Show, ShowArchive
+from queries import invalidate_cache, release_show_counters, show_cache_tags
+
+
+DEFAULT_PARTITION = 'Show_default'
+PARTITION_NAME = re.compile(r'^Show_(\d{4})_(\d{2})$')
+ARCHIVED_COLUMNS = ('id', 'start_time', 'end_time', 'venue_id', 'artist_id', 'updated_at')
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return 'Show_%04d_%02d' % (month.year, month.month)
+
+
+def is_partitioned():
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute("""
+        SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = 'Show' AND c.relnamespace = 'public'::regnamespace
+    """).scalar() is not None
+
+
+def list_partitions():
+    # Monthly partitions as {first day of the month: name}.
+    rows = db.session.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'Show' AND p.relnamespace = 'public'::regnamespace
+    """)
+    partitions = {}
+    for (name,) in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+#  Creating partitions
+#  ----------------------------------------------------------------
+
+def create_partition(month):
+    # Shows of that month already in the default partition would violate
+    # the new partition's bounds: they are set aside and put back through
+    # the parent, which routes them to the new partition.
+    bounds = {'lower': month, 'upper': add_months(month, 1)}
+    in_month = 'start_time >= :lower AND start_time < :upper'
+    moved = db.session.execute(
+        'SELECT count(*) FROM "%s" WHERE %s' % (DEFAULT_PARTITION, in_month), bounds).scalar()
+    if moved:
+        db.session.execute('CREATE TEMPORARY TABLE show_moving ON COMMIT DROP AS SELECT * FROM "%s" WHERE %s'
+                           % (DEFAULT_PARTITION, in_month), bounds)
+        db.session.execute('DELETE FROM "%s" WHERE %s' % (DEFAULT_PARTITION, in_month), bounds)
+    db.session.execute('CREATE TABLE "%s" PARTITION OF "Show" FOR VALUES FROM (\'%s\') TO (\'%s\')' % (
+        partition_name(month), bounds['lower'].isoformat(' '), bounds['upper'].isoformat(' ')))
+    if moved:
+        db.session.execute('INSERT INTO "Show" SELECT * FROM show_moving')
+    return moved
+
+
+def ensure_partitions(now=None, since=None):
+    # Create the missing monthly partitions; returns [(name, shows moved
+    # out of the default partition)], one transaction per partition. Months
+    # since `since` with shows in the default partition get one too.
+    now = now or datetime.now()
+    existing = list_partitions()
+    months = {add_months(month_start(now), count)
+              for count in range(current_app.config['SHOW_PARTITION_MONTHS_AHEAD'] + 1)}
+    stray = db.session.execute(
+        'SELECT DISTINCT date_trunc(\'month\', start_time) FROM "%s" WHERE start_time >= :lower'
+        % DEFAULT_PARTITION, {'lower': since or datetime.min})
+    months.update(row[0] for row in stray)
+    created = []
+    for month in sorted(months - set(existing)):
+        moved = create_partition(month)
+        db.session.commit()
+        created.append((partition_name(month), moved))
+    return created
+
+
+#  Archiving
+#  ----------------------------------------------------------------
+
+def archive_before(now=None):
+    # Shows that started before this are archived (None: never).
+    months = current_app.config['SHOW_ARCHIVE_AFTER_MONTHS']
+    if months is None:
+        return None
+    return add_months(month_start(now or datetime.now()), -months)
+
+
+def move_to_archive(*criteria):
+    # Uncount the matching shows and copy them into ShowArchive; the caller
+    # removes them from Show. Returns the cache tags to invalidate.
+    tags = show_cache_tags(*criteria)
+    release_show_counters(*criteria)
+    columns = [getattr(Show, column) for column in ARCHIVED_COLUMNS]
+    db.session.execute(ShowArchive.__table__.insert().from_select(
+        ARCHIVED_COLUMNS, db.select(columns).where(db.and_(*criteria))))
+    return tags
+
+
+def archive_partition(month, name):
+    # Writes to the partition wait on the lock until it is dropped; the
+    # parent is only locked by the DETACH, at the end of the transaction.
+    in_month = (Show.start_time >= month, Show.start_time < add_months(month, 1))
+    db.session.execute('LOCK TABLE "%s" IN EXCLUSIVE MODE' % name)
+    count = db.session.execute('SELECT count(*) FROM "%s"' % name).scalar()
+    tags = move_to_archive(*in_month)
+    db.session.execute('ALTER TABLE "Show" DETACH PARTITION "%s"' % name)
+    db.session.execute('DROP TABLE "%s"' % name)
+    return count, tags
+
+
+def archive_shows(before, batch_size=None):
+    # Move the shows that started before `before` to ShowArchive. Returns
+    # (partitions dropped, shows archived); commits as it goes.
+    batch_size = batch_size or current_app.config['SHOW_ARCHIVE_BATCH_SIZE']
+    dropped, archived = [], 0
+    if is_partitioned():
+        for month, name in sorted(list_partitions().items()):
+            if add_months(month, 1) > before:
+                break
+            count, tags = archive_partition(month, name)
+            db.session.commit()
+            invalidate_cache('shows', *tags)
+            dropped.append(name)
+            archived += count
+
+    # Other databases, and what partitions did not cover.
+    while True:
+        ids = [row[0] for row in db.session.query(Show.id).filter(Show.start_time < before)
+               .order_by(Show.start_time, Show.id).limit(batch_size)]
+        if not ids:
+            break
+        tags = move_to_archive(Show.id.in_(ids))
+        db.session.query(Show).filter(Show.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_cache('shows', *tags)
+        archived += len(ids)
+    return dropped, archived
+
+
+def maintain(now=None):
+    # The `flask maintain-show-partitions` job: returns (partitions created,
+    # partitions dropped, shows archived).
+    now = now or datetime.now()
+    before = archive_before(now)
+    created = ensure_partitions(now, before) if is_partitioned() else []
+    dropped, archived = archive_shows(before) if before is not None else ([], 0)
+    return created, dropped, archived
+
@@ -0,0 +1,913 @@
+#----------------------------------------------------------------------------#
+# Queries.
+#
+# Data access shared by the pages, the JSON API and the CLI commands. Runs
+# inside an application context.
+#----------------------------------------------------------------------------#
+
+import io
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+import exporter
+import importer
+import instrumentation
+import jobs
+import schedule
+from database import statement_timeout, set_statement_timeout
+from extensions import db, page_cache
+from models import Venue, Artist, Show, ShowArchive, AreaSummary, ShowCounterClock, DeleteJob
+from search import create_search_backend, prefix_search
+
+
+def visible(model):
+  # Criterion of the venues/artists not being deleted (see "Deletes").
+  return model.delete_job_id.is_(None)
+
+
+def query_venue_areas(*criteria):
+  # One query for every venue with its upcoming show count, grouped by
+  # (city, state) in Python. Returns the list the venues page expects.
+  rows = db.session.query(
+      Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count
+  ).filter(visible(Venue), *criteria).order_by(Venue.state, Venue.city, Venue.name, Venue.id)
+
+  areas = []
+  for (city, state), venues_in_city in itertools.groupby(rows, key=lambda row: (row[2], row[3])):
+      areas.append({
+        "city": city,
+        "state": state,
+        "venues": [{
+            "id": row[0],
+            "name": row[1],
+            "num_upcoming_shows": row[4]
+        } for row in venues_in_city]
+      })
+  return areas
+
+
+def area_filter(areas):
+  # SQL criterion matching any of the given (city, state) pairs.
+  return db.or_(*[db.and_(Venue.city == city, Venue.state == state) for city, state in areas])
+
+
+def venue_areas(*criteria):
+  # Distinct (city, state) pairs of the venues matching criteria.
+  return set(db.session.query(Venue.city, Venue.state).filter(*criteria).distinct())
+
+
+def show_areas(*criteria):
+  # Distinct (city, state) pairs of the venues hosting the matching shows.
+  return set(db.session.query(Venue.city, Venue.state).join(Show, Show.venue_id == Venue.id)
+             .filter(*criteria).distinct())
+
+
+def refresh_area_summary(areas=None):
+  # Rebuild the AreaSummary rows of the given areas (all areas when None)
+  # inside the caller's transaction. Does nothing unless enabled in config.
+  if not current_app.config.get('AREA_SUMMARY_ENABLED'):
+      return
+  if areas is None:
+      db.session.query(AreaSummary).delete()
+      fresh = query_venue_areas()
+  else:
+      areas = set(areas)
+      if not areas:
+          return
+      db.session.query(AreaSummary).filter(db.or_(*[
+          db.and_(AreaSummary.city == city, AreaSummary.state == state) for city, state in areas
+      ])).delete(synchronize_session=False)
+      fresh = query_venue_areas(area_filter(areas))
+
+  now = datetime.now()
+  db.session.bulk_insert_mappings(AreaSummary, [{
+      "city": area["city"],
+      "state": area["state"],
+      "num_venues": len(area["venues"]),
+      "num_upcoming_shows": sum(venue["num_upcoming_shows"] for venue in area["venues"]),
+      "venues": area["venues"],
+      "refreshed_at": now
+  } for area in fresh])
+
+
+#  Show counters
+#  ----------------------------------------------------------------
+#  Venue/Artist.upcoming_shows_count and past_shows_count are kept in
+#  step with the Show table by the write controllers, in the same
+#  transaction. `flask roll-show-counters` (run periodically) moves shows
+#  that have started from upcoming to past, and `flask reconcile-show-counters`
+#  checks for and repairs drift.
+
+def show_counter_clock(lock=False):
+  # The ShowCounterClock row, created on first use.
+  query = db.session.query(ShowCounterClock)
+  if lock:
+      query = query.with_for_update()
+  clock = query.get(1)
+  if clock is None:
+      clock = ShowCounterClock(id=1, rolled_at=datetime.now())
+      db.session.add(clock)
+      db.session.flush()
+  return clock
+
+
+def show_boundary():
+  # SQL expression of the time splitting upcoming from past shows: the
+  # counters' rolled_at, or now when the counters are not being rolled.
+  # A subquery, so reading it adds no round trip.
+  now = datetime.now()
+  rolled_at = db.session.query(ShowCounterClock.rolled_at).filter(
+      ShowCounterClock.id == 1,
+      ShowCounterClock.rolled_at >= now - timedelta(seconds=current_app.config['SHOW_COUNTER_MAX_LAG'])
+  ).as_scalar()
+  return db.func.coalesce(rolled_at, now)
+
+
+def bump_show_counters(model, deltas):
+  # Add (id, upcoming_delta, past_delta) to the counters of model rows,
+  # as one executemany UPDATE. Counters are derived data, so updated_at
+  # is left alone.
+  deltas = [delta for delta in deltas if delta[1] or delta[2]]
+  if not deltas:
+      return
+  table = model.__table__
+  db.session.execute(
+      table.update().where(table.c.id == db.bindparam('row_id')).values(
+          upcoming_shows_count=table.c.upcoming_shows_count + db.bindparam('upcoming'),
+          past_shows_count=table.c.past_shows_count + db.bindparam('past'),
+          updated_at=table.c.updated_at
+      ),
+      [{"row_id": row_id, "upcoming": upcoming, "past": past} for row_id, upcoming, past in deltas]
+  )
+
+
+def count_show_counters(*criteria):
+  # Upcoming/past counts of the matching shows relative to the clock,
+  # grouped per venue and per artist: {Venue: [(id, up, past)], Artist: [...]}.
+  boundary = show_counter_clock().rolled_at
+  upcoming = db.func.sum(db.case([(Show.start_time > boundary, 1)], else_=0))
+  past = db.func.sum(db.case([(Show.start_time <= boundary, 1)], else_=0))
+  return {
+      model: db.session.query(column, upcoming, past).filter(*criteria).group_by(column).all()
+      for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id))
+  }
+
+
+def add_show_counters(venue_id, artist_id, start_time):
+  # Count a newly inserted show.
+  if start_time > show_counter_clock().rolled_at:
+      delta = (1, 0)
+  else:
+      delta = (0, 1)
+  bump_show_counters(Venue, [(int(venue_id),) + delta])
+  bump_show_counters(Artist, [(int(artist_id),) + delta])
+
+
+def release_show_counters(*criteria):
+  # Uncount the shows matching criteria; call before deleting them.
+  for model, rows in count_show_counters(*criteria).items():
+      bump_show_counters(model, [(row_id, -upcoming, -past) for row_id, upcoming, past in rows])
+
+
+def roll_show_counters(now=None):
+  # Move shows that started since the last roll from upcoming to past.
+  clock = show_counter_clock(lock=True)
+  now = now or datetime.now()
+  if now <= clock.rolled_at:
+      return 0
+  window = (Show.start_time > clock.rolled_at, Show.start_time <= now)
+  rolled = 0
+  for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+      rows = db.session.query(column, db.func.count(Show.id)).filter(*window).group_by(column).all()
+      bump_show_counters(model, [(row_id, -count, count) for row_id, count in rows])
+      if model is Venue:
+          rolled = sum(count for row_id, count in rows)
+  if rolled:
+      refresh_area_summary(show_areas(*window))
+      invalidate_cache('venues', *show_cache_tags(*window))
+  clock.rolled_at = now
+  return rolled
+
+
+def reconcile_show_counters(fix=False):
+  # Compare every counter with a recount from Show and return the drifted
+  # rows as (model name, id, stored (up, past), actual (up, past)). With
+  # fix=True the counters are corrected in the current transaction.
+  clock = show_counter_clock(lock=fix)
+  drift = []
+  for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+      actual = db.session.query(
+          column.label('row_id'),
+          db.func.sum(db.case([(Show.start_time > clock.rolled_at, 1)], else_=0)).label('upcoming'),
+          db.func.sum(db.case([(Show.start_time <= clock.rolled_at, 1)], else_=0)).label('past')
+      ).group_by(column).subquery()
+      actual_upcoming = db.func.coalesce(actual.c.upcoming, 0)
+      actual_past = db.func.coalesce(actual.c.past, 0)
+      rows = db.session.query(
+          model.id, model.upcoming_shows_count, model.past_shows_count, actual_upcoming, actual_past
+      ).outerjoin(actual, actual.c.row_id == model.id).filter(db.or_(
+          model.upcoming_shows_count != actual_upcoming,
+          model.past_shows_count != actual_past
+      )).all()
+      drift.extend((model.__name__, row[0], (row[1], row[2]), (row[3], row[4])) for row in rows)
+      if fix:
+          bump_show_counters(model, [(row[0], row[3] - row[1], row[4] - row[2]) for row in rows])
+  return drift
+
+
+#  Cache invalidation
+#  ----------------------------------------------------------------
+#  Page cache tags: 'venues', 'artists' and 'shows' for the listings,
+#  'venue:<id>' / 'artist:<id>' for the detail pages.
+
+def show_cache_tags(*criteria):
+  # Tags of the venue and artist pages that list the matching shows.
+  tags = set()
+  for venue_id, artist_id in db.session.query(Show.venue_id, Show.artist_id).filter(*criteria).distinct():
+      tags.add('venue:%d' % venue_id)
+      tags.add('artist:%d' % artist_id)
+  return tags
+
+
+def invalidate_cache(*tags):
+  page_cache.invalidate(*tags)
+
+
+#  Concurrent queries
+#  ----------------------------------------------------------------
+#  Independent reads of one request can run in parallel, each on its own
+#  pooled connection (outside the request's transaction). Worth it when
+#  the database runs them in parallel, so 'auto' enables it on PostgreSQL.
+
+def concurrent_queries_enabled():
+  setting = current_app.config['CONCURRENT_QUERIES']
+  if setting == 'auto':
+      return db.engine.dialect.name == 'postgresql'
+  return bool(setting)
+
+
+def query_executor():
+  if 'query_executor' not in current_app.extensions:
+      current_app.extensions['query_executor'] = ThreadPoolExecutor(
+          max_workers=current_app.config['QUERY_THREADS'], thread_name_prefix='query')
+  return current_app.extensions['query_executor']
+
+
+def fetch_all(*queries):
+  # Rows of each query (None = no query, no rows), concurrently when
+  # enabled, else one after the other in the session.
+  pending = [query for query in queries if query is not None]
+  if len(pending) < 2 or not concurrent_queries_enabled():
+      return [query.all() if query is not None else [] for query in queries]
+
+  engine = db.session.get_bind()
+  sample = instrumentation.current_sample()
+  timeout = statement_timeout()
+
+  def run(query):
+      with instrumentation.bind_sample(sample), engine.begin() as connection:
+          set_statement_timeout(connection, timeout)
+          return connection.execute(query.statement).fetchall()
+
+  futures = [query_executor().submit(run, query) if query is not None else None for query in queries]
+  return [future.result() if future is not None else [] for future in futures]
+
+
+def page_info(page, per_page, total):
+  # Pagination state handed to templates alongside a page of rows.
+  pages = max(1, -(-total // per_page))
+  return {
+      "page": page,
+      "pages": pages,
+      "has_prev": page > 1,
+      "has_next": page < pages
+  }
+
+
+#  Profiles
+#  ----------------------------------------------------------------
+#  Venue and artist records shared by the HTML pages and the JSON API:
+#  only the requested columns are selected, for any number of ids in one
+#  IN query.
+
+PROFILE_FIELDS = {
+    'venue': ('id', 'name', 'genres', 'address', 'city', 'state', 'phone', 'website', 'facebook_link',
+              'seeking_talent', 'seeking_description', 'image_link', 'upcoming_shows_count', 'past_shows_count'),
+    'artist': ('id', 'name', 'genres', 'city', 'state', 'phone', 'website', 'facebook_link',
+               'seeking_venue', 'seeking_description', 'image_link', 'upcoming_shows_count', 'past_shows_count'),
+}
+PROFILE_MODELS = {
+    'venue': Venue,
+    'artist': Artist,
+}
+
+
+def profile_columns(kind, fields=None):
+  # Column names to select: `fields` (all when None) plus the id.
+  fields = fields or PROFILE_FIELDS[kind]
+  return ('id',) + tuple(field for field in fields if field != 'id')
+
+
+def query_profiles(kind, ids, fields=None):
+  # Profiles (dicts) of the venues/artists with the given ids, in ids
+  # order; unknown ids are skipped.
+  model = PROFILE_MODELS[kind]
+  columns = profile_columns(kind, fields)
+  if not ids:
+      return []
+  rows = db.session.query(*[getattr(model, column) for column in columns]).filter(model.id.in_(ids), visible(model))
+  profiles = {row[0]: dict(zip(columns, row)) for row in rows}
+  return [profiles[row_id] for row_id in ids if row_id in profiles]
+
+
+def query_profile_page(kind, fields=None, after=None, limit=50):
+  # One page of profiles by id, after the id `after`, and the cursor of the
+  # next page (None on the last page).
+  model = PROFILE_MODELS[kind]
+  columns = profile_columns(kind, fields)
+  query = db.session.query(*[getattr(model, column) for column in columns]).filter(visible(model))
+  if after is not None:
+      query = query.filter(model.id > after)
+  rows = query.order_by(model.id).limit(limit + 1).all()
+  next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+  return [dict(zip(columns, row)) for row in rows[:limit]], next_cursor
+
+
+def query_show_timeline(owner, profile, upcoming_page=1, past_page=1, per_page=None):
+  # Past and upcoming shows of a venue (owner='venue') or an artist
+  # (owner='artist') with the counterpart's name and image: one joined
+  # query per page, split at show_boundary(). Totals come from the show
+  # counters of the owner's profile, split at the same time unless the
+  # counters lag behind by more than SHOW_COUNTER_MAX_LAG.
+  if owner == 'venue':
+      owner_column, counterpart, relationship, prefix = Show.venue_id, Artist, Show.artist, 'artist'
+  else:
+      owner_column, counterpart, relationship, prefix = Show.artist_id, Venue, Show.venue_name, 'venue'
+  per_page = per_page or current_app.config['SHOWS_PER_PAGE']
+  upcoming_page, past_page = max(1, upcoming_page), max(1, past_page)
+  owner_id = profile['id']
+  upcoming_count, past_count = profile['upcoming_shows_count'], profile['past_shows_count']
+  boundary = show_boundary()
+
+  def page_query(criterion, order, page, total):
+      if (page - 1) * per_page >= total:
+          return None
+      return db.session.query(counterpart.id, counterpart.name, counterpart.image_link, Show.start_time) \
+          .select_from(Show).join(relationship) \
+          .filter(owner_column == owner_id, criterion, visible(counterpart)) \
+          .order_by(order, Show.id) \
+          .limit(per_page).offset((page - 1) * per_page)
+
+  def page_rows(rows):
+      return [{
+          prefix + "_id": row[0],
+          prefix + "_name": row[1],
+          prefix + "_image_link": row[2],
+          "start_time": row[3]
+      } for row in rows]
+
+  # The two pages are independent: fetched concurrently when enabled.
+  upcoming, past = fetch_all(
+      page_query(Show.start_time > boundary, Show.start_time.asc(), upcoming_page, upcoming_count),
+      page_query(Show.start_time <= boundary, Show.start_time.desc(), past_page, past_count))
+  return {
+      "upcoming_shows": page_rows(upcoming),
+      "past_shows": page_rows(past),
+      "upcoming_shows_count": upcoming_count,
+      "past_shows_count": past_count,
+      "upcoming_page": page_info(upcoming_page, per_page, upcoming_count),
+      "past_page": page_info(past_page, per_page, past_count)
+  }
+
+
+def query_show_listing(when=None, start=None, end=None, after=None, ids=None):
+  # Shows joined with their artist and venue in a single query, ordered by
+  # (start_time, id). `when` is 'past' or 'upcoming', `start`/`end` bound
+  # start_time, `after` is the (start_time, id) keyset of the last row
+  # already seen and `ids` restricts the listing to those shows.
+  query = db.session.query(
+      Show.id, Show.start_time,
+      Show.venue_id, Venue.name,
+      Show.artist_id, Artist.name, Artist.image_link
+  ).select_from(Show).join(Show.venue_name).join(Show.artist).filter(visible(Venue), visible(Artist))
+
+  # Split like the venue and artist pages.
+  if when == 'upcoming':
+      query = query.filter(Show.start_time > show_boundary())
+  elif when == 'past':
+      query = query.filter(Show.start_time <= show_boundary())
+  if ids is not None:
+      query = query.filter(Show.id.in_(ids))
+  if start is not None:
+      query = query.filter(Show.start_time >= start)
+  if end is not None:
+      query = query.filter(Show.start_time < end)
+  if after is not None:
+      after_time, after_id = after
+      query = query.filter(db.or_(
+          Show.start_time > after_time,
+          db.and_(Show.start_time == after_time, Show.id > after_id)
+      ))
+  return query.order_by(Show.start_time, Show.id)
+
+
+def show_listing_row(row):
+  # Listing row -> dict used by pages/shows.html.
+  return {
+      "show_id": row[0],
+      "venue_id": row[2],
+      "venue_name": row[3],
+      "artist_id": row[4],
+      "artist_name": row[5],
+      "artist_image_link": row[6],
+      "start_time": row[1]
+  }
+
+
+def encode_show_cursor(row):
+  return '%s_%d' % (row[1].isoformat(), row[0])
+
+
+def decode_show_cursor(cursor):
+  # Inverse of encode_show_cursor; raises ValueError on malformed input.
+  start_time, show_id = cursor.rsplit('_', 1)
+  return datetime.fromisoformat(start_time), int(show_id)
+
+
+def get_search_backend():
+  # The configured search backend, created on first use once the database
+  # dialect is known.
+  if 'search' not in current_app.extensions:
+      current_app.extensions['search'] = create_search_backend(
+          current_app.config['SEARCH_BACKEND'], db.engine.dialect.name, current_app.config['SEARCH_MEMORY_MAX_AGE'])
+  return current_app.extensions['search']
+
+
+def reindex_search(model, ids):
+  get_search_backend().update(db.session, model, ids)
+
+
+def unindex_search(model, ids):
+  get_search_backend().remove(model, ids)
+
+
+def enqueue_thumbnails(image_link):
+  # Resize a new or changed venue/artist image in the background, once
+  # the caller's transaction commits.
+  if image_link and current_app.config['IMAGE_PROXY_ENABLED']:
+      jobs.enqueue('thumbnails', image_link)
+
+
+def search_listing(model, term, offset=0):
+  # Ranked search results with their upcoming show counts: the backend
+  # query plus one query for the names and counters.
+  limit = current_app.config['SEARCH_RESULTS_PER_PAGE']
+  key = 'search:%s:%d:%s' % (model.__tablename__, offset, term.strip().lower())
+  tags = ('venues' if model is Venue else 'artists', 'shows')
+  return page_cache.fragment(key, tags, lambda: build_search_listing(model, term, offset, limit))
+
+
+def build_search_listing(model, term, offset, limit):
+  total, ids = get_search_backend().search(db.session, model, term, limit, offset)
+  rows = {}
+  if ids:
+      rows = {row[0]: row for row in db.session.query(model.id, model.name, model.upcoming_shows_count)
+              .filter(model.id.in_(ids))}
+  return {
+      "count": total,
+      "offset": offset,
+      "limit": limit,
+      "data": [{
+          "id": doc_id,
+          "name": rows[doc_id][1],
+          "num_upcoming_shows": rows[doc_id][2]
+      } for doc_id in ids if doc_id in rows]
+  }
+
+
+#  Show form choices
+#  ----------------------------------------------------------------
+#  The show form offers the latest SHOW_FORM_CHOICES venues and artists and
+#  finds the others by name prefix (the autocomplete API). Both are cached
+#  under the 'venues'/'artists' tags, invalidated by every write.
+
+CHOICE_MODELS = {
+    'venue': (Venue, 'venues'),
+    'artist': (Artist, 'artists'),
+}
+
+
+def choice_label(row_id, name):
+  return '(id: %d), Name: %s' % (row_id, name)
+
+
+def query_choices(kind):
+  # [(id, label)] options of the show form select.
+  model, tag = CHOICE_MODELS[kind]
+
+  def build():
+      rows = db.session.query(model.id, model.name).filter(visible(model)).order_by(model.id.desc()) \
+          .limit(current_app.config['SHOW_FORM_CHOICES'])
+      return [(row_id, choice_label(row_id, name)) for row_id, name in rows]
+  return page_cache.fragment('choices:' + kind, [tag], build)
+
+
+def autocomplete(kind, prefix, limit):
+  # Venues/artists whose name starts with prefix, in name order.
+  model, tag = CHOICE_MODELS[kind]
+  prefix = prefix.strip().lower()
+
+  def build():
+      return [{"id": row_id, "name": name, "label": choice_label(row_id, name)}
+              for row_id, name in prefix_search(db.session, model, prefix, limit)]
+  return page_cache.fragment('autocomplete:%s:%d:%s' % (kind, limit, prefix), [tag], build)
+
+
+#  Bulk import
+#  ----------------------------------------------------------------
+#  Rows are validated with the create forms, written per batch with COPY
+#  (PostgreSQL) or executemany, and the counters, area summary and cache
+#  are updated in the same batch transaction; the search index once the
+#  job is over.
+
+IMPORT_MODELS = {
+    'venue': Venue,
+    'artist': Artist,
+    'show': Show,
+}
+IMPORT_FORMS = {
+    'venue': 'VenueForm',
+    'artist': 'ArtistForm',
+    'show': 'ShowForm',
+}
+
+
+def import_form(kind):
+  # Form class validating the rows of kind. WTForms is only loaded once
+  # something is imported.
+  import forms
+  return getattr(forms, IMPORT_FORMS[kind])
+
+
+def copy_value(value):
+  # Python value -> PostgreSQL COPY (CSV) field. None is the unquoted empty
+  # field, COPY's NULL; anything else is quoted, so '' stays a string.
+  if value is None:
+      return ''
+  if isinstance(value, list):
+      value = '{' + ','.join('"%s"' % item.replace('\\', '\\\\').replace('"', '\\"') for item in value) + '}'
+  return '"%s"' % str(value).replace('"', '""')
+
+
+def write_import_rows(model, rows):
+  if not rows:
+      return
+  table = model.__table__
+  mode = current_app.config['IMPORT_WRITE_MODE']
+  if mode == 'auto':
+      mode = 'copy' if db.engine.dialect.name == 'postgresql' else 'executemany'
+  if mode == 'copy':
+      columns = list(rows[0])
+      buffer = io.StringIO()
+      for row in rows:
+          buffer.write(','.join(copy_value(row[column]) for column in columns) + '\n')
+      buffer.seek(0)
+      cursor = db.session.connection().connection.cursor()
+      cursor.copy_expert('COPY "%s" (%s) FROM STDIN WITH CSV' % (table.name, ', '.join(columns)), buffer)
+  else:
+      db.session.execute(table.insert(), rows)
+
+
+def resolve_show_references(batch):
+  # Replace venue_name/artist_name by ids and return the sets of existing
+  # venue and artist ids referenced by the batch: two queries per side.
+  existing = {}
+  for side, model in (('venue', Venue), ('artist', Artist)):
+      id_field, name_field = side + '_id', side + '_name'
+      names = {data[name_field] for number, data in batch if id_field not in data and name_field in data}
+      by_name = {}
+      if names:
+          for row_id, name in db.session.query(model.id, model.name).filter(model.name.in_(names), visible(model)):
+              by_name.setdefault(name, []).append(row_id)
+      for number, data in batch:
+          matches = by_name.get(data.get(name_field), [])
+          if id_field not in data and len(matches) == 1:
+              data[id_field] = str(matches[0])
+      ids = {int(data[id_field]) for number, data in batch if data.get(id_field, '').isdigit()}
+      existing[side] = {row_id for (row_id,) in db.session.query(model.id).filter(model.id.in_(ids), visible(model))} \
+          if ids else set()
+  return existing
+
+
+def show_duration(minutes):
+  # Duration of a show from the form's minutes (default when empty).
+  return timedelta(minutes=minutes) if minutes else schedule.default_duration()
+
+
+def import_batch(kind, batch):
+  # Validate and write one batch. Returns (rows imported, per-row errors).
+  form_class, model = import_form(kind), IMPORT_MODELS[kind]
+  batch = [(number, importer.form_data(kind, record)) for number, record in batch]
+  prepare = None
+  if kind == 'show':
+      existing = resolve_show_references(batch)
+
+      def prepare(form):
+          form.known_ids = {side + '_id': existing[side] for side in ('venue', 'artist')}
+
+  rows, errors = [], []
+  for number, data in batch:
+      values, row_errors = importer.validate(form_class, data, prepare)
+      if row_errors:
+          errors.append({"row": number, "errors": row_errors})
+          continue
+      if kind == 'show':
+          values = {
+              "venue_id": int(values['venue_id']),
+              "artist_id": int(values['artist_id']),
+              "start_time": values['start_time'],
+              "end_time": values['start_time'] + show_duration(values['duration'])
+          }
+      rows.append((number, values))
+
+  if kind == 'show' and rows:
+      # Double bookings, against the database and within the batch.
+      schedule.lock_schedule([row['venue_id'] for _, row in rows], [row['artist_id'] for _, row in rows])
+      conflicts = schedule.check_batch([row for _, row in rows])
+      errors.extend({"row": number, "errors": {"start_time": conflicts[index]}}
+                    for index, (number, row) in enumerate(rows) if index in conflicts)
+      errors.sort(key=lambda error: error['row'])
+      rows = [row for index, row in enumerate(rows) if index not in conflicts]
+  rows = [row for _, row in rows]
+
+  write_import_rows(model, rows)
+  if kind == 'venue':
+      refresh_area_summary({(row['city'], row['state']) for row in rows})
+      invalidate_cache('venues')
+  elif kind == 'artist':
+      invalidate_cache('artists')
+  elif rows:
+      boundary = show_counter_clock().rolled_at
+      for model, side in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+          deltas = {}
+          for row in rows:
+              upcoming, past = deltas.get(row[side], (0, 0))
+              if row['start_time'] > boundary:
+                  upcoming += 1
+              else:
+                  past += 1
+              deltas[row[side]] = (upcoming, past)
+          bump_show_counters(model, [(row_id,) + delta for row_id, delta in deltas.items()])
+      venue_ids = {row['venue_id'] for row in rows}
+      refresh_area_summary(venue_areas(Venue.id.in_(venue_ids)))
+      invalidate_cache('shows', 'venues',
+                       *(['venue:%d' % venue_id for venue_id in venue_ids] +
+                         ['artist:%d' % row['artist_id'] for row in rows]))
+  return len(rows), errors
+
+
+def run_import(job, stream, batch_size=None, progress=None):
+  # Import `stream` into job.kind, resuming after job.rows_done. Each batch
+  # commits its rows together with the job's progress.
+  batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+  max_errors = current_app.config['IMPORT_MAX_ERRORS']
+  job.status = 'running'
+  db.session.commit()
+  try:
+      records = importer.read_records(stream, job.format)
+      for batch in importer.batches(records, batch_size, skip=job.rows_done):
+          imported, errors = import_batch(job.kind, batch)
+          job.rows_done = batch[-1][0]
+          job.rows_imported += imported
+          job.rows_failed += len(errors)
+          if errors and len(job.errors) < max_errors:
+              job.errors = job.errors + errors[:max_errors - len(job.errors)]
+          job.updated_at = datetime.now()
+          db.session.commit()
+          if progress:
+              progress(job, errors)
+      job.status = 'done'
+  except Exception as e:
+      db.session.rollback()
+      job.status = 'failed'
+      job.message = str(e)
+      current_app.logger.exception('Import %s failed', job.id)
+  if job.kind != 'show' and job.rows_imported:
+      # Once per job: the in-process index is rebuilt on its next search.
+      get_search_backend().reset(IMPORT_MODELS[job.kind])
+  job.updated_at = datetime.now()
+  db.session.commit()
+  return job
+
+
+#  Profile edits
+#  ----------------------------------------------------------------
+#  The edit forms post the version of the row they were opened at. Only
+#  the columns that differ from the stored row are written, by an UPDATE
+#  conditioned on that version (and incrementing it): when someone else
+#  saved in between it matches no row, and the editor is told instead of
+#  overwriting their changes. A submission that changes nothing writes
+#  nothing. Caches, the search index, the area summary and thumbnails are
+#  only refreshed for the fields that changed.
+
+EDITABLE_FIELDS = {
+    Venue: ('name', 'genres', 'address', 'city', 'state', 'phone', 'website', 'facebook_link',
+            'seeking_talent', 'seeking_description', 'image_link'),
+    Artist: ('name', 'genres', 'city', 'state', 'phone', 'website', 'facebook_link',
+             'seeking_venue', 'seeking_description', 'image_link'),
+}
+# Indexed for search, and shown by the venue/artist listings, search
+# results and show form choices (cached under 'venues'/'artists').
+LISTED_FIELDS = {'name', 'city', 'state', 'genres'}
+# Shown next to the shows: /shows and the pages of the other side.
+SHOW_FIELDS = {'name', 'image_link'}
+# Stored in the venue area summary.
+AREA_FIELDS = {'name', 'city', 'state'}
+
+
+def same_value(stored, submitted):
+  # Empty form fields match NULL columns.
+  return (stored or None) == (submitted or None)
+
+
+def update_profile(model, row_id, version, values):
+  # Save an edit of a venue or artist made at `version`. Returns
+  # ('updated' | 'unchanged' | 'conflict', fields): the fields written or,
+  # on conflict, those where `values` differ from the stored row. Without
+  # a version (a stale form or a script) there is nothing to check the
+  # edit against: a conflict too. Commits; raises NoResultFound for
+  # unknown or deleted rows.
+  fields = EDITABLE_FIELDS[model]
+  row = db.session.query(model.version, *[getattr(model, field) for field in fields]) \
+      .filter(model.id == row_id, visible(model)).one()
+  stored = dict(zip(fields, row[1:]))
+  changed = [field for field in fields if not same_value(stored[field], values[field])]
+  if version != row.version:
+      db.session.rollback()
+      return 'conflict', changed
+  if not changed:
+      db.session.rollback()
+      return 'unchanged', changed
+
+  kind = 'venue' if model is Venue else 'artist'
+  owner = Show.venue_id if model is Venue else Show.artist_id
+  tags = {'%s:%d' % (kind, row_id)}
+  if LISTED_FIELDS.intersection(changed):
+      tags.add(kind + 's')
+  if SHOW_FIELDS.intersection(changed):
+      tags.update(show_cache_tags(owner == row_id))
+      tags.add('shows')
+  written = db.session.query(model).filter(model.id == row_id, model.version == row.version).update(
+      dict({field: values[field] for field in changed}, version=model.version + 1), synchronize_session=False)
+  if not written:
+      # Saved by someone else since it was read above.
+      db.session.rollback()
+      return 'conflict', changed
+  if model is Venue and AREA_FIELDS.intersection(changed):
+      refresh_area_summary({(stored['city'], stored['state']), (values['city'], values['state'])})
+  if 'image_link' in changed:
+      enqueue_thumbnails(values['image_link'])
+  db.session.commit()
+  if LISTED_FIELDS.intersection(changed):
+      reindex_search(model, [row_id])
+  invalidate_cache(*tags)
+  return 'updated', changed
+
+
+#  Deletes
+#  ----------------------------------------------------------------
+#  Venues and artists are deleted by a DeleteJob: start_delete() hides them
+#  at once (delete_job_id), run_delete() then removes their shows in
+#  batches of DELETE_BATCH_SIZE, each a short transaction with its counter,
+#  area summary and progress updates, and finally the rows themselves. A
+#  failed run is retried, after a growing pause, up to DELETE_MAX_ATTEMPTS
+#  times; each run starts from what is left, so retrying is always safe.
+#  Deletes run on the job queue (tasks.py), or in flask delete-data.
+
+DELETE_MODELS = {
+    'venue': (Venue, Show.venue_id, ShowArchive.venue_id),
+    'artist': (Artist, Show.artist_id, ShowArchive.artist_id),
+}
+
+
+def start_delete(kind, ids, background=True):
+  # Create the job and hide the rows. Unknown ids and rows already being
+  # deleted are left out of job.ids (then empty: the job is done). Commits,
+  # with the "delete" job of the queue unless the caller runs it.
+  model = DELETE_MODELS[kind][0]
+  job = DeleteJob(kind=kind, ids=[])
+  db.session.add(job)
+  db.session.flush()
+  areas = venue_areas(Venue.id.in_(ids), visible(Venue)) if model is Venue else set()
+  db.session.query(model).filter(model.id.in_(ids), visible(model)) \
+      .update({model.delete_job_id: job.id}, synchronize_session=False)
+  job.ids = sorted(row_id for (row_id,) in
+                   db.session.query(model.id).filter(model.id.in_(ids), model.delete_job_id == job.id))
+  if not job.ids:
+      job.status = 'done'
+  elif background:
+      jobs.enqueue('delete', job.id, max_attempts=current_app.config['DELETE_MAX_ATTEMPTS'])
+  # The pages listing their shows: /shows and the other side's pages.
+  tags = show_cache_tags(DELETE_MODELS[kind][1].in_(job.ids)) if job.ids else set()
+  refresh_area_summary(areas)
+  db.session.commit()
+  unindex_search(model, job.ids)
+  invalidate_cache(kind + 's', 'shows', *tags.union('%s:%d' % (kind, row_id) for row_id in job.ids))
+  return job
+
+
+def delete_batches(job, batch_size, progress=None):
+  # One run of a job: shows first, a batch per transaction, then the
+  # archived shows and the hidden rows.
+  model, column, archived_column = DELETE_MODELS[job.kind]
+  while True:
+      show_ids = [row_id for (row_id,) in db.session.query(Show.id).filter(column.in_(job.ids)).limit(batch_size)]
+      if not show_ids:
+          break
+      criterion = Show.id.in_(show_ids)
+      areas = show_areas(criterion)
+      tags = show_cache_tags(criterion)
+      release_show_counters(criterion)
+      db.session.query(Show).filter(criterion).delete(synchronize_session=False)
+      refresh_area_summary(areas)
+      job.shows_deleted += len(show_ids)
+      job.updated_at = datetime.now()
+      db.session.commit()
+      invalidate_cache('shows', 'venues', *tags)
+      if progress:
+          progress(job)
+
+  db.session.query(ShowArchive).filter(archived_column.in_(job.ids)).delete(synchronize_session=False)
+  job.rows_deleted += db.session.query(model).filter(model.id.in_(job.ids), model.delete_job_id == job.id) \
+      .delete(synchronize_session=False)
+  db.session.commit()
+
+
+def attempt_delete(job, batch_size=None, progress=None):
+  # One run of a DeleteJob. Returns False, with job.message set, if it failed.
+  job.attempts += 1
+  job.status = 'running'
+  job.updated_at = datetime.now()
+  db.session.commit()
+  try:
+      delete_batches(job, batch_size or current_app.config['DELETE_BATCH_SIZE'], progress)
+      job.status = 'done'
+      job.message = None
+  except Exception as e:
+      db.session.rollback()
+      job.status = 'failed'
+      job.message = str(e)
+      current_app.logger.exception('Delete %s failed (attempt %d)', job.id, job.attempts)
+  job.updated_at = datetime.now()
+  db.session.commit()
+  return job.status == 'done'
+
+
+def run_delete(job, batch_size=None, progress=None):
+  # Run (or resume) a DeleteJob until it is done or out of attempts, in
+  # the foreground (flask delete-data); the job queue retries on its own.
+  max_attempts = current_app.config['DELETE_MAX_ATTEMPTS']
+  while job.status != 'done' and job.attempts < max_attempts:
+      if not attempt_delete(job, batch_size, progress) and job.attempts < max_attempts:
+          time.sleep(current_app.config['DELETE_RETRY_DELAY'] * 2 ** (job.attempts - 1))
+  return job
+
+
+#  Exports
+#  ----------------------------------------------------------------
+
+EXPORT_MODELS = {
+    'venue': Venue,
+    'artist': Artist,
+    'show': Show,
+}
+
+
+def query_export(kind, since=None, after=None):
+  # Rows of kind in exporter.FIELDS order, by (updated_at, id), streamed
+  # from a server-side cursor. `since` keeps rows changed at or after it,
+  # `after` is a decoded cursor token.
+  model = EXPORT_MODELS[kind]
+  query = db.session.query(*[getattr(model, field) for field in exporter.FIELDS[kind]])
+  if model is not Show:
+      query = query.filter(visible(model))
+  if since is not None:
+      query = query.filter(model.updated_at >= since)
+  if after is not None:
+      after_time, after_id = after
+      query = query.filter(db.or_(
+          model.updated_at > after_time,
+          db.and_(model.updated_at == after_time, model.id > after_id)
+      ))
+  return query.order_by(model.updated_at, model.id).yield_per(current_app.config['EXPORT_CHUNK_SIZE'])
+
+
+def summarized_venue_areas():
+  # Read the venues page data straight from AreaSummary (single query).
+  summaries = db.session.query(AreaSummary.city, AreaSummary.state, AreaSummary.venues) \
+      .order_by(AreaSummary.state, AreaSummary.city)
+  return [{"city": city, "state": state, "venues": venues} for city, state, venues in summaries]
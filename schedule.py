@@ -0,0 +1,159 @@
+#----------------------------------------------------------------------------#
+# Show scheduling: booking conflicts and free slots.
+#
+# A show occupies its venue and its artist from start_time to end_time, and
+# two shows of the same venue or artist must not overlap. Shows last at
+# most SHOW_MAX_DURATION, so the shows overlapping [start, end) all start
+# in (start - SHOW_MAX_DURATION, end): one range of the (venue_id,
+# start_time) and (artist_id, start_time) indexes, within the Show
+# partitions of those months on PostgreSQL. That indexed range query checks
+# a single new show; bulk imports load the range of a whole batch once and
+# check its rows against an IntervalIndex in memory, as do free_slots().
+#
+# On PostgreSQL the checks of concurrent writers are serialized by
+# transaction-level advisory locks per venue and artist (lock_schedule).
+#----------------------------------------------------------------------------#
+
+import bisect
+import itertools
+from datetime import timedelta
+
+from flask import current_app
+
+from extensions import db
+from models import Show, SHOW_MAX_DURATION
+
+
+# Advisory lock namespaces (first key of pg_advisory_xact_lock).
+LOCK_VENUE = 0x5645
+LOCK_ARTIST = 0x4152
+
+
+def default_duration():
+    return timedelta(minutes=current_app.config['SHOW_DEFAULT_DURATION'])
+
+
+def lock_schedule(venue_ids, artist_ids):
+    # Lock the schedules of the venues and artists until the end of the
+    # transaction. Always in the same order (venues, then artists, by id)
+    # so that concurrent writers cannot deadlock.
+    if db.engine.dialect.name != 'postgresql':
+        return
+    keys = [(LOCK_VENUE, row_id) for row_id in sorted(set(venue_ids))]
+    keys += [(LOCK_ARTIST, row_id) for row_id in sorted(set(artist_ids))]
+    for namespace, row_id in keys:
+        db.session.execute('SELECT pg_advisory_xact_lock(:namespace, :row_id)',
+                           {'namespace': namespace, 'row_id': row_id})
+
+
+def overlapping(column, row_ids, start, end):
+    # Criteria of the shows of row_ids (venue or artist ids) overlapping
+    # [start, end), through the (owner, start_time) index.
+    return (column.in_(row_ids), Show.start_time > start - SHOW_MAX_DURATION,
+            Show.start_time < end, Show.end_time > start)
+
+
+def find_conflicts(venue_id, artist_id, start, end):
+    # Shows booking the venue or the artist during [start, end), as
+    # [('venue' | 'artist', show id, start_time, end_time)].
+    conflicts = []
+    for side, column, row_id in (('venue', Show.venue_id, venue_id), ('artist', Show.artist_id, artist_id)):
+        rows = db.session.query(Show.id, Show.start_time, Show.end_time) \
+            .filter(*overlapping(column, [row_id], start, end)).order_by(Show.start_time)
+        conflicts.extend((side,) + tuple(row) for row in rows)
+    return conflicts
+
+
+def describe_conflict(conflict):
+    side, show_id, start, end = conflict
+    return 'The %s is already booked from %s to %s (show %d).' % (
+        side, start.strftime('%Y-%m-%d %H:%M'), end.strftime('%Y-%m-%d %H:%M'), show_id)
+
+
+#  In-memory interval index
+#  ----------------------------------------------------------------
+
+class IntervalIndex(object):
+    # Intervals [start, end) kept sorted by start. As no interval is
+    # longer than max_length, those overlapping [start, end) start in
+    # (start - max_length, end): found by bisection, like the database
+    # range query.
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.starts = []
+        self.items = []
+
+    def add(self, start, end, value=None):
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.items.insert(position, (start, end, value))
+
+    def overlapping(self, start, end):
+        # [(start, end, value)] of the intervals overlapping [start, end).
+        low = bisect.bisect_right(self.starts, start - self.max_length)
+        high = bisect.bisect_left(self.starts, end)
+        return [item for item in self.items[low:high] if item[1] > start]
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def load_schedules(column, row_ids, start, end):
+    # {row id: IntervalIndex of its shows overlapping [start, end)}, from
+    # one indexed query.
+    schedules = {row_id: IntervalIndex(SHOW_MAX_DURATION) for row_id in row_ids}
+    if row_ids:
+        rows = db.session.query(column, Show.id, Show.start_time, Show.end_time) \
+            .filter(*overlapping(column, list(row_ids), start, end))
+        for row_id, show_id, show_start, show_end in rows:
+            schedules[row_id].add(show_start, show_end, show_id)
+    return schedules
+
+
+def check_batch(rows):
+    # Booking conflicts of a batch of new shows (dicts with venue_id,
+    # artist_id, start_time and end_time), with the database and between
+    # rows of the batch. Returns {row index: [conflict messages]}; the rows
+    # without conflict are booked in the order given.
+    if not rows:
+        return {}
+    start = min(row['start_time'] for row in rows)
+    end = max(row['end_time'] for row in rows)
+    schedules = {
+        side: load_schedules(column, {row[side + '_id'] for row in rows}, start, end)
+        for side, column in (('venue', Show.venue_id), ('artist', Show.artist_id))
+    }
+    conflicts = {}
+    for index, row in enumerate(rows):
+        found = [(side, show_id, show_start, show_end)
+                 for side in ('venue', 'artist')
+                 for show_start, show_end, show_id in schedules[side][row[side + '_id']].overlapping(
+                     row['start_time'], row['end_time'])]
+        if found:
+            conflicts[index] = [describe_conflict(conflict) if conflict[1] is not None else
+                                'The %s is already booked by another row of the import.' % conflict[0]
+                                for conflict in found]
+            continue
+        for side in ('venue', 'artist'):
+            schedules[side][row[side + '_id']].add(row['start_time'], row['end_time'], None)
+    return conflicts
+
+
+#  Free slots
+#  ----------------------------------------------------------------
+
+def free_slots(venue_ids, start, end, min_length):
+    # {venue id: [(slot start, slot end)]}: the gaps of at least min_length
+    # between the shows of each venue within [start, end).
+    schedules = load_schedules(Show.venue_id, set(venue_ids), start, end)
+    slots = {}
+    for venue_id in venue_ids:
+        free, cursor = [], start
+        busy = sorted((show_start, show_end) for show_start, show_end, _ in schedules[venue_id])
+        for show_start, show_end in itertools.chain(busy, [(end, end)]):
+            if show_start - cursor >= min_length:
+                free.append((cursor, min(show_start, end)))
+            cursor = max(cursor, show_end)
+        slots[venue_id] = free
+    return slots
@@ -0,0 +1,261 @@
+#----------------------------------------------------------------------------#
+# Search backends for venues and artists.
+#
+# Both backends answer search(session, model, term, limit, offset) with
+# (total, ids): the number of matches and one page of ids in rank order.
+# A match is a case-insensitive substring of the name, or every word of
+# the term being a prefix of a word in the name, city, state or genres.
+#
+# prefix_search() serves the autocomplete of the show form: names starting
+# with a prefix, read in order from the lower(name) index of each table.
+#
+# Venues and artists being deleted (delete_job_id set) are never matched.
+#----------------------------------------------------------------------------#
+
+import bisect
+import re
+import threading
+import time
+
+from sqlalchemy import and_, func, literal_column, or_
+
+from models import NameKey
+
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return WORD.findall(text.lower()) if text else []
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def create_search_backend(name, dialect, memory_max_age=None):
+    # 'auto' picks the indexed PostgreSQL backend when running on
+    # PostgreSQL and the in-process index everywhere else (SQLite, tests).
+    if name == 'auto':
+        name = 'postgres' if dialect == 'postgresql' else 'memory'
+    if name == 'postgres':
+        return PostgresSearchBackend()
+    if name == 'memory':
+        return MemorySearchBackend(memory_max_age)
+    raise ValueError('Unknown search backend: %s' % name)
+
+
+#  Prefix search
+#  ----------------------------------------------------------------
+
+# Greater than any character: the upper bound of the names with a prefix.
+MAX_CHARACTER = '\U0010ffff'
+
+
+def prefix_search(session, model, prefix, limit):
+    # [(id, name)] of the names starting with prefix (case-insensitive),
+    # in name order.
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    key = NameKey(model.name)
+    return session.query(model.id, model.name).filter(
+        and_(key >= prefix, key < prefix + MAX_CHARACTER), model.delete_job_id.is_(None)
+    ).order_by(key, model.id).limit(limit).all()
+
+
+#  PostgreSQL
+#  ----------------------------------------------------------------
+
+class PostgresSearchBackend(object):
+    # Uses the pg_trgm index on name (substring matches) and the trigger
+    # maintained search_vector tsvector column (word prefix matches) that
+    # are created by the search indexes migration.
+
+    def search(self, session, model, term, limit, offset):
+        term = term.strip()
+        pattern = '%' + escape_like(term) + '%'
+        words = tokenize(term)
+        vector = literal_column('"%s".search_vector' % model.__tablename__)
+
+        name_match = model.name.ilike(pattern, escape='\\')
+        if words:
+            tsquery = func.to_tsquery('simple', ' & '.join(word + ':*' for word in words))
+            criterion = or_(name_match, vector.op('@@')(tsquery))
+            rank = [func.ts_rank(vector, tsquery).desc()]
+        else:
+            criterion = name_match
+            rank = []
+
+        criterion = and_(criterion, model.delete_job_id.is_(None))
+        rows = session.query(model.id, func.count().over()) \
+            .filter(criterion) \
+            .order_by(name_match.desc(), func.similarity(model.name, term).desc(), *rank) \
+            .order_by(model.name, model.id) \
+            .limit(limit).offset(offset).all()
+        if rows:
+            return rows[0][1], [row[0] for row in rows]
+        total = session.query(func.count(model.id)).filter(criterion).scalar() if offset else 0
+        return total, []
+
+    def update(self, session, model, ids):
+        # search_vector is maintained by a database trigger.
+        pass
+
+    def remove(self, model, ids):
+        pass
+
+    def reset(self, model):
+        pass
+
+
+#  In-process inverted index
+#  ----------------------------------------------------------------
+
+class MemoryIndex(object):
+    # Inverted index over one model: word -> ids for prefix matches and
+    # name trigram -> ids for substring matches.
+
+    def __init__(self):
+        self.names = {}
+        self.words = {}
+        self.postings = {}
+        self.trigrams = {}
+        self.sorted_words = []
+        self.dirty = False
+
+    @staticmethod
+    def name_trigrams(name):
+        return {name[i:i + 3] for i in range(len(name) - 2)}
+
+    def add(self, doc_id, name, city, state, genres):
+        name = (name or '').lower()
+        words = set(tokenize(name) + tokenize(city) + tokenize(state))
+        for genre in genres or []:
+            words.update(tokenize(genre))
+
+        self.names[doc_id] = name
+        self.words[doc_id] = words
+        for word in words:
+            if word not in self.postings:
+                self.postings[word] = set()
+                self.dirty = True
+            self.postings[word].add(doc_id)
+        for trigram in self.name_trigrams(name):
+            self.trigrams.setdefault(trigram, set()).add(doc_id)
+
+    def discard(self, doc_id):
+        if doc_id not in self.names:
+            return
+        name = self.names.pop(doc_id)
+        for word in self.words.pop(doc_id):
+            self.postings[word].discard(doc_id)
+            if not self.postings[word]:
+                del self.postings[word]
+                self.dirty = True
+        for trigram in self.name_trigrams(name):
+            self.trigrams[trigram].discard(doc_id)
+
+    def prefix_matches(self, prefix):
+        if self.dirty:
+            self.sorted_words = sorted(self.postings)
+            self.dirty = False
+        matches = set()
+        i = bisect.bisect_left(self.sorted_words, prefix)
+        while i < len(self.sorted_words) and self.sorted_words[i].startswith(prefix):
+            matches |= self.postings[self.sorted_words[i]]
+            i += 1
+        return matches
+
+    def substring_matches(self, term):
+        if len(term) < 3:
+            return {doc_id for doc_id, name in self.names.items() if term in name}
+        candidates = None
+        for trigram in self.name_trigrams(term):
+            postings = self.trigrams.get(trigram, set())
+            candidates = postings.copy() if candidates is None else candidates & postings
+            if not candidates:
+                return set()
+        return {doc_id for doc_id in candidates if term in self.names[doc_id]}
+
+    def search(self, term):
+        term = term.strip().lower()
+        if not term:
+            return sorted(self.names, key=lambda doc_id: (self.names[doc_id], doc_id))
+
+        substring = self.substring_matches(term)
+        words = tokenize(term)
+        word_hits = None
+        for word in words:
+            hits = self.prefix_matches(word)
+            word_hits = hits if word_hits is None else word_hits & hits
+        matches = substring | (word_hits or set())
+
+        def rank(doc_id):
+            name = self.names[doc_id]
+            exact_words = len(self.words[doc_id].intersection(words))
+            return (name != term, doc_id not in substring, -exact_words, name, doc_id)
+        return sorted(matches, key=rank)
+
+
+class MemorySearchBackend(object):
+    # Fallback for SQLite and test runs, not meant for production. Each
+    # model's index is built from one query on first use and then kept
+    # current by update()/remove(), which the write controllers call after
+    # commit, but only in their own process: the writes of other web
+    # workers and of `flask run-worker` (imports, deletes) are only seen
+    # once the index is rebuilt, max_age seconds after it was built (None:
+    # never).
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self.indexes = {}
+        self.built_at = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def load(session, model, *criteria):
+        return session.query(model.id, model.name, model.city, model.state, model.genres) \
+            .filter(model.delete_job_id.is_(None), *criteria)
+
+    def index_for(self, session, model):
+        index = self.indexes.get(model)
+        if index is not None and self.max_age is not None and time.time() - self.built_at[model] >= self.max_age:
+            index = None
+        if index is None:
+            index = MemoryIndex()
+            for row in self.load(session, model):
+                index.add(*row)
+            self.indexes[model] = index
+            self.built_at[model] = time.time()
+        return index
+
+    def search(self, session, model, term, limit, offset):
+        with self.lock:
+            ids = self.index_for(session, model).search(term)
+        return len(ids), ids[offset:offset + limit]
+
+    def update(self, session, model, ids):
+        ids = [int(doc_id) for doc_id in ids]
+        with self.lock:
+            index = self.indexes.get(model)
+            if index is None or not ids:
+                return
+            for doc_id in ids:
+                index.discard(doc_id)
+            for row in self.load(session, model, model.id.in_(ids)):
+                index.add(*row)
+
+    def reset(self, model):
+        # Drop the index of model (rebuilt on the next search), e.g. after
+        # bulk writes whose ids are not known.
+        with self.lock:
+            self.indexes.pop(model, None)
+
+    def remove(self, model, ids):
+        with self.lock:
+            index = self.indexes.get(model)
+            if index is None:
+                return
+            for doc_id in ids:
+                index.discard(int(doc_id))
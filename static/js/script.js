@@ -2,3 +2,36 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Autocomplete of a <select>: typing in <input data-autocomplete="<url>"
+// data-target="<select id>"> replaces the options of the select with the
+// matches returned by the url (?q=<text>, JSON {"data": [{id, label}]}).
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input) {
+    var select = document.getElementById(input.getAttribute('data-target'));
+    var timer = null;
+    var latest = 0;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var text = input.value.trim();
+        var request = ++latest;
+        if (!text) {
+          return;
+        }
+        fetch(input.getAttribute('data-autocomplete') + '?q=' + encodeURIComponent(text))
+          .then(function (response) { return response.json(); })
+          .then(function (result) {
+            if (request !== latest) {
+              return;
+            }
+            select.innerHTML = '';
+            result.data.forEach(function (item) {
+              select.appendChild(new Option(item.label, item.id));
+            });
+          });
+      }, 150);
+    });
+  });
+});
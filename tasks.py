@@ -0,0 +1,80 @@
+#----------------------------------------------------------------------------#
+# Background tasks.
+#
+# The work the job queue runs (see jobs.py): imports and deletes started by
+# the controllers, thumbnails of new images, and the maintenance that
+# JOB_SCHEDULE repeats. Any of them can be queued by hand with
+# `flask enqueue-job NAME ARGS...`.
+#----------------------------------------------------------------------------#
+
+from flask import current_app
+
+import jobs
+from extensions import db, image_proxy
+from jobs import task
+from models import DeleteJob, ImportJob
+from queries import attempt_delete, reconcile_show_counters, refresh_area_summary, roll_show_counters, \
+    run_import
+
+
+#  Started by the controllers
+#  ----------------------------------------------------------------
+
+@task('import')
+def import_file(job_id):
+    # Import the upload of an ImportJob; a retry resumes after the rows
+    # already done.
+    job = ImportJob.query.get(job_id)
+    with open(job.source, 'rb') as stream:
+        run_import(job, stream)
+    if job.status != 'done':
+        raise RuntimeError(job.message)
+
+
+@task('delete')
+def delete_rows(job_id):
+    job = DeleteJob.query.get(job_id)
+    if job.status != 'done' and not attempt_delete(job):
+        raise RuntimeError(job.message)
+
+
+@task('thumbnails')
+def make_thumbnails(url):
+    # Venue/artist images are resized ahead of their first page view.
+    if current_app.config['IMAGE_PROXY_ENABLED']:
+        image_proxy.prefetch(url)
+
+
+#  Maintenance (JOB_SCHEDULE)
+#  ----------------------------------------------------------------
+
+@task('roll-show-counters')
+def roll_counters():
+    roll_show_counters()
+    db.session.commit()
+
+
+@task('reconcile-show-counters')
+def reconcile_counters():
+    drift = reconcile_show_counters(fix=True)
+    db.session.commit()
+    if drift:
+        current_app.logger.warning('Repaired %d show counters that drifted: %s', len(drift), drift[:20])
+
+
+@task('refresh-area-summary')
+def refresh_areas():
+    if current_app.config['AREA_SUMMARY_ENABLED']:
+        refresh_area_summary()
+        db.session.commit()
+
+
+@task('maintain-show-partitions')
+def maintain_partitions():
+    import partitions
+    partitions.maintain()
+
+
+@task('prune-jobs')
+def prune_jobs():
+    jobs.prune()
@@ -0,0 +1,129 @@
+#----------------------------------------------------------------------------#
+# Template bytecode cache and worker warm-up.
+#
+# Jinja compiles a template to Python the first time it is rendered, in
+# every worker. With TEMPLATE_CACHE_DIR the compiled bytecode is kept on
+# local disk and shared by the workers of a host: `flask compile-templates`
+# fills it at build time, and a worker then only unmarshals the code.
+# With TEMPLATE_WARMUP each worker also loads and renders every page
+# template once while booting, before it accepts traffic (create_app()
+# preloads the lazily imported forms and Babel at the same time).
+#
+# Config:
+#   TEMPLATE_CACHE_DIR  bytecode cache directory (None: no cache).
+#   TEMPLATE_WARMUP     load and render the templates in create_app().
+#----------------------------------------------------------------------------#
+
+import functools
+import os
+import time
+
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache, meta
+
+
+WARMUP_FOLDERS = ('pages/', 'forms/', 'errors/')
+
+
+class Placeholder(object):
+    # Stands for every variable a view would pass when a template is
+    # rendered for warm-up: attributes, calls and arithmetic return a
+    # placeholder, comparisons are false, iteration is empty and it renders
+    # as ''.
+
+    def __getattr__(self, name):
+        return self
+
+    def __getitem__(self, key):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    __add__ = __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = __call__
+
+    def __lt__(self, other):
+        return False
+
+    __le__ = __gt__ = __ge__ = __lt__
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __int__(self):
+        return 0
+
+    def __str__(self):
+        return ''
+
+    __html__ = __str__
+
+
+def template_names(app):
+    return sorted(name for name in app.jinja_env.list_templates() if name.endswith('.html'))
+
+
+@functools.lru_cache(maxsize=None)
+def referenced_variables(env, name):
+    # Variables used by a template and the templates it extends/includes.
+    ast = env.parse(env.loader.get_source(env, name)[0])
+    names = frozenset(meta.find_undeclared_variables(ast))
+    for parent in meta.find_referenced_templates(ast):
+        if parent and parent != name:
+            names |= referenced_variables(env, parent)
+    return names
+
+
+def placeholder_context(app, name):
+    provided = set(app.jinja_env.globals)
+    context = {}
+    app.update_template_context(context)
+    provided.update(context)
+    return {variable: Placeholder() for variable in referenced_variables(app.jinja_env, name) - provided}
+
+
+def render(app, name):
+    # Render name with placeholders; returns the error message, if any.
+    try:
+        render_template(name, **placeholder_context(app, name))
+    except Exception as error:
+        return '%s: %s' % (type(error).__name__, error)
+    return None
+
+
+def compile_templates(app):
+    # Compile every template into the bytecode cache. Returns
+    # [(name, milliseconds)].
+    timings = []
+    for name in template_names(app):
+        started = time.perf_counter()
+        app.jinja_env.get_template(name)
+        timings.append((name, 1000 * (time.perf_counter() - started)))
+    return timings
+
+
+def warm_up(app):
+    # Load every template and render the page templates once. Returns
+    # {name: error} for the renders that failed; their template is still
+    # compiled, only the render is skipped.
+    errors = {}
+    compile_templates(app)
+    with app.test_request_context('/'):
+        for name in template_names(app):
+            if name.startswith(WARMUP_FOLDERS):
+                error = render(app, name)
+                if error:
+                    errors[name] = error
+    return errors
+
+
+def init_app(app):
+    app.config.setdefault('TEMPLATE_CACHE_DIR', None)
+    app.config.setdefault('TEMPLATE_WARMUP', False)
+    directory = app.config['TEMPLATE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
@@ -0,0 +1,56 @@
+#----------------------------------------------------------------------------#
+# Test fixtures: the app on a scratch SQLite database with a few venues,
+# artists and shows. DATABASE_URL is set before config.py is read.
+#----------------------------------------------------------------------------#
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='fyyur-tests-'), 'test.db')
+
+sys.path.insert(0, ROOT)
+os.environ['DATABASE_URL'] = 'sqlite:///' + DATABASE
+
+
+def seed(db):
+    from models import Venue, Artist, Show
+    from queries import reconcile_show_counters
+    now = datetime.now()
+    for i in range(6):
+        db.session.add(Venue(name='The Blue Room %d' % i, city='Austin' if i % 2 else 'New York',
+                             state='TX' if i % 2 else 'NY', genres=['Jazz'], image_link='https://example.com/%d.jpg' % i))
+    for i in range(3):
+        db.session.add(Artist(name='Echo Band %d' % i, city='Austin', state='TX', genres=['Rock']))
+    db.session.flush()
+    for i in range(20):
+        start = now + timedelta(days=i - 10, hours=i)
+        db.session.add(Show(venue_id=1 + i % 6, artist_id=1 + i % 3, start_time=start,
+                            end_time=start + timedelta(hours=2)))
+    db.session.commit()
+    reconcile_show_counters(fix=True)
+    db.session.commit()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    app.config.update(TESTING=True, CACHE_ENABLED=False, JOB_EAGER=False, IMAGE_PROXY_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        seed(db)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
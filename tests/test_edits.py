@@ -0,0 +1,57 @@
+#----------------------------------------------------------------------------#
+# Venue/artist edits (queries.update_profile): versioned, minimal writes.
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from extensions import db
+from models import Venue
+from queries import EDITABLE_FIELDS, update_profile
+
+
+@pytest.fixture
+def venue(app):
+    venue = Venue(name='The Edited Club', city='Boston', state='MA', address='2 Elm St', phone='555-0101',
+                  genres=['Folk'], image_link='https://example.com/club.jpg', seeking_talent='No')
+    db.session.add(venue)
+    db.session.commit()
+    yield venue.id
+    db.session.rollback()
+    Venue.query.filter(Venue.id == venue.id).delete()
+    db.session.commit()
+
+
+def stored(venue_id):
+    venue = Venue.query.get(venue_id)
+    db.session.refresh(venue)
+    return venue.version, {field: getattr(venue, field) for field in EDITABLE_FIELDS[Venue]}
+
+
+def test_update_writes_changed_fields(app, venue):
+    version, values = stored(venue)
+    # An empty field matches NULL: not a change.
+    assert update_profile(Venue, venue, version, dict(values, phone='555-0199', seeking_description='')) \
+        == ('updated', ['phone'])
+    assert stored(venue) == (version + 1, dict(values, phone='555-0199'))
+
+
+def test_unchanged_writes_nothing(app, venue):
+    version, values = stored(venue)
+    values['website'] = ''
+    assert update_profile(Venue, venue, version, values) == ('unchanged', [])
+    assert stored(venue)[0] == version
+
+
+def test_stale_version_conflicts(app, venue):
+    version, values = stored(venue)
+    update_profile(Venue, venue, version, dict(values, phone='555-0102'))
+    assert update_profile(Venue, venue, version, dict(values, city='Salem')) == ('conflict', ['city', 'phone'])
+    assert stored(venue)[1]['city'] == 'Boston'
+
+
+def test_missing_version_conflicts(app, venue):
+    version, values = stored(venue)
+    assert update_profile(Venue, venue, None, dict(values, city='Salem')) == ('conflict', ['city'])
+    response = app.test_client().post('/venues/%d/edit' % venue, data=dict(values, genres='Folk', city='Salem'))
+    assert response.status_code == 409
+    assert stored(venue) == (version, values)
@@ -0,0 +1,19 @@
+#----------------------------------------------------------------------------#
+# The query plan check of bench.explain, on SQLite: no route reads Show,
+# Venue or Artist without an index unless it is listed in FULL_SCANS.
+#----------------------------------------------------------------------------#
+
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_query_plans_use_indexes(tmp_path):
+    # A process of its own: bench.explain configures the app on its database.
+    database = 'sqlite:///' + str(tmp_path / 'explain.db')
+    result = subprocess.run([sys.executable, '-m', 'bench.explain', '--scale', '1k', '--database', database],
+                            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True, env=dict(os.environ, DATABASE_URL=database))
+    assert result.returncode == 0, result.stdout
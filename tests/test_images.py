@@ -0,0 +1,115 @@
+#----------------------------------------------------------------------------#
+# Image proxy: URL signing, thumbnail widths and the disk cache, with
+# images fetched from a local HTTP stub.
+#----------------------------------------------------------------------------#
+
+import io
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from flask import Flask
+
+from images import DiskCache, ImageProxy, image_url
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def png(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(output, 'PNG')
+    return output.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    images = {'/wide.png': png(400, 200)}
+
+    def do_GET(self):
+        data = self.images.get(self.path)
+        self.send_response(200 if data else 404)
+        self.send_header('Content-Type', 'image/png')
+        self.end_headers()
+        self.wfile.write(data or b'')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def stub():
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield 'http://127.0.0.1:%d' % server.server_port
+    server.shutdown()
+
+
+@pytest.fixture
+def proxy(app, tmp_path, monkeypatch):
+    proxy = app.extensions['image_proxy']
+    monkeypatch.setitem(app.config, 'IMAGE_PROXY_ENABLED', True)
+    monkeypatch.setitem(app.config, 'IMAGE_PROXY_KEY', 'test-key')
+    monkeypatch.setitem(proxy.options, 'allow_private', True)
+    monkeypatch.setattr(proxy, 'cache', DiskCache(str(tmp_path), 10 * 1024 * 1024))
+    with app.test_request_context():
+        yield proxy
+
+
+def thumbnail_size(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    return Image.open(io.BytesIO(response.data)).size
+
+
+def test_signed_url_is_served(app, proxy, stub):
+    url = stub + '/wide.png'
+    assert thumbnail_size(app.test_client(), image_url(url, 160)) == (160, 80)
+
+
+def test_unsigned_url_is_refused(app, proxy, stub):
+    url = stub + '/wide.png'
+    path = image_url(url, 160)
+    client = app.test_client()
+    assert client.get(path.replace(proxy.signature(url), '0' * 20)).status_code == 404
+    assert client.get(path.replace('wide.png', 'other.png')).status_code == 404
+    app.config['IMAGE_PROXY_KEY'] = 'another-key'
+    assert client.get(path).status_code == 404
+
+
+def test_widths(app, proxy, stub):
+    url = stub + '/wide.png'
+    client = app.test_client()
+    # Only IMAGE_WIDTHS are made, and never wider than the original.
+    assert client.get(image_url(url, 200)).status_code == 404
+    assert thumbnail_size(client, image_url(url, 1024)) == (400, 200)
+
+
+def test_proxy_needs_a_key(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(IMAGE_PROXY_ENABLED=True, IMAGE_PROXY_KEY=None, SECRET_KEY='secret')
+    ImageProxy(app)
+    assert not app.config['IMAGE_PROXY_ENABLED']
+    with app.test_request_context():
+        assert image_url('https://example.com/a.png', 160) == 'https://example.com/a.png'
+
+
+def test_cache_size(tmp_path):
+    cache = DiskCache(str(tmp_path), 1000)
+    for _ in range(5):
+        cache.put('a', b'x' * 400)
+    # Overwriting a file counts its new size only.
+    cache.put('a', b'x' * 300)
+    assert cache.size == 300
+
+
+def test_cache_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), 1000)
+    cache.put('a', b'x' * 300)
+    cache.put('b', b'x' * 400)
+    os.utime(cache.path('a'), (1, 1))
+    cache.put('c', b'x' * 400)
+    # Least recently used first, down to 90% of max_bytes.
+    assert cache.get('a') is None
+    assert cache.get('b') and cache.get('c')
+    assert cache.size == 800
@@ -0,0 +1,67 @@
+#----------------------------------------------------------------------------#
+# Bulk import (queries.run_import) through the executemany path of SQLite.
+#----------------------------------------------------------------------------#
+
+import io
+import json
+
+import pytest
+
+from extensions import db
+from models import ImportJob, Venue
+from queries import copy_value, run_import, write_import_rows
+
+
+VENUE = {
+    'name': 'The Imported Hall', 'city': 'Denver', 'state': 'CO', 'address': '1 Main St',
+    'phone': '555-0100', 'image_link': 'https://example.com/hall.jpg', 'genres': ['Jazz', 'Blues'],
+    'facebook_link': 'https://facebook.com/hall', 'website': 'https://hall.example.com',
+    'seeking_talent': 'No', 'seeking_description': '',
+}
+
+
+def import_venues(records, **options):
+    job = ImportJob(kind='venue', format='ndjson')
+    db.session.add(job)
+    db.session.commit()
+    stream = io.BytesIO(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+    return run_import(job, stream, **options)
+
+
+@pytest.fixture
+def cleanup(app):
+    yield
+    Venue.query.filter(Venue.city == 'Denver').delete()
+    db.session.commit()
+
+
+def test_import_skips_bad_rows(app, cleanup):
+    job = import_venues([VENUE, dict(VENUE, name='Hall'), dict(VENUE, name='The Second Hall', state='XX')])
+    assert (job.status, job.rows_done, job.rows_imported, job.rows_failed) == ('done', 3, 1, 2)
+    assert [error['row'] for error in job.errors] == [2, 3]
+    assert set(job.errors[0]['errors']) == {'name'}
+    venue = Venue.query.filter_by(name='The Imported Hall').one()
+    assert (venue.genres, venue.seeking_description) == (['Jazz', 'Blues'], '')
+
+
+def test_import_caps_errors(app, cleanup, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_MAX_ERRORS', 3)
+    job = import_venues([dict(VENUE, name='Bad')] * 5 + [VENUE], batch_size=2)
+    assert (job.status, job.rows_imported, job.rows_failed) == ('done', 1, 5)
+    assert [error['row'] for error in job.errors] == [1, 2, 3]
+
+
+def test_none_is_written_as_null(app, cleanup):
+    write_import_rows(Venue, [dict(VENUE, name='The Null Hall', phone=None, seeking_description='')])
+    db.session.commit()
+    venue = Venue.query.filter_by(name='The Null Hall').one()
+    assert (venue.phone, venue.seeking_description) == (None, '')
+
+
+def test_copy_fields():
+    # COPY ... WITH CSV reads an unquoted empty field as NULL.
+    assert copy_value(None) == ''
+    assert copy_value('') == '""'
+    assert copy_value('say "hi"') == '"say ""hi"""'
+    assert copy_value(3) == '"3"'
+    assert copy_value(['Jazz', 'R"B']) == '"{""Jazz"",""R\\""B""}"'
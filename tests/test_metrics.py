@@ -0,0 +1,38 @@
+#----------------------------------------------------------------------------#
+# Route instrumentation: the metrics page and per-route SQL statement
+# counts (see test_query_budgets.py for the budgets).
+#----------------------------------------------------------------------------#
+
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from app import create_app
+
+
+@pytest.fixture
+def metrics_app(app):
+    settings = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    settings.update(TESTING=True, CACHE_ENABLED=False, METRICS_ENDPOINT='/metrics')
+    return create_app(SimpleNamespace(**settings))
+
+
+def test_metrics_page_is_off_by_default(client):
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_page(metrics_app):
+    client = metrics_app.test_client()
+    client.get('/api/v1/shows')
+    client.get('/api/v1/shows')
+    client.get('/api/v1/venues/1')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert '# TYPE fyyur_sql_queries_total counter' in lines
+    assert 'fyyur_requests_total{endpoint="main.api_shows"} 2' in lines
+    assert 'fyyur_sql_queries_total{endpoint="main.api_shows"} 2' in lines
+    assert 'fyyur_sql_queries_max{endpoint="main.api_shows"} 1' in lines
+    assert 'fyyur_requests_total{endpoint="main.api_venue"} 1' in lines
@@ -0,0 +1,42 @@
+#----------------------------------------------------------------------------#
+# Name prefix search of the show form's autocomplete
+# (search.prefix_search).
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from extensions import db
+from models import Artist
+from search import prefix_search
+
+NAMES = ('Prefix', 'prefixed', 'PREFIXES', 'Prefiw', 'Prefiy', 'Prefix\U0001f3b8', 'Prefi', 'Prefix Deleted')
+
+
+@pytest.fixture
+def artists(app):
+    rows = [Artist(name=name, city='Reno', state='NV', genres=['Rock']) for name in NAMES]
+    rows[-1].delete_job_id = 1
+    db.session.add_all(rows)
+    db.session.commit()
+    yield
+    Artist.query.filter(Artist.city == 'Reno').delete()
+    db.session.commit()
+
+
+def names(prefix, limit=10):
+    return [name for _, name in prefix_search(db.session, Artist, prefix, limit)]
+
+
+def test_range_bounds(artists):
+    # Case-insensitive, in byte order of the lowercased names; names
+    # sorting right before or after the prefix range are left out.
+    assert names('prefix') == ['Prefix', 'prefixed', 'PREFIXES', 'Prefix\U0001f3b8']
+    assert names(' PREFIXE ') == ['prefixed', 'PREFIXES']
+    assert names('prefix', limit=2) == ['Prefix', 'prefixed']
+    assert names('prefiz') == []
+    assert names('') == []
+
+
+def test_deleted_rows_are_left_out(artists):
+    assert 'Prefix Deleted' not in names('prefix ')
+    assert names('prefix d') == []
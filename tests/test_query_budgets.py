@@ -0,0 +1,65 @@
+#----------------------------------------------------------------------------#
+# The SQL statement budgets of config.QUERY_BUDGETS, with
+# QUERY_BUDGET_ASSERT on: a route over its budget raises
+# instrumentation.QueryBudgetExceeded.
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from instrumentation import QueryBudgetExceeded
+
+
+# (endpoint, method, url, form data) of every route with a budget.
+ROUTES = [
+    ('main.index', 'GET', '/', None),
+    ('main.venues', 'GET', '/venues', None),
+    ('main.artists', 'GET', '/artists', None),
+    ('main.shows', 'GET', '/shows', None),
+    ('main.show_venue', 'GET', '/venues/1', None),
+    ('main.show_artist', 'GET', '/artists/1', None),
+    ('main.search_venues', 'POST', '/venues/search', {'search_term': 'blue'}),
+    ('main.search_artists', 'POST', '/artists/search', {'search_term': 'echo'}),
+    ('main.create_shows', 'GET', '/shows/create', None),
+    ('main.api_venues', 'GET', '/api/v1/venues?ids=1,2,3&fields=name,city,upcoming_shows_count', None),
+    ('main.api_venue', 'GET', '/api/v1/venues/1', None),
+    ('main.api_venue_areas', 'GET', '/api/v1/venues/areas', None),
+    ('main.api_search_venues', 'GET', '/api/v1/venues/search?q=blue', None),
+    ('main.api_artists', 'GET', '/api/v1/artists', None),
+    ('main.api_artist', 'GET', '/api/v1/artists/1', None),
+    ('main.api_search_artists', 'GET', '/api/v1/artists/search?q=echo', None),
+    ('main.api_autocomplete_venues', 'GET', '/api/v1/venues/autocomplete?q=the', None),
+    ('main.api_autocomplete_artists', 'GET', '/api/v1/artists/autocomplete?q=ec', None),
+    ('main.api_venues_free_slots', 'GET', '/api/v1/venues/free-slots?ids=1,2', None),
+    ('main.api_venue_free_slots', 'GET', '/api/v1/venues/1/free-slots', None),
+    ('main.api_shows', 'GET', '/api/v1/shows', None),
+]
+
+
+@pytest.fixture
+def budgets(app):
+    # Search indexes are loaded on first use, not per request.
+    client = app.test_client()
+    client.post('/venues/search', data={'search_term': 'blue'})
+    client.post('/artists/search', data={'search_term': 'echo'})
+    app.config['QUERY_BUDGET_ASSERT'] = True
+    yield app.config['QUERY_BUDGETS']
+    app.config['QUERY_BUDGET_ASSERT'] = False
+
+
+def test_every_budget_has_a_route():
+    from config import QUERY_BUDGETS
+    assert set(QUERY_BUDGETS) == {route[0] for route in ROUTES}
+
+
+@pytest.mark.parametrize('endpoint, method, url, data', ROUTES, ids=[route[0] for route in ROUTES])
+def test_route_within_budget(app, client, budgets, endpoint, method, url, data):
+    response = client.open(url, method=method, data=data)
+    assert response.status_code == 200
+    sample = app.extensions['metrics'].snapshot()[endpoint]
+    assert sample['sql_queries_max'] <= budgets[endpoint]
+
+
+def test_route_over_budget_raises(app, client, budgets, monkeypatch):
+    monkeypatch.setitem(budgets, 'main.api_shows', 0)
+    with pytest.raises(QueryBudgetExceeded, match='main.api_shows issued 1 SQL statements'):
+        client.get('/api/v1/shows')
@@ -0,0 +1,111 @@
+#----------------------------------------------------------------------------#
+# Show scheduling: double bookings, the 24 hour bound on durations and the
+# free slots API.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import schedule
+from extensions import db
+from models import Venue, Artist, Show
+from queries import reconcile_show_counters
+
+DAY = datetime(2031, 1, 6)
+
+
+@pytest.fixture
+def booking(app, monkeypatch):
+    # A venue and two artists with nothing booked.
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    venue = Venue(name='The Booked Room', city='Miami', state='FL', genres=['Jazz'])
+    artists = [Artist(name='Booked Artist %d' % i, city='Miami', state='FL', genres=['Jazz']) for i in range(2)]
+    db.session.add_all([venue] + artists)
+    db.session.commit()
+    ids = venue.id, artists[0].id, artists[1].id
+    yield ids
+    db.session.rollback()
+    Show.query.filter(Show.venue_id == ids[0]).delete()
+    Venue.query.filter(Venue.id == ids[0]).delete()
+    Artist.query.filter(Artist.id.in_(ids[1:])).delete(synchronize_session=False)
+    reconcile_show_counters(fix=True)
+    db.session.commit()
+
+
+def book(app, venue_id, artist_id, start, duration=''):
+    return app.test_client().post('/shows/create', data={
+        'venue_id': venue_id, 'artist_id': artist_id,
+        'start_time': start.strftime('%Y-%m-%d %H:%M:%S'), 'duration': duration,
+    })
+
+
+def booked(venue_id):
+    return [(show.start_time, show.end_time) for show in Show.query.filter_by(venue_id=venue_id).order_by(Show.id)]
+
+
+def test_double_booking_is_refused(app, booking):
+    venue_id, artist_id, other_artist_id = booking
+    assert book(app, venue_id, artist_id, DAY.replace(hour=20)).status_code == 200
+    # The venue and the artist are busy until 22:00 (default duration).
+    assert book(app, venue_id, other_artist_id, DAY.replace(hour=21)).status_code == 409
+    assert book(app, venue_id, artist_id, DAY.replace(hour=21, minute=59)).status_code == 409
+    assert book(app, venue_id, other_artist_id, DAY.replace(hour=22), 30).status_code == 200
+    assert booked(venue_id) == [(DAY.replace(hour=20), DAY.replace(hour=22)),
+                                (DAY.replace(hour=22), DAY.replace(hour=22, minute=30))]
+
+
+def test_durations_are_bounded(app, booking):
+    venue_id, artist_id, _ = booking
+    assert book(app, venue_id, artist_id, DAY, 24 * 60 + 1).status_code == 400
+    assert book(app, venue_id, artist_id, DAY, 24 * 60).status_code == 200
+    # A show of the full 24 hours is found from the end of its range.
+    start = DAY + timedelta(hours=23, minutes=59)
+    assert [conflict[0] for conflict in schedule.find_conflicts(venue_id, 0, start, start + timedelta(hours=1))] \
+        == ['venue']
+    assert schedule.find_conflicts(venue_id, 0, DAY + timedelta(days=1), DAY + timedelta(days=2)) == []
+
+
+def test_batch_conflicts(app, booking):
+    venue_id, artist_id, other_artist_id = booking
+    book(app, venue_id, artist_id, DAY.replace(hour=20))
+    rows = [
+        {'venue_id': venue_id, 'artist_id': other_artist_id,
+         'start_time': DAY.replace(hour=21), 'end_time': DAY.replace(hour=23)},
+        {'venue_id': venue_id, 'artist_id': other_artist_id,
+         'start_time': DAY.replace(hour=22), 'end_time': DAY.replace(hour=23)},
+        {'venue_id': venue_id, 'artist_id': other_artist_id,
+         'start_time': DAY.replace(hour=23), 'end_time': DAY.replace(hour=23, minute=30)},
+        {'venue_id': venue_id, 'artist_id': artist_id,
+         'start_time': DAY.replace(hour=23, minute=15), 'end_time': DAY.replace(hour=23, minute=45)},
+    ]
+    conflicts = schedule.check_batch(rows)
+    assert sorted(conflicts) == [0, 3]
+    assert 'show' in conflicts[0][0] and 'another row of the import' in conflicts[3][0]
+
+
+def test_schedule_errors_are_reported(app, booking, monkeypatch):
+    venue_id, artist_id, _ = booking
+
+    def lock_timeout(venue_ids, artist_ids):
+        raise OperationalError('SELECT pg_advisory_xact_lock', {}, Exception('lock timeout'))
+
+    monkeypatch.setattr(schedule, 'lock_schedule', lock_timeout)
+    response = book(app, venue_id, artist_id, DAY)
+    assert response.status_code == 200
+    assert booked(venue_id) == []
+
+
+def test_free_slots(app, booking):
+    venue_id, artist_id, _ = booking
+    book(app, venue_id, artist_id, DAY.replace(hour=10), 60)
+    book(app, venue_id, artist_id, DAY.replace(hour=11, minute=30), 60)
+    response = app.test_client().get('/api/v1/venues/free-slots?ids=%d,999999&from=%s&days=1&duration=60'
+                                     % (venue_id, DAY.isoformat()))
+    assert response.status_code == 200
+    assert response.get_json() == {'data': {str(venue_id): [
+        {'start': '2031-01-06T00:00:00', 'end': '2031-01-06T10:00:00'},
+        {'start': '2031-01-06T12:30:00', 'end': '2031-01-07T00:00:00'},
+    ]}}
+    assert app.test_client().get('/api/v1/venues/%d/free-slots?days=1000' % venue_id).status_code == 400
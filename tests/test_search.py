@@ -0,0 +1,67 @@
+#----------------------------------------------------------------------------#
+# The in-process search backend: match and ranking rules, and rebuilding
+# after writes made by other processes.
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from extensions import db
+from models import Venue
+from search import MemoryIndex, MemorySearchBackend
+
+
+@pytest.fixture
+def index():
+    index = MemoryIndex()
+    index.add(1, 'Blue Note', 'New York', 'NY', ['Jazz'])
+    index.add(2, 'The Blue Room', 'Chicago', 'IL', ['Blues', 'Soul'])
+    index.add(3, 'Bluebird Cafe', 'Nashville', 'TN', ['Country'])
+    index.add(4, 'Green Room', 'New Orleans', 'LA', ['Jazz', 'Funk'])
+    index.add(5, 'blue', 'Austin', 'TX', [])
+    return index
+
+
+def test_exact_name_then_substring_then_words(index):
+    # The exact name first, then names containing the term (more exact
+    # words first, then by name), then word prefix matches (genres).
+    assert index.search('Blue') == [5, 1, 2, 3]
+    assert index.search('blue room') == [2]
+
+
+def test_every_word_is_a_prefix(index):
+    # Words match the prefixes of the words of the name, city, state and
+    # genres; every word of the term must match.
+    assert index.search('new jaz') == [1, 4]
+    assert index.search('jazz chicago') == []
+    assert index.search('soul') == [2]
+    assert index.search('tn') == [3]
+
+
+def test_short_and_empty_terms(index):
+    # Substrings shorter than a trigram are matched by a scan.
+    assert index.search('ee') == [4]
+    assert index.search('  ') == [5, 1, 3, 4, 2]
+
+
+def test_discard(index):
+    index.discard(1)
+    assert index.search('jazz') == [4]
+    assert index.search('note') == []
+
+
+@pytest.fixture
+def venue(app):
+    yield
+    Venue.query.filter(Venue.city == 'Tulsa').delete()
+    db.session.commit()
+
+
+@pytest.mark.parametrize('max_age, found', [(None, False), (0, True)])
+def test_writes_of_other_processes(app, venue, max_age, found):
+    backend = MemorySearchBackend(max_age)
+    assert backend.search(db.session, Venue, 'tulsa', 10, 0) == (0, [])
+    # Inserted without update(), as by another worker.
+    row = Venue(name='The Tulsa Hall', city='Tulsa', state='OK', genres=['Jazz'])
+    db.session.add(row)
+    db.session.commit()
+    assert backend.search(db.session, Venue, 'tulsa', 10, 0) == ((1, [row.id]) if found else (0, []))
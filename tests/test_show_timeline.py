@@ -0,0 +1,64 @@
+#----------------------------------------------------------------------------#
+# Upcoming and past shows are split at one time everywhere: the counters'
+# ShowCounterClock.rolled_at, or now when the counters are not rolled.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Show
+from queries import query_profiles, query_show_listing, query_show_timeline, reconcile_show_counters, \
+    show_counter_clock
+
+
+def rolled(ago):
+    # Counters rolled `ago` (a timedelta) ago.
+    show_counter_clock().rolled_at = datetime.now() - ago
+    reconcile_show_counters(fix=True)
+    db.session.commit()
+
+
+@pytest.fixture
+def recent_show(app):
+    # A show of venue 1 and artist 1 that started a minute ago.
+    show = Show(venue_id=1, artist_id=1, start_time=datetime.now() - timedelta(minutes=1),
+                end_time=datetime.now() + timedelta(hours=1))
+    db.session.add(show)
+    db.session.commit()
+    yield show.id
+    db.session.delete(show)
+    rolled(timedelta(0))
+
+
+def timelines(kind):
+    return [query_show_timeline(kind, profile, per_page=100) for profile in query_profiles(kind, list(range(1, 7)))]
+
+
+def upcoming_listing():
+    return {row[0] for row in query_show_listing(when='upcoming')}
+
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_lagging_counters(app, recent_show, kind):
+    # Not rolled yet, the show is still upcoming: on the pages, in their
+    # totals and on /shows.
+    rolled(timedelta(minutes=2))
+    for timeline in timelines(kind):
+        assert len(timeline['upcoming_shows']) == timeline['upcoming_shows_count']
+        assert len(timeline['past_shows']) == timeline['past_shows_count']
+    assert timelines(kind)[0]['upcoming_shows'][0]['start_time'] < datetime.now()
+    assert recent_show in upcoming_listing()
+
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_stale_counters(app, recent_show, kind, monkeypatch):
+    # Past SHOW_COUNTER_MAX_LAG the split is at the current time.
+    monkeypatch.setitem(app.config, 'SHOW_COUNTER_MAX_LAG', 60)
+    rolled(timedelta(minutes=2))
+    now = datetime.now()
+    for timeline in timelines(kind):
+        assert all(show['start_time'] > now for show in timeline['upcoming_shows'])
+        assert all(show['start_time'] <= now for show in timeline['past_shows'])
+    assert recent_show not in upcoming_listing()
@@ -0,0 +1,1096 @@
+#----------------------------------------------------------------------------#
+# Views.
+#
+# Every page, API endpoint and CLI command of the app, on the `main`
+# blueprint (registered by app.create_app). Form classes are imported in
+# the views that use them so WTForms is only loaded when needed.
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import signal
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, \
+    request, stream_with_context, url_for
+
+import assets
+import exporter
+import importer
+import jobs
+import schedule
+import templating
+from compression import compress_response
+from extensions import db, page_cache
+from models import Venue, Artist, Show, DeleteJob, ImportJob
+from queries import DELETE_MODELS, EXPORT_MODELS, IMPORT_MODELS, PROFILE_FIELDS, add_show_counters, autocomplete, \
+    choice_label, decode_show_cursor, encode_show_cursor, enqueue_thumbnails, invalidate_cache, query_choices, \
+    query_export, query_profile_page, query_profiles, query_show_listing, query_show_timeline, query_venue_areas, \
+    reconcile_show_counters, refresh_area_summary, reindex_search, release_show_counters, roll_show_counters, \
+    run_delete, run_import, search_listing, show_areas, show_cache_tags, show_duration, show_listing_row, \
+    start_delete, summarized_venue_areas, update_profile, venue_areas, visible
+
+
+bp = Blueprint('main', __name__, cli_group=None)
+
+
+def stream_template(template_name, **context):
+  # Render a template chunk by chunk with Template.generate() so large
+  # listings are sent while they are still being read from the database.
+  current_app.update_template_context(context)
+  template = current_app.jinja_env.get_template(template_name)
+  return template.generate(context)
+
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+# Controller Home Page
+@bp.route('/')
+def index():
+  return render_template('pages/home.html')
+
+
+#  Controllers Venues
+#  ----------------------------------------------------------------
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+# Create Venue form page
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+
+# Create Venue Controller
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  from forms import VenueForm
+  form = VenueForm(request.form)
+
+  venue = Venue(
+    name = form.name.data,
+    genres = form.genres.data,
+    address = form.address.data,
+    city = form.city.data,
+    state = form.state.data,
+    phone = form.phone.data,
+    website = form.website.data,
+    facebook_link = form.facebook_link.data,
+    seeking_talent = form.seeking_talent.data, 
+    seeking_description = form.seeking_description.data,
+    image_link = form.image_link.data,
+  )
+  try:
+      db.session.add(venue)
+      refresh_area_summary([(venue.city, venue.state)])
+      enqueue_thumbnails(venue.image_link)
+      db.session.commit()
+      reindex_search(Venue, [venue.id])
+      invalidate_cache('venues')
+      flash('Venue ' + form.name.data + ' was successfully listed !')
+  except:
+      flash('Sorry, an error occurred. Venue ' + form.name.data + ' could not be added.')
+  finally:
+      db.session.close()
+  return render_template('pages/home.html')
+
+
+#  LIST Venues Page
+#  ----------------------------------------------------------------
+@bp.route('/venues')
+@db.read_only
+@page_cache.page(lambda: ['venues'])
+def venues():
+  # TODO: replace with real venues data.
+  #       num_shows should be aggregated based on number of upcoming shows per venue. = done
+  if current_app.config.get('AREA_SUMMARY_ENABLED'):
+      data = summarized_venue_areas()
+  else:
+      data = query_venue_areas()
+  return render_template('pages/venues.html', areas=data)
+
+
+#  Search Venue
+#  ----------------------------------------------------------------
+@bp.route('/venues/search', methods=['POST'])
+@db.read_only
+def search_venues():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee" = done
+  search_term = request.form.get('search_term', '')
+  response = search_listing(Venue, search_term, request.form.get('offset', 0, type=int))
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+
+#  Page One Venue
+#  ----------------------------------------------------------------
+@bp.route('/venues/<int:venue_id>')
+@db.read_only
+@page_cache.page(lambda venue_id: ['venue:%d' % venue_id])
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id = done.
+  profiles = query_profiles('venue', [venue_id])
+  if not profiles:
+      abort(404)
+  data = profiles[0]
+  data.update(query_show_timeline('venue', data,
+                                  upcoming_page=request.args.get('upcoming_page', 1, type=int),
+                                  past_page=request.args.get('past_page', 1, type=int)))
+  return render_template('pages/show_venue.html', venue=data)
+
+
+#  Edit Venue
+#  ----------------------------------------------------------------
+
+# Edit Venue form page
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  venue = db.session.query(Venue).filter(Venue.id == venue_id, visible(Venue)).first_or_404()
+  form = VenueForm(obj=venue)
+
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+def edit_conflict(kind, row_id, fields):
+  # The venue/artist was saved by someone else since the form was opened:
+  # show the form again with the saved values and version.
+  from forms import VenueForm, ArtistForm
+  model, form_class = (Venue, VenueForm) if kind == 'venue' else (Artist, ArtistForm)
+  row = db.session.query(model).get(row_id)
+  flash('Sorry, this %s was changed by someone else while you were editing it. The form now shows the saved '
+        'values: make your changes (%s) again.' % (kind, ', '.join(fields).replace('_', ' ')))
+  return render_template('forms/edit_%s.html' % kind, form=form_class(obj=row), **{kind: row}), 409
+
+
+# Edit Venue Controller
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    from forms import VenueForm
+    form = VenueForm(request.form)
+    try:
+        updated_venue = {
+            "name": form.name.data,
+            "genres": form.genres.data,
+            "address": form.address.data,
+            "city": form.city.data,
+            "state": form.state.data,
+            "phone": form.phone.data,
+            "website": form.website.data,
+            "facebook_link": form.facebook_link.data,
+            "seeking_talent": form.seeking_talent.data,
+            "seeking_description": form.seeking_description.data,
+            "image_link": form.image_link.data
+        }
+        status, fields = update_profile(Venue, venue_id, request.form.get('version', type=int), updated_venue)
+        if status == 'conflict':
+            return edit_conflict('venue', venue_id, fields)
+        if status == 'unchanged':
+            flash('Venue ' + form.name.data + ' has no changes to save.')
+        else:
+            flash('Venue' + form.name.data + ' was successfully updated !')
+    except:
+        flash('Sorry, an error occurred. Venue ' + form.name.data + ' could not be updated.')
+    finally:
+        db.session.close()
+    return redirect(url_for('.show_venue', venue_id=venue_id))
+# ____________________
+# Sorry for my poor english. I learned a lot not in the know And on the Internet, so I definitely did not know which solution would be much better and faster. I leave this option here too, can you tell me your opinions about it.append()
+# ____________________
+
+
+# @bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+# def edit_venue_submission(venue_id):
+#     form = VenueForm(request.form)
+#     try:
+#         venue = Venue.query.get(venue_id)
+#         venue.name = form.name.data,
+#         venue.genres = form.genres.data,
+#         venue.address = form.address.data,
+#         venue.city = form.city.data,
+#         venue.state = form.state.data,
+#         venue.phone = form.phone.data,
+#         venue.website = form.website.data,
+#         venue.facebook_link = form.facebook_link.data,
+#         venue.seeking_talent = form.seeking_talent.data,
+#         venue.seeking_description = form.seeking_description.data,
+#         venue.image_link = form.image_link.data
+#         db.session.commit()
+#         flash('Venue' + form.name.data + ' was successfully updated!')
+#     except:
+#         flash('An error occurred. Venue ' + form.name.data + ' could not be updated.')
+#     finally:
+#         db.session.close()
+#     return redirect(url_for('.show_venue', venue_id=venue_id))
+
+#  Delete Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/del', methods=['GET'])
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage = done
+  # The venue is hidden at once and deleted with its shows in the background.
+    try:
+        job = start_delete('venue', [venue_id])
+        if job.ids:
+            flash('Venue is being deleted !')
+        else:
+            flash('Sorry, this Venue does not exist or is already being deleted.')
+    except:
+        flash('Sorry, an error occurred. The  Venue you selected cannot be deleted.')
+    finally:
+        db.session.close()
+    return redirect(url_for('.venues'))
+
+#>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> End Venues Controllers >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+
+#  Controllers Artists
+#  ----------------------------------------------------------------
+
+#  Create Artist
+#  ----------------------------------------------------------------
+# Create Artist form page
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+
+# Create Venue Controller
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion = done
+    from forms import ArtistForm
+    form = ArtistForm(request.form)
+
+    artist = Artist(
+        name = form.name.data,
+        genres = form.genres.data,
+        city = form.city.data,
+        state = form.state.data,
+        phone = form.phone.data,
+        website = form.website.data,
+        facebook_link = form.facebook_link.data,
+        seeking_venue = form.seeking_venue.data,
+        seeking_description = form.seeking_description.data,
+        image_link = form.image_link.data,
+    )
+    try:
+        db.session.add(artist)
+        enqueue_thumbnails(artist.image_link)
+        db.session.commit()
+        reindex_search(Artist, [artist.id])
+        invalidate_cache('artists')
+        #   # on successful db insert, flash success = done
+        flash('Artist ' + form.name.data + ' was successfully listd !')
+    except:
+      #   # TODO: on unsuccessful db insert, flash an error instead. = done
+        flash('Sorry, an error occurred. Artist ' + form.name.data + 'could not be added')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+
+#  LIST Artists Page
+#  ----------------------------------------------------------------
+@bp.route('/artists')
+@db.read_only
+@page_cache.page(lambda: ['artists'])
+def artists():
+  # TODO: replace with real data returned from querying the database = done
+  artists = db.session.query(Artist.id, Artist.name).filter(visible(Artist))
+  data=[]
+
+  for artist in artists:
+      data.append({
+        "id": artist[0],
+        "name": artist[1]
+      })
+  
+  return render_template('pages/artists.html', artists=data)
+
+
+#  Search Artist
+#  ----------------------------------------------------------------
+@bp.route('/artists/search', methods=['POST'])
+@db.read_only
+def search_artists():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band". = done
+    search_term = request.form.get('search_term', '')
+    response = search_listing(Artist, search_term, request.form.get('offset', 0, type=int))
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+
+#  Page One Artist
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>')
+@db.read_only
+@page_cache.page(lambda artist_id: ['artist:%d' % artist_id])
+def show_artist(artist_id):
+    # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id = done
+    profiles = query_profiles('artist', [artist_id])
+    if not profiles:
+        abort(404)
+    data = profiles[0]
+    data.update(query_show_timeline('artist', data,
+                                    upcoming_page=request.args.get('upcoming_page', 1, type=int),
+                                    past_page=request.args.get('past_page', 1, type=int)))
+
+    return render_template('pages/show_artist.html', artist=data)
+
+
+#  Edit Artist
+#  ----------------------------------------------------------------
+
+# Edit Artist form page
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  artist = db.session.query(Artist).filter(Artist.id == artist_id, visible(Artist)).first_or_404()
+  form = ArtistForm(obj=artist)
+
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+# Edit Artist Controller
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    from forms import ArtistForm
+    form = ArtistForm(request.form)
+
+    updated_artist = {
+        "name": form.name.data,
+        "genres": form.genres.data,
+        "city": form.city.data,
+        "state": form.state.data,
+        "phone": form.phone.data,
+        "website": form.website.data,
+        "facebook_link": form.facebook_link.data,
+        "seeking_venue": form.seeking_venue.data,
+        "seeking_description": form.seeking_description.data,
+        "image_link": form.image_link.data,
+    }
+    try:
+        status, fields = update_profile(Artist, artist_id, request.form.get('version', type=int), updated_artist)
+        if status == 'conflict':
+            return edit_conflict('artist', artist_id, fields)
+        if status == 'unchanged':
+            flash('Artist ' + form.name.data + ' has no changes to save.')
+        else:
+            flash('Artist ' + form.name.data + ' was successfully listed !')
+    except:
+        flash('Sorry, an error occurred. Artist ' + form.name.data + 'could not be added')
+    finally:
+        db.session.close()
+    return redirect(url_for('.show_artist', artist_id=artist_id))
+
+
+#  Delete Artist
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/del', methods=['GET'])
+def delete_artist(artist_id):
+    try:
+        job = start_delete('artist', [artist_id])
+        if job.ids:
+            flash('Artist is being deleted!')
+        else:
+            flash('Sorry, this Artist does not exist or is already being deleted.')
+    except:
+        flash('Sorry, an error occurred. The  Artist you selected cannot be deleted.')
+    finally:
+        db.session.close()
+    return redirect(url_for('.artists'))
+
+
+#>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> End Artists Controllers >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+
+#  Controllers Shows
+#  ----------------------------------------------------------------
+
+#  Create Shows
+#  ----------------------------------------------------------------
+# Create Shows form page
+@bp.route('/shows/create')
+@db.read_only
+def create_shows():
+  # renders form. do not touch.
+  
+  from forms import ShowForm
+  form = ShowForm()
+  # A few suggestions; the others are found through the autocomplete API.
+  set_show_form_choices(form)
+  return render_template('forms/new_show.html', form=form)
+
+
+def set_show_form_choices(form):
+  # The suggestions, and the submitted venue/artist when the form is shown
+  # again with errors.
+  for kind in ('venue', 'artist'):
+      field = getattr(form, kind + '_id')
+      choices = query_choices(kind)
+      if field.data and field.data not in dict(choices):
+          choices = [(profile['id'], choice_label(profile['id'], profile['name']))
+                     for profile in query_profiles(kind, [field.data], ('name',))] + choices
+      field.choices = choices
+
+
+# Create Shows Controller
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead = done
+    from forms import ShowForm
+    form = ShowForm(request.form)
+    if not form.validate():
+        for field, errors in form.errors.items():
+            flash('%s: %s' % (field, ' '.join(errors)))
+        set_show_form_choices(form)
+        return render_template('forms/new_show.html', form=form), 400
+
+    show = Show(
+        venue_id = form.venue_id.data,
+        artist_id = form.artist_id.data,
+        start_time = form.start_time.data,
+        end_time = form.start_time.data + show_duration(form.duration.data)
+    )
+
+    try:
+        # Refuse double bookings of the venue or the artist; the lock holds
+        # concurrent bookings of either until this one is committed.
+        schedule.lock_schedule([show.venue_id], [show.artist_id])
+        conflicts = schedule.find_conflicts(show.venue_id, show.artist_id, show.start_time, show.end_time)
+        if conflicts:
+            db.session.rollback()
+            for conflict in conflicts:
+                flash(schedule.describe_conflict(conflict))
+            set_show_form_choices(form)
+            return render_template('forms/new_show.html', form=form), 409
+
+        db.session.add(show)
+        add_show_counters(show.venue_id, show.artist_id, show.start_time)
+        refresh_area_summary(venue_areas(Venue.id == show.venue_id))
+        db.session.commit()
+        invalidate_cache('shows', 'venues', 'venue:%s' % form.venue_id.data, 'artist:%s' % form.artist_id.data)
+        # on successful db insert, flash success
+        flash('Show was successfully placed !')
+        # TODO: on unsuccessful db insert, flash an error instead. = done
+        # e.g., flash('An error occurred. Show could not be listed.')
+        # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    except:
+        db.session.rollback()
+        flash('Sorry, an error occurred. Show could not be listed.')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+
+#  LIST Shows Page
+#  ----------------------------------------------------------------
+@bp.route('/shows')
+@db.read_only
+@page_cache.page(lambda: ['shows'])
+def shows():
+  # displays list of shows at /shows
+  # TODO: replace with real venues data.
+  #       num_shows should be aggregated based on number of upcoming shows per venue. = done
+  # Query args: when=past|upcoming, from/to (ISO dates), after=<cursor>,
+  # stream=1 to render every matching show as a streamed response.
+  when = request.args.get('when')
+  try:
+      start = request.args.get('from', type=datetime.fromisoformat)
+      end = request.args.get('to', type=datetime.fromisoformat)
+      after = request.args.get('after')
+      after = decode_show_cursor(after) if after else None
+  except ValueError:
+      abort(400)
+  listing = query_show_listing(when=when, start=start, end=end, after=after)
+
+  if request.args.get('stream'):
+      rows = (show_listing_row(row) for row in listing.yield_per(current_app.config['SHOWS_STREAM_CHUNK']))
+      return Response(stream_with_context(stream_template('pages/shows.html', shows=rows)))
+
+  per_page = current_app.config['SHOWS_PER_PAGE']
+  rows = listing.limit(per_page + 1).all()
+  next_cursor = encode_show_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+  data = [show_listing_row(row) for row in rows[:per_page]]
+
+  filters = {key: value for key, value in request.args.items() if key in ('when', 'from', 'to')}
+  return render_template('pages/shows.html', shows=data, next_cursor=next_cursor, filters=filters)
+
+
+#  Delete Show
+#  ----------------------------------------------------------------
+
+@bp.route('/shows/<show_id>/del', methods=['GET'])
+def delete_show(show_id):
+    try:
+        areas = show_areas(Show.id == show_id)
+        tags = show_cache_tags(Show.id == show_id)
+        release_show_counters(Show.id == show_id)
+        db.session.query(Show).filter(Show.id == show_id).delete()
+        refresh_area_summary(areas)
+        db.session.commit()
+        invalidate_cache('shows', 'venues', *tags)
+        flash('Show was successfully deleted!')
+    except:
+        flash('Sorry, an error occurred. Show could not be deleted.')
+    finally:
+        db.session.close()
+    return redirect(url_for('.shows'))
+
+
+#>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> End Shows Controllers >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+
+#  Controllers API
+#  ----------------------------------------------------------------
+#  /api/v1: JSON over the same queries as the pages. Common query args:
+#  fields=a,b (sparse fieldsets), ids=1,2,3 (batch fetch), after=<cursor>
+#  and limit (cursor pagination). Responses are gzip/brotli compressed.
+
+API_PREFIX = '/api/v1'
+TIMELINE_FIELDS = ('upcoming_shows', 'past_shows')
+API_SHOW_FIELDS = ('show_id', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time')
+
+
+class ApiError(Exception):
+    pass
+
+
+@bp.errorhandler(ApiError)
+def api_error(error):
+    response = jsonify({"error": str(error)})
+    response.status_code = 400
+    return response
+
+
+@bp.after_request
+def compress_api_response(response):
+    if request.path.startswith(API_PREFIX + '/'):
+        compress_response(response, request.accept_encodings,
+                          current_app.config['API_COMPRESS_MIN_SIZE'], current_app.config['API_COMPRESS_LEVEL'])
+    return response
+
+
+def api_fields(allowed):
+  # The `fields` query arg as a tuple of allowed names (None = all).
+  fields = request.args.get('fields')
+  if not fields:
+      return None
+  fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+  unknown = [field for field in fields if field not in allowed]
+  if unknown:
+      raise ApiError('Unknown fields: %s' % ', '.join(unknown))
+  return fields
+
+
+def api_ids():
+  ids = request.args.get('ids')
+  if ids is None:
+      return None
+  try:
+      ids = [int(row_id) for row_id in ids.split(',') if row_id.strip()]
+  except ValueError:
+      raise ApiError('ids must be comma-separated integers')
+  if len(ids) > current_app.config['API_MAX_IDS']:
+      raise ApiError('At most %d ids per request' % current_app.config['API_MAX_IDS'])
+  return ids
+
+
+def api_limit():
+  limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+  return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def api_show_row(row):
+  # show_listing_row with start_time as the API has always sent it.
+  return dict(show_listing_row(row), start_time=str(row[1]))
+
+
+def api_timeline(shows):
+  return [dict(show, start_time=show['start_time'].strftime('%m/%d/%Y')) for show in shows]
+
+
+def sparse(record, fields, key='id'):
+  # record restricted to fields (and its key).
+  if fields is None:
+      return record
+  return {name: value for name, value in record.items() if name in fields or name == key}
+
+
+def api_profiles(kind):
+  fields = api_fields(PROFILE_FIELDS[kind])
+  ids = api_ids()
+  if ids is not None:
+      return jsonify({"data": query_profiles(kind, ids, fields)})
+  after = request.args.get('after', type=int)
+  data, next_cursor = query_profile_page(kind, fields, after, api_limit())
+  return jsonify({"data": data, "next_cursor": next_cursor})
+
+
+def api_profile(kind, row_id):
+  # One venue/artist; upcoming_shows/past_shows pages are included unless
+  # excluded by `fields` (paged with upcoming_page/past_page).
+  fields = api_fields(PROFILE_FIELDS[kind] + TIMELINE_FIELDS)
+  columns = None
+  if fields is not None:
+      columns = tuple(field for field in fields if field not in TIMELINE_FIELDS)
+      columns += ('upcoming_shows_count', 'past_shows_count')
+  profiles = query_profiles(kind, [row_id], columns)
+  if not profiles:
+      abort(404)
+  data = profiles[0]
+  if fields is None or set(fields) & set(TIMELINE_FIELDS):
+      data.update(query_show_timeline(kind, data,
+                                      upcoming_page=request.args.get('upcoming_page', 1, type=int),
+                                      past_page=request.args.get('past_page', 1, type=int)))
+      for field in TIMELINE_FIELDS:
+          data[field] = api_timeline(data[field])
+      if fields is not None:
+          fields += ('upcoming_page', 'past_page', 'upcoming_shows_count', 'past_shows_count')
+  return jsonify({"data": sparse(data, fields)})
+
+
+def api_search(model):
+  term = request.args.get('q', '')
+  results = search_listing(model, term, request.args.get('offset', 0, type=int))
+  next_offset = results['offset'] + results['limit']
+  results['next_offset'] = next_offset if next_offset < results['count'] else None
+  return jsonify(results)
+
+
+@bp.route(API_PREFIX + '/venues')
+@db.read_only
+def api_venues():
+  return api_profiles('venue')
+
+
+@bp.route(API_PREFIX + '/venues/<int:venue_id>')
+@db.read_only
+def api_venue(venue_id):
+  return api_profile('venue', venue_id)
+
+
+@bp.route(API_PREFIX + '/venues/areas')
+@db.read_only
+def api_venue_areas():
+  # The /venues page listing: venues grouped by city and state.
+  if current_app.config.get('AREA_SUMMARY_ENABLED'):
+      data = summarized_venue_areas()
+  else:
+      data = query_venue_areas()
+  return jsonify({"data": data})
+
+
+def api_free_slots(venue_ids):
+  # Gaps of at least `duration` minutes between the shows of each venue,
+  # from `from` (default now) for `days` days. Unknown venues are left out.
+  try:
+      start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else datetime.now()
+  except ValueError:
+      raise ApiError('Malformed from')
+  start = start.replace(second=0, microsecond=0)
+  days = request.args.get('days', current_app.config['FREE_SLOTS_DAYS'], type=int)
+  if not 1 <= days <= current_app.config['FREE_SLOTS_MAX_DAYS']:
+      raise ApiError('days must be between 1 and %d' % current_app.config['FREE_SLOTS_MAX_DAYS'])
+  minutes = request.args.get('duration', current_app.config['SHOW_DEFAULT_DURATION'], type=int)
+  if minutes < 1:
+      raise ApiError('duration must be a positive number of minutes')
+  venue_ids = [profile['id'] for profile in query_profiles('venue', venue_ids, ('id',))]
+  slots = schedule.free_slots(venue_ids, start, start + timedelta(days=days), timedelta(minutes=minutes))
+  return jsonify({"data": {
+      str(venue_id): [{"start": slot_start.isoformat(), "end": slot_end.isoformat()}
+                      for slot_start, slot_end in slots[venue_id]]
+      for venue_id in venue_ids
+  }})
+
+
+@bp.route(API_PREFIX + '/venues/free-slots')
+@db.read_only
+def api_venues_free_slots():
+  # Batch: ?ids=1,2,3&days=30&duration=120
+  ids = api_ids()
+  if not ids:
+      raise ApiError('ids is required')
+  return api_free_slots(ids)
+
+
+@bp.route(API_PREFIX + '/venues/<int:venue_id>/free-slots')
+@db.read_only
+def api_venue_free_slots(venue_id):
+  return api_free_slots([venue_id])
+
+
+@bp.route(API_PREFIX + '/venues/search')
+@db.read_only
+def api_search_venues():
+  return api_search(Venue)
+
+
+@bp.route(API_PREFIX + '/artists')
+@db.read_only
+def api_artists():
+  return api_profiles('artist')
+
+
+@bp.route(API_PREFIX + '/artists/<int:artist_id>')
+@db.read_only
+def api_artist(artist_id):
+  return api_profile('artist', artist_id)
+
+
+@bp.route(API_PREFIX + '/artists/search')
+@db.read_only
+def api_search_artists():
+  return api_search(Artist)
+
+
+def api_autocomplete(kind):
+  limit = request.args.get('limit', current_app.config['AUTOCOMPLETE_RESULTS'], type=int)
+  limit = max(1, min(limit, current_app.config['AUTOCOMPLETE_MAX_RESULTS']))
+  return jsonify({"data": autocomplete(kind, request.args.get('q', ''), limit)})
+
+
+@bp.route(API_PREFIX + '/venues/autocomplete')
+@db.read_only
+def api_autocomplete_venues():
+  # Venues whose name starts with q, for the show form.
+  return api_autocomplete('venue')
+
+
+@bp.route(API_PREFIX + '/artists/autocomplete')
+@db.read_only
+def api_autocomplete_artists():
+  return api_autocomplete('artist')
+
+
+@bp.route(API_PREFIX + '/shows')
+@db.read_only
+def api_shows():
+  # Same filters as /shows (when, from, to, after), plus ids, fields, limit.
+  fields = api_fields(API_SHOW_FIELDS)
+  try:
+      start = request.args.get('from', type=datetime.fromisoformat)
+      end = request.args.get('to', type=datetime.fromisoformat)
+      after = request.args.get('after')
+      after = decode_show_cursor(after) if after else None
+  except ValueError:
+      raise ApiError('Malformed from, to or after')
+  ids = api_ids()
+  listing = query_show_listing(when=request.args.get('when'), start=start, end=end, after=after, ids=ids)
+
+  if ids is not None:
+      return jsonify({"data": [sparse(api_show_row(row), fields, 'show_id') for row in listing]})
+  limit = api_limit()
+  rows = listing.limit(limit + 1).all()
+  next_cursor = encode_show_cursor(rows[limit - 1]) if len(rows) > limit else None
+  return jsonify({
+      "data": [sparse(api_show_row(row), fields, 'show_id') for row in rows[:limit]],
+      "next_cursor": next_cursor
+  })
+
+
+#  Controllers Exports
+#  ----------------------------------------------------------------
+
+# Stream every venue, artist or show as NDJSON (default) or CSV, e.g.
+# /exports/show?format=csv&since=2020-05-01&after=<cursor of the last row>
+@bp.route('/exports/<kind>')
+@db.read_only
+def export_data(kind):
+    fmt = request.args.get('format', 'ndjson')
+    if kind not in EXPORT_MODELS or fmt not in exporter.FORMATS:
+        abort(400)
+    try:
+        since = request.args.get('since', type=datetime.fromisoformat)
+        after = request.args.get('after')
+        after = exporter.decode_cursor(after) if after else None
+    except ValueError:
+        abort(400)
+
+    rows = query_export(kind, since, after)
+    body = exporter.chunks(kind, rows, fmt, current_app.config['EXPORT_CHUNK_SIZE'])
+    response = Response(stream_with_context(body), mimetype=exporter.MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = 'attachment; filename=%ss.%s' % (kind, fmt)
+    return response
+
+
+#  Controllers Imports
+#  ----------------------------------------------------------------
+
+# Upload a CSV / NDJSON / JSON file; the import runs in the background and
+# its progress is at /imports/<id>.
+@bp.route('/imports/<kind>', methods=['POST'])
+def create_import(kind):
+    upload = request.files.get('file')
+    if kind not in IMPORT_MODELS or upload is None:
+        abort(400)
+    fmt = request.form.get('format') or importer.detect_format(upload.filename)
+    if fmt not in importer.FORMATS:
+        abort(400)
+
+    os.makedirs(current_app.config['IMPORT_FOLDER'], exist_ok=True)
+    job = ImportJob(kind=kind, format=fmt, source=upload.filename)
+    db.session.add(job)
+    db.session.commit()
+    path = os.path.join(current_app.config['IMPORT_FOLDER'], 'import-%d.%s' % (job.id, fmt))
+    upload.save(path)
+    job.source = path
+    jobs.enqueue('import', job.id)
+    db.session.commit()
+
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('.show_import', job_id=job.id)
+    return response
+
+
+@bp.route('/imports/<int:job_id>')
+def show_import(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+
+#  Controllers Deletions
+#  ----------------------------------------------------------------
+
+# Delete many venues or artists: ids as a comma-separated form field or a
+# JSON list. They are hidden at once and deleted in the background; the
+# progress is at /deletions/<id>.
+@bp.route('/deletions/<kind>', methods=['POST'])
+def create_deletion(kind):
+    if kind not in DELETE_MODELS:
+        abort(404)
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids', request.form.get('ids', ''))
+    try:
+        ids = [int(row_id) for row_id in (ids.split(',') if isinstance(ids, str) else ids) if str(row_id).strip()]
+    except (TypeError, ValueError):
+        raise ApiError('ids must be integers')
+    if not ids or len(ids) > current_app.config['DELETE_MAX_IDS']:
+        raise ApiError('Between 1 and %d ids per deletion' % current_app.config['DELETE_MAX_IDS'])
+
+    job = start_delete(kind, ids)
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('.show_deletion', job_id=job.id)
+    return response
+
+
+@bp.route('/deletions/<int:job_id>')
+def show_deletion(job_id):
+    job = DeleteJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+
+#  Maintenance commands
+#  ----------------------------------------------------------------
+@bp.cli.command('run-worker')
+@click.option('--burst', is_flag=True, help='Exit once no job is due.')
+def run_worker_command(burst):
+    # Process the job queue (jobs.py); run one or more under a process
+    # supervisor. SIGTERM or Ctrl-C stops a worker after its current job.
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        stop.set()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    name = jobs.worker_name()
+    print('Worker %s started.' % name)
+    count = jobs.work(name, burst=burst, stop=stop)
+    print('Worker %s stopped after %d jobs.' % (name, count))
+
+
+@bp.cli.command('enqueue-job')
+@click.argument('name')
+@click.argument('args', nargs=-1)
+@click.option('--delay', type=int, default=0, help='Seconds before the job is due.')
+def enqueue_job_command(name, args, delay):
+    # Queue a task by hand, e.g.
+    #   flask enqueue-job reconcile-show-counters
+    #   flask enqueue-job delete 12             # args are JSON values or strings
+    if name not in jobs.TASKS:
+        raise click.BadParameter('one of %s' % ', '.join(sorted(jobs.TASKS)), param_hint='NAME')
+    values = []
+    for arg in args:
+        try:
+            values.append(json.loads(arg))
+        except ValueError:
+            values.append(arg)
+    job = jobs.enqueue(name, *values, delay=delay)
+    db.session.commit()
+    print('Queued job %d (%s).' % (job.id, name))
+
+
+@bp.cli.command('refresh-area-summary')
+def refresh_area_summary_command():
+    # Rebuild every AreaSummary row, e.g. after enabling AREA_SUMMARY_ENABLED.
+    current_app.config['AREA_SUMMARY_ENABLED'] = True
+    refresh_area_summary()
+    db.session.commit()
+    print('Area summary refreshed.')
+
+
+@bp.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_MODELS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(importer.FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, help='Rows per transaction (IMPORT_BATCH_SIZE).')
+@click.option('--resume', 'resume_id', type=int, help='Continue the import job with this id.')
+def import_data_command(kind, path, fmt, batch_size, resume_id):
+    # Bulk import venues, artists or shows, e.g.
+    #   flask import-data show shows.csv --batch-size 5000
+    if resume_id:
+        job = ImportJob.query.get(resume_id)
+        if job is None or job.kind != kind:
+            raise click.ClickException('No %s import job %s' % (kind, resume_id))
+        print('Resuming import %d after row %d.' % (job.id, job.rows_done))
+    else:
+        job = ImportJob(kind=kind, format=fmt or importer.detect_format(path), source=os.path.abspath(path))
+        db.session.add(job)
+        db.session.commit()
+
+    def progress(job, errors):
+        print('import %d: %d rows, %d imported, %d failed' % (
+            job.id, job.rows_done, job.rows_imported, job.rows_failed))
+        for error in errors:
+            print('  row %d: %s' % (error['row'], json.dumps(error['errors'])))
+
+    with open(path, 'rb') as stream:
+        job = run_import(job, stream, batch_size, progress)
+    print('Import %d %s%s.' % (job.id, job.status, ': ' + job.message if job.message else ''))
+    if job.status != 'done':
+        raise SystemExit(1)
+
+
+@bp.cli.command('delete-data')
+@click.argument('kind', type=click.Choice(sorted(DELETE_MODELS)))
+@click.argument('ids', type=int, nargs=-1)
+@click.option('--batch-size', type=int, help='Shows per transaction (DELETE_BATCH_SIZE).')
+@click.option('--resume', 'resume_id', type=int, help='Retry the delete job with this id.')
+def delete_data_command(kind, ids, batch_size, resume_id):
+    # Delete venues or artists with their shows, e.g.
+    #   flask delete-data venue 12 13 14
+    #   flask delete-data venue --resume 7      # after a failed or interrupted run
+    if resume_id:
+        job = DeleteJob.query.get(resume_id)
+        if job is None or job.kind != kind:
+            raise click.ClickException('No %s delete job %s' % (kind, resume_id))
+        job.status, job.attempts = 'pending', 0
+    else:
+        job = start_delete(kind, list(ids), background=False)
+
+    def progress(job):
+        print('delete %d: %d shows deleted' % (job.id, job.shows_deleted))
+
+    run_delete(job, batch_size, progress)
+    print('delete %d %s: %d %ss, %d shows deleted%s' % (
+        job.id, job.status, job.rows_deleted, kind, job.shows_deleted,
+        ' (%s)' % job.message if job.message else ''))
+
+
+@bp.cli.command('export-data')
+@click.argument('kind', type=click.Choice(sorted(EXPORT_MODELS)))
+@click.option('--format', 'fmt', type=click.Choice(exporter.FORMATS), default='ndjson')
+@click.option('--since', type=datetime.fromisoformat, help='Only rows changed since (ISO date/time).')
+@click.option('--after', 'cursor', help='Resume after the row with this cursor token.')
+@click.option('--output', type=click.File('w'), default='-', help='Defaults to stdout.')
+def export_data_command(kind, fmt, since, cursor, output):
+    # Export venues, artists or shows, e.g.
+    #   flask export-data show --format csv --since 2020-05-01 --output shows.csv
+    try:
+        after = exporter.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise click.BadParameter('Malformed cursor token', param_hint='--after')
+    for chunk in exporter.chunks(kind, query_export(kind, since, after), fmt, current_app.config['EXPORT_CHUNK_SIZE']):
+        output.write(chunk)
+
+
+@bp.cli.command('roll-show-counters')
+def roll_show_counters_command():
+    # Run periodically (e.g. every minute from cron) to move shows that
+    # have started from the upcoming to the past counters.
+    rolled = roll_show_counters()
+    db.session.commit()
+    print('%d shows moved to past.' % rolled)
+
+
+@bp.cli.command('reconcile-show-counters')
+@click.option('--fix', is_flag=True, help='Repair the counters that drifted.')
+def reconcile_show_counters_command(fix):
+    drift = reconcile_show_counters(fix=fix)
+    for name, row_id, stored, actual in drift:
+        print('%s %s: stored upcoming/past %s, actual %s' % (name, row_id, stored, actual))
+    db.session.commit()
+    print('%d counters drifted%s.' % (len(drift), ', repaired' if fix and drift else ''))
+
+
+@bp.cli.command('maintain-show-partitions')
+@click.option('--archive-after', 'months', type=int, help='Archive shows older than this many months '
+              '(SHOW_ARCHIVE_AFTER_MONTHS).')
+def maintain_show_partitions_command(months):
+    # Run daily from cron: creates the next monthly Show partitions
+    # (PostgreSQL) and moves old shows to ShowArchive (partitions.py).
+    import partitions
+    if months is not None:
+        current_app.config['SHOW_ARCHIVE_AFTER_MONTHS'] = months
+    created, dropped, archived = partitions.maintain()
+    for name, moved in created:
+        print('created partition %s (%d shows moved from %s)' % (name, moved, partitions.DEFAULT_PARTITION))
+    for name in dropped:
+        print('archived and dropped partition %s' % name)
+    print('%d partitions created, %d shows archived%s.' % (
+        len(created), archived, '' if partitions.is_partitioned() else ' (Show is not partitioned)'))
+
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    # Build step: bundle, minify and precompress the CSS/JS (assets.py).
+    for name, (filename, size, compressed) in sorted(assets.build(current_app).items()):
+        print('%-10s %-28s %8d bytes  %s' % (name, filename, size, '  '.join(
+            '%s %d' % (encoding, length) for encoding, length in sorted(compressed.items()))))
+
+
+@bp.cli.command('compile-templates')
+def compile_templates_command():
+    # Build step: fill TEMPLATE_CACHE_DIR so workers skip compiling.
+    directory = current_app.config['TEMPLATE_CACHE_DIR']
+    if not directory:
+        raise click.ClickException('TEMPLATE_CACHE_DIR is not set.')
+    timings = templating.compile_templates(current_app)
+    for name, elapsed in timings:
+        print('%-28s %8.1f ms' % (name, elapsed))
+    print('%d templates compiled into %s.' % (len(timings), directory))
+
+
+#error controllers
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    if request.path.startswith(API_PREFIX + '/'):
+        return jsonify({"error": "Not found"}), 404
+    return render_template('errors/404.html'), 404
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500